@@ -36,6 +36,8 @@ export const memory = {
 	coupons_cache: {},
 	item_groups_cache: [],
 	items_last_sync: null,
+	items_delta_cursor: null,
+	catalog_snapshot_etag: null,
 	customers_last_sync: null,
 	// Track the current cache schema version
 	cache_version: CACHE_VERSION,
@@ -244,6 +246,24 @@ export function setItemsLastSync(ts) {
 	persist("items_last_sync", memory.items_last_sync);
 }
 
+export function getItemsDeltaCursor() {
+	return memory.items_delta_cursor || null;
+}
+
+export function setItemsDeltaCursor(cursor) {
+	memory.items_delta_cursor = cursor;
+	persist("items_delta_cursor", memory.items_delta_cursor);
+}
+
+export function getCatalogSnapshotEtag() {
+	return memory.catalog_snapshot_etag || null;
+}
+
+export function setCatalogSnapshotEtag(etag) {
+	memory.catalog_snapshot_etag = etag;
+	persist("catalog_snapshot_etag", memory.catalog_snapshot_etag);
+}
+
 export function getCustomersLastSync() {
 	return memory.customers_last_sync || null;
 }
@@ -498,6 +518,8 @@ export async function clearAllCache() {
 	memory.stock_cache_ready = false;
 	memory.customer_storage = [];
 	memory.items_last_sync = null;
+	memory.items_delta_cursor = null;
+	memory.catalog_snapshot_etag = null;
 	memory.customers_last_sync = null;
 	memory.pos_opening_storage = null;
 	memory.opening_dialog_storage = null;
@@ -537,6 +559,8 @@ export async function forceClearAllCache() {
 	memory.stock_cache_ready = false;
 	memory.customer_storage = [];
 	memory.items_last_sync = null;
+	memory.items_delta_cursor = null;
+	memory.catalog_snapshot_etag = null;
 	memory.customers_last_sync = null;
 	memory.pos_opening_storage = null;
 	memory.opening_dialog_storage = null;
@@ -25,6 +25,10 @@ export {
 	clearCustomerStorage,
 	getItemsLastSync,
 	setItemsLastSync,
+	getItemsDeltaCursor,
+	setItemsDeltaCursor,
+	getCatalogSnapshotEtag,
+	setCatalogSnapshotEtag,
 	getCustomersLastSync,
 	setCustomersLastSync,
 	getSalesPersonsStorage,
@@ -108,6 +112,10 @@ export {
 	saveItemDetailsCache,
 	getCachedItemDetails,
 	saveItemsBulk,
+	decodeColumnarItems,
+	applyItemsDelta,
+	bootstrapItemsFromStream,
+	bootstrapItemsFromSnapshot,
 	getAllStoredItems,
 	searchStoredItems,
 } from "./items.js";
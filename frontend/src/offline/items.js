@@ -1,4 +1,5 @@
-import { memory } from "./cache.js";
+/* global frappe */
+import { memory, setItemsDeltaCursor, getCatalogSnapshotEtag, setCatalogSnapshotEtag } from "./cache.js";
 import { persist, db, checkDbHealth } from "./core.js";
 
 export function saveItemUOMs(itemCode, uoms) {
@@ -195,13 +196,32 @@ export async function getCachedItemDetails(profileName, priceList, itemCodes, tt
 
 // Persistent item storage helpers
 
+// Expand a columnar payload from get_items/get_items_details into row objects
+export function decodeColumnarItems(payload) {
+	if (!payload || payload.format !== "columnar") {
+		return payload;
+	}
+	const { columns = [], data = {}, dictionaries = {}, length = 0 } = payload;
+	const rows = new Array(length);
+	for (let i = 0; i < length; i++) {
+		const row = {};
+		for (const column of columns) {
+			const value = data[column][i];
+			const dictionary = dictionaries[column];
+			row[column] = dictionary && value !== null && value !== undefined ? dictionary[value] : value;
+		}
+		rows[i] = row;
+	}
+	return rows;
+}
+
 export async function saveItemsBulk(items) {
 	try {
 		await checkDbHealth();
 		if (!db.isOpen()) await db.open();
 		let cleanItems;
 		try {
-			cleanItems = JSON.parse(JSON.stringify(items));
+			cleanItems = JSON.parse(JSON.stringify(decodeColumnarItems(items)));
 		} catch (err) {
 			console.error("Failed to serialize items", err);
 			cleanItems = [];
@@ -233,6 +253,122 @@ export async function saveItemsBulk(items) {
 	}
 }
 
+// Apply a response from items.get_items_delta to the stored catalog
+export async function applyItemsDelta(delta) {
+	if (!delta) return;
+	try {
+		if (Array.isArray(delta.items) && delta.items.length) {
+			await saveItemsBulk(delta.items);
+		}
+		if (Array.isArray(delta.removed) && delta.removed.length) {
+			await checkDbHealth();
+			if (!db.isOpen()) await db.open();
+			await db.table("items").bulkDelete(delta.removed);
+			await db.table("item_prices").where("item_code").anyOf(delta.removed).delete();
+		}
+	} catch (e) {
+		console.error("Failed to apply items delta", e);
+	}
+}
+
+// Store the items of an NDJSON catalog response as its lines arrive
+async function saveCatalogStream(response, onProgress = null) {
+	const BATCH_SIZE = 500;
+	const reader = response.body.pipeThrough(new TextDecoderStream()).getReader();
+	let buffer = "";
+	let batch = [];
+	let count = 0;
+	let cursor = null;
+
+	const flush = async () => {
+		if (!batch.length) return;
+		await saveItemsBulk(batch);
+		count += batch.length;
+		batch = [];
+		if (onProgress) onProgress(count);
+	};
+
+	for (;;) {
+		const { value, done } = await reader.read();
+		if (done) break;
+		buffer += value;
+		let newline;
+		while ((newline = buffer.indexOf("\n")) >= 0) {
+			const line = buffer.slice(0, newline);
+			buffer = buffer.slice(newline + 1);
+			if (!line) continue;
+			const entry = JSON.parse(line);
+			if (entry.type === "item") {
+				batch.push(entry.item);
+				if (batch.length >= BATCH_SIZE) await flush();
+			} else if (entry.type === "meta") {
+				cursor = entry.cursor;
+			}
+		}
+	}
+	await flush();
+
+	if (cursor) setItemsDeltaCursor(cursor);
+	return count;
+}
+
+// Load the catalog from catalog_export.stream_catalog
+export async function bootstrapItemsFromStream({
+	posProfile,
+	priceList = null,
+	customer = null,
+	onProgress = null,
+} = {}) {
+	const body = new URLSearchParams({ pos_profile: JSON.stringify(posProfile), compress: 1 });
+	if (priceList) body.set("price_list", priceList);
+	if (customer) body.set("customer", customer);
+
+	const response = await fetch("/api/method/posawesome.posawesome.api.catalog_export.stream_catalog", {
+		method: "POST",
+		body,
+		credentials: "same-origin",
+		headers: { "X-Frappe-CSRF-Token": frappe.csrf_token },
+	});
+	if (!response.ok || !response.body) {
+		throw new Error(`Catalog stream failed with status ${response.status}`);
+	}
+	return saveCatalogStream(response, onProgress);
+}
+
+// Load the prebuilt catalog snapshot, falling back to the live stream when
+// none has been built. Resolves to 0 when the stored catalog is current.
+export async function bootstrapItemsFromSnapshot({ posProfile, priceList = null, onProgress = null } = {}) {
+	const params = new URLSearchParams({ pos_profile: posProfile.name });
+	if (priceList) params.set("price_list", priceList);
+
+	const headers = {};
+	const etag = getCatalogSnapshotEtag();
+	if (etag) {
+		// Only revalidate when the stored catalog was not cleared meanwhile
+		await checkDbHealth();
+		if (!db.isOpen()) await db.open();
+		if (await db.table("items").count()) headers["If-None-Match"] = etag;
+	}
+
+	const response = await fetch(
+		`/api/method/posawesome.posawesome.api.catalog_snapshot.get_catalog_snapshot?${params}`,
+		{ credentials: "same-origin", headers },
+	);
+	if (response.status === 304) {
+		return 0;
+	}
+	if (response.status === 404) {
+		return bootstrapItemsFromStream({ posProfile, priceList, onProgress });
+	}
+	if (!response.ok || !response.body) {
+		throw new Error(`Catalog snapshot failed with status ${response.status}`);
+	}
+
+	const count = await saveCatalogStream(response, onProgress);
+	setCatalogSnapshotEtag(response.headers.get("ETag"));
+	return count;
+}
+
 export async function getAllStoredItems() {
 	try {
 		await checkDbHealth();
@@ -6,6 +6,21 @@ import { updateLocalStock } from "./stock.js";
 // Flag to avoid concurrent invoice syncs which can cause duplicate submissions
 let invoiceSyncInProgress = false;
 
+// Invoices sent per sync request and how long to wait for the server to process them
+const SYNC_BATCH_SIZE = 100;
+const SYNC_POLL_INTERVAL = 2000;
+const SYNC_POLL_TIMEOUT = 10 * 60 * 1000;
+
+// Key identifying an offline invoice to the server, so a retried sync
+// never submits the same sale twice
+function generateIdempotencyKey() {
+	if (typeof crypto !== "undefined" && crypto.randomUUID) {
+		return crypto.randomUUID();
+	}
+	const random = () => Math.random().toString(36).slice(2);
+	return `${Date.now().toString(36)}-${random()}-${random()}`;
+}
+
 export function saveOfflineInvoice(entry) {
 	// Validate that invoice has items before saving
 	if (!entry.invoice || !Array.isArray(entry.invoice.items) || !entry.invoice.items.length) {
@@ -25,6 +40,7 @@ export function saveOfflineInvoice(entry) {
 		console.error("Failed to serialize offline invoice", e);
 		throw e;
 	}
+	cleanEntry.idempotency_key = cleanEntry.idempotency_key || generateIdempotencyKey();
 
 	entries.push(cleanEntry);
 	if (entries.length > MAX_QUEUE_ITEMS) {
@@ -210,34 +226,46 @@ export async function syncOfflineInvoices() {
 			return { pending: invoices.length, synced: 0, drafted: 0 };
 		}
 
+		// Entries queued before invoices carried a key get one now
+		let keysAdded = false;
+		invoices.forEach((inv) => {
+			if (!inv.idempotency_key) {
+				inv.idempotency_key = generateIdempotencyKey();
+				keysAdded = true;
+			}
+		});
+		if (keysAdded) {
+			persist("offline_invoices", memory.offline_invoices);
+		}
+
+		const sent = invoices.slice();
+		const results = await syncInvoiceBatches(sent);
 		const failures = [];
 		let synced = 0;
 		let drafted = 0;
 
-		for (const inv of invoices) {
-			try {
-				await frappe.call({
-					method: "posawesome.posawesome.api.invoices.submit_invoice",
-					args: {
-						invoice: inv.invoice,
-						data: inv.data,
-					},
-				});
+		for (const inv of sent) {
+			const result = results[inv.idempotency_key];
+			if (result && result.status === "Synced") {
 				synced++;
-			} catch (error) {
-				console.error("Failed to submit invoice, saving as draft", error);
-				try {
-					await frappe.call({
-						method: "posawesome.posawesome.api.invoices.update_invoice",
-						args: { data: inv.invoice },
-					});
-					drafted += 1;
-				} catch (draftErr) {
-					console.error("Failed to save invoice as draft", draftErr);
-					failures.push(inv);
+			} else if (result && result.status === "Drafted") {
+				// Submission failed, the server kept the sale as a draft
+				console.error("Offline invoice saved as draft", result.error);
+				drafted++;
+			} else {
+				if (result && result.error) {
+					console.error("Failed to sync offline invoice", result.error);
 				}
+				// Failed or still processing; sending it again later is safe
+				failures.push(inv);
 			}
 		}
+		// Keep invoices saved offline while the sync was running
+		getOfflineInvoices().forEach((inv) => {
+			if (!sent.includes(inv)) {
+				failures.push(inv);
+			}
+		});
 
 		// Reset saved invoices and totals after successful sync
 		if (synced > 0) {
@@ -270,6 +298,54 @@ export async function syncOfflineInvoices() {
 	}
 }
 
+function isPendingSync(result) {
+	return !result || result.status === "Queued" || result.status === "Processing";
+}
+
+// Queue invoices on the server in batches and wait until they are processed.
+// Returns the sync results keyed by idempotency key.
+async function syncInvoiceBatches(invoices) {
+	const results = {};
+	for (let i = 0; i < invoices.length; i += SYNC_BATCH_SIZE) {
+		const batch = invoices.slice(i, i + SYNC_BATCH_SIZE).map((inv) => ({
+			idempotency_key: inv.idempotency_key,
+			invoice: inv.invoice,
+			data: inv.data,
+		}));
+		try {
+			const r = await frappe.call({
+				method: "posawesome.posawesome.api.offline_sync.sync_offline_invoices",
+				args: { invoices: batch },
+			});
+			(r.message || []).forEach((res) => {
+				results[res.idempotency_key] = res;
+			});
+		} catch (error) {
+			console.error("Failed to queue offline invoices", error);
+		}
+	}
+
+	const deadline = Date.now() + SYNC_POLL_TIMEOUT;
+	let pending = Object.keys(results).filter((key) => isPendingSync(results[key]));
+	while (pending.length && Date.now() < deadline) {
+		await new Promise((resolve) => setTimeout(resolve, SYNC_POLL_INTERVAL));
+		try {
+			const r = await frappe.call({
+				method: "posawesome.posawesome.api.offline_sync.get_offline_invoice_sync_status",
+				args: { keys: pending },
+			});
+			(r.message || []).forEach((res) => {
+				results[res.idempotency_key] = res;
+			});
+		} catch (error) {
+			console.error("Failed to check offline invoice sync status", error);
+			break;
+		}
+		pending = pending.filter((key) => isPendingSync(results[key]));
+	}
+	return results;
+}
+
 export async function syncOfflineCustomers() {
 	const customers = getOfflineCustomers();
 	if (!customers.length) {
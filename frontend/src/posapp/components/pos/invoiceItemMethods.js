@@ -1370,198 +1370,235 @@ export default {
 				warehouse: item.warehouse || this.pos_profile.warehouse,
 				doc: currentDoc,
 				price_list: this.selected_price_list || this.pos_profile.selling_price_list,
-				item: {
-					item_code: item.item_code,
-					customer: this.customer,
-					doctype: currentDoc.doctype,
-					name: currentDoc.name || `New ${currentDoc.doctype} 1`,
-					company: this.pos_profile.company,
-					conversion_rate: 1,
-					currency: this.pos_profile.currency,
-					qty: item.qty,
-					price_list_rate: item.base_price_list_rate || item.price_list_rate,
-					child_docname: `New ${currentDoc.doctype} Item 1`,
-					cost_center: this.pos_profile.cost_center,
-					pos_profile: this.pos_profile.name,
-					uom: item.uom,
-					tax_category: "",
-					transaction_type: "selling",
-					update_stock: this.pos_profile.update_stock,
-					price_list: this.get_price_list(),
-					has_batch_no: item.has_batch_no,
-					has_serial_no: item.has_serial_no,
-					serial_no: item.serial_no,
-					batch_no: item.batch_no,
-					is_stock_item: item.is_stock_item,
-				},
+				item: this.item_detail_args(item, currentDoc),
 			},
 			callback: function (r) {
 				if (r.message) {
-					const data = r.message;
-					if (!item.warehouse) {
-						item.warehouse = vm.pos_profile.warehouse;
-					}
-					// Ensure price list currency is synced from server response
-					if (data.price_list_currency) {
-						vm.price_list_currency = data.price_list_currency;
-					}
+					vm.apply_item_detail(item, r.message, force_update);
+				}
+			},
+		});
+	},
 
-					if (!item.original_currency) {
-						item.original_currency =
-							data.price_list_currency || vm.price_list_currency || vm.selected_currency;
-					}
-					if (!item.original_rate) {
-						item.original_rate = data.price_list_rate;
-					}
-					if (data.serial_no_data) {
-						item.serial_no_data = data.serial_no_data;
+	// Update details for many items with a single request
+	async update_item_details_bulk(items, force_update = false) {
+		const targets = (items || []).filter(
+			(item) => item.item_code && (force_update || !item._manual_rate_set),
+		);
+		if (!targets.length) {
+			return;
+		}
+
+		const currentDoc = this.get_invoice_doc();
+		try {
+			const r = await frappe.call({
+				method: "posawesome.posawesome.api.items.get_item_details_bulk",
+				args: {
+					warehouse: this.pos_profile.warehouse,
+					doc: currentDoc,
+					price_list: this.selected_price_list || this.pos_profile.selling_price_list,
+					items: targets.map((item) => ({
+						...this.item_detail_args(item, currentDoc),
+						warehouse: item.warehouse || this.pos_profile.warehouse,
+					})),
+				},
+			});
+			(r.message || []).forEach((data, index) => {
+				if (data) {
+					this.apply_item_detail(targets[index], data, force_update);
+				}
+			});
+		} catch (error) {
+			console.error("Error updating item details:", error);
+		}
+	},
+
+	// Arguments sent to the server for one invoice line
+	item_detail_args(item, currentDoc) {
+		return {
+			item_code: item.item_code,
+			customer: this.customer,
+			doctype: currentDoc.doctype,
+			name: currentDoc.name || `New ${currentDoc.doctype} 1`,
+			company: this.pos_profile.company,
+			conversion_rate: 1,
+			currency: this.pos_profile.currency,
+			qty: item.qty,
+			price_list_rate: item.base_price_list_rate || item.price_list_rate,
+			child_docname: `New ${currentDoc.doctype} Item 1`,
+			cost_center: this.pos_profile.cost_center,
+			pos_profile: this.pos_profile.name,
+			uom: item.uom,
+			tax_category: "",
+			transaction_type: "selling",
+			update_stock: this.pos_profile.update_stock,
+			price_list: this.get_price_list(),
+			has_batch_no: item.has_batch_no,
+			has_serial_no: item.has_serial_no,
+			serial_no: item.serial_no,
+			batch_no: item.batch_no,
+			is_stock_item: item.is_stock_item,
+		};
+	},
+
+	// Apply server item details to an invoice line
+	apply_item_detail(item, data, force_update = false) {
+		const vm = this;
+		if (!item.warehouse) {
+			item.warehouse = vm.pos_profile.warehouse;
+		}
+		// Ensure price list currency is synced from server response
+		if (data.price_list_currency) {
+			vm.price_list_currency = data.price_list_currency;
+		}
+
+		if (!item.original_currency) {
+			item.original_currency =
+				data.price_list_currency || vm.price_list_currency || vm.selected_currency;
+		}
+		if (!item.original_rate) {
+			item.original_rate = data.price_list_rate;
+		}
+		if (data.serial_no_data) {
+			item.serial_no_data = data.serial_no_data;
+		}
+		if (data.batch_no_data) {
+			item.batch_no_data = data.batch_no_data;
+		}
+		if (
+			item.has_batch_no &&
+			vm.pos_profile.posa_auto_set_batch &&
+			!item.batch_no &&
+			data.batch_no_data &&
+			data.batch_no_data.length > 0
+		) {
+			item.batch_no_data = data.batch_no_data;
+			// Pass null instead of undefined to avoid console warning
+			vm.set_batch_qty(item, null, false);
+		}
+
+		if (!item.locked_price) {
+			// First save base rates if not exists or when force update is requested
+			// Avoid overriding existing base rates when the selected currency
+			// matches the POS Profile currency. This prevents manual or offer
+			// adjusted rates from being reset whenever an item row is expanded.
+			if (force_update || !item.base_rate) {
+				// Always store base rates from server in base currency
+				if (data.price_list_rate !== 0 || !item.base_price_list_rate) {
+					item.base_price_list_rate = data.price_list_rate;
+					if (!item.posa_offer_applied) {
+						item.base_rate = data.price_list_rate;
 					}
-					if (data.batch_no_data) {
-						item.batch_no_data = data.batch_no_data;
+				}
+			}
+
+			// Only update rates if no offer is applied
+			if (!item.posa_offer_applied) {
+				const companyCurrency = vm.pos_profile.currency;
+				const baseCurrency = companyCurrency;
+
+				if (
+					vm.selected_currency === vm.price_list_currency &&
+					vm.selected_currency !== companyCurrency
+				) {
+					const conv = vm.conversion_rate || 1;
+					item.price_list_rate = vm.flt(item.base_price_list_rate / conv, vm.currency_precision);
+
+					if (!item._manual_rate_set) {
+						item.rate = vm.flt(item.base_rate / conv, vm.currency_precision);
 					}
-					if (
-						item.has_batch_no &&
-						vm.pos_profile.posa_auto_set_batch &&
-						!item.batch_no &&
-						data.batch_no_data &&
-						data.batch_no_data.length > 0
-					) {
-						item.batch_no_data = data.batch_no_data;
-						// Pass null instead of undefined to avoid console warning
-						vm.set_batch_qty(item, null, false);
+				} else if (vm.selected_currency !== baseCurrency) {
+					const exchange_rate = vm.exchange_rate || 1;
+					item.price_list_rate = vm.flt(
+						item.base_price_list_rate * exchange_rate,
+						vm.currency_precision,
+					);
+
+					item.rate = vm.flt(item.base_rate * exchange_rate, vm.currency_precision);
+				} else {
+					item.price_list_rate = item.base_price_list_rate;
+
+					if (!item._manual_rate_set) {
+						item.rate = item.base_rate;
 					}
+				}
+			} else {
+				// Preserve discounted price when an offer is applied so the
+				// rate doesn't revert to the original price list value.
+				const baseCurrency = vm.price_list_currency || vm.pos_profile.currency;
+				if (vm.selected_currency !== baseCurrency) {
+					item.price_list_rate = vm.flt(item.base_rate * vm.exchange_rate, vm.currency_precision);
+				} else {
+					item.price_list_rate = item.base_rate;
+				}
+			}
 
-					if (!item.locked_price) {
-						// First save base rates if not exists or when force update is requested
-						// Avoid overriding existing base rates when the selected currency
-						// matches the POS Profile currency. This prevents manual or offer
-						// adjusted rates from being reset whenever an item row is expanded.
-						if (force_update || !item.base_rate) {
-							// Always store base rates from server in base currency
-							if (data.price_list_rate !== 0 || !item.base_price_list_rate) {
-								item.base_price_list_rate = data.price_list_rate;
-								if (!item.posa_offer_applied) {
-									item.base_rate = data.price_list_rate;
-								}
-							}
-						}
+			// Handle customer discount only if no offer is applied
+			if (
+				!item.posa_offer_applied &&
+				vm.pos_profile.posa_apply_customer_discount &&
+				vm.customer_info.posa_discount > 0 &&
+				vm.customer_info.posa_discount <= 100 &&
+				item.posa_is_offer == 0 &&
+				!item.posa_is_replace
+			) {
+				const discount_percent =
+					item.max_discount > 0
+						? Math.min(item.max_discount, vm.customer_info.posa_discount)
+						: vm.customer_info.posa_discount;
 
-						// Only update rates if no offer is applied
-						if (!item.posa_offer_applied) {
-							const companyCurrency = vm.pos_profile.currency;
-							const baseCurrency = companyCurrency;
-
-							if (
-								vm.selected_currency === vm.price_list_currency &&
-								vm.selected_currency !== companyCurrency
-							) {
-								const conv = vm.conversion_rate || 1;
-								item.price_list_rate = vm.flt(
-									item.base_price_list_rate / conv,
-									vm.currency_precision,
-								);
-
-								if (!item._manual_rate_set) {
-									item.rate = vm.flt(item.base_rate / conv, vm.currency_precision);
-								}
-							} else if (vm.selected_currency !== baseCurrency) {
-								const exchange_rate = vm.exchange_rate || 1;
-								item.price_list_rate = vm.flt(
-									item.base_price_list_rate * exchange_rate,
-									vm.currency_precision,
-								);
-
-								item.rate = vm.flt(item.base_rate * exchange_rate, vm.currency_precision);
-							} else {
-								item.price_list_rate = item.base_price_list_rate;
+				item.discount_percentage = discount_percent;
 
-								if (!item._manual_rate_set) {
-									item.rate = item.base_rate;
-								}
-							}
-						} else {
-							// Preserve discounted price when an offer is applied so the
-							// rate doesn't revert to the original price list value.
-							const baseCurrency = vm.price_list_currency || vm.pos_profile.currency;
-							if (vm.selected_currency !== baseCurrency) {
-								item.price_list_rate = vm.flt(
-									item.base_rate * vm.exchange_rate,
-									vm.currency_precision,
-								);
-							} else {
-								item.price_list_rate = item.base_rate;
-							}
-						}
+				// Calculate discount in selected currency
+				const discount_amount = vm.flt(
+					(item.price_list_rate * discount_percent) / 100,
+					vm.currency_precision,
+				);
+				item.discount_amount = discount_amount;
 
-						// Handle customer discount only if no offer is applied
-						if (
-							!item.posa_offer_applied &&
-							vm.pos_profile.posa_apply_customer_discount &&
-							vm.customer_info.posa_discount > 0 &&
-							vm.customer_info.posa_discount <= 100 &&
-							item.posa_is_offer == 0 &&
-							!item.posa_is_replace
-						) {
-							const discount_percent =
-								item.max_discount > 0
-									? Math.min(item.max_discount, vm.customer_info.posa_discount)
-									: vm.customer_info.posa_discount;
-
-							item.discount_percentage = discount_percent;
-
-							// Calculate discount in selected currency
-							const discount_amount = vm.flt(
-								(item.price_list_rate * discount_percent) / 100,
-								vm.currency_precision,
-							);
-							item.discount_amount = discount_amount;
-
-							// Also store base discount amount
-							item.base_discount_amount = vm.flt(
-								(item.base_price_list_rate * discount_percent) / 100,
-								vm.currency_precision,
-							);
-
-							// Update rates with discount
-							item.rate = vm.flt(item.price_list_rate - discount_amount, vm.currency_precision);
-							item.base_rate = vm.flt(
-								item.base_price_list_rate - item.base_discount_amount,
-								vm.currency_precision,
-							);
-						}
-					}
+				// Also store base discount amount
+				item.base_discount_amount = vm.flt(
+					(item.base_price_list_rate * discount_percent) / 100,
+					vm.currency_precision,
+				);
 
-					// Update other item details
-					item.last_purchase_rate = data.last_purchase_rate;
-					item.projected_qty = data.projected_qty;
-					item.reserved_qty = data.reserved_qty;
-					item.conversion_factor = data.conversion_factor;
-					item.stock_qty = data.stock_qty;
-					item.actual_qty = data.actual_qty;
-					item.stock_uom = data.stock_uom;
-					item.has_serial_no = data.has_serial_no;
-					item.has_batch_no = data.has_batch_no;
-
-					// Calculate final amount
-					item.amount = vm.flt(item.qty * item.rate, vm.currency_precision);
-					item.base_amount = vm.flt(item.qty * item.base_rate, vm.currency_precision);
-
-					// Log updated rates for debugging
-					console.log(`Updated rates for ${item.item_code} on expand:`, {
-						base_rate: item.base_rate,
-						rate: item.rate,
-						base_price_list_rate: item.base_price_list_rate,
-						price_list_rate: item.price_list_rate,
-						exchange_rate: vm.exchange_rate,
-						selected_currency: vm.selected_currency,
-						default_currency: vm.pos_profile.currency,
-					});
+				// Update rates with discount
+				item.rate = vm.flt(item.price_list_rate - discount_amount, vm.currency_precision);
+				item.base_rate = vm.flt(
+					item.base_price_list_rate - item.base_discount_amount,
+					vm.currency_precision,
+				);
+			}
+		}
 
-					// Force update UI immediately
-					vm.$forceUpdate();
-				}
-			},
+		// Update other item details
+		item.last_purchase_rate = data.last_purchase_rate;
+		item.projected_qty = data.projected_qty;
+		item.reserved_qty = data.reserved_qty;
+		item.conversion_factor = data.conversion_factor;
+		item.stock_qty = data.stock_qty;
+		item.actual_qty = data.actual_qty;
+		item.stock_uom = data.stock_uom;
+		item.has_serial_no = data.has_serial_no;
+		item.has_batch_no = data.has_batch_no;
+
+		// Calculate final amount
+		item.amount = vm.flt(item.qty * item.rate, vm.currency_precision);
+		item.base_amount = vm.flt(item.qty * item.base_rate, vm.currency_precision);
+
+		// Log updated rates for debugging
+		console.log(`Updated rates for ${item.item_code} on expand:`, {
+			base_rate: item.base_rate,
+			rate: item.rate,
+			base_price_list_rate: item.base_price_list_rate,
+			price_list_rate: item.price_list_rate,
+			exchange_rate: vm.exchange_rate,
+			selected_currency: vm.selected_currency,
+			default_currency: vm.pos_profile.currency,
 		});
+
+		// Force update UI immediately
+		vm.$forceUpdate();
 	},
 
 	// Fetch customer details (info, price list, etc)
@@ -83,11 +83,31 @@ async function persist(key, value) {
 	}
 }
 
+// Keep in sync with decodeColumnarItems in offline/items.js
+function decodeColumnarItems(payload) {
+	if (!payload || payload.format !== "columnar") {
+		return payload;
+	}
+	const { columns = [], data = {}, dictionaries = {}, length = 0 } = payload;
+	const rows = new Array(length);
+	for (let i = 0; i < length; i++) {
+		const row = {};
+		for (const column of columns) {
+			const value = data[column][i];
+			const dictionary = dictionaries[column];
+			row[column] = dictionary && value !== null && value !== undefined ? dictionary[value] : value;
+		}
+		rows[i] = row;
+	}
+	return rows;
+}
+
 async function bulkPutItems(items) {
 	try {
 		if (!db.isOpen()) {
 			await db.open();
 		}
+		items = decodeColumnarItems(items);
 		const CHUNK_SIZE = 1000;
 		await db.transaction("rw", db.table("items"), async () => {
 			for (let i = 0; i < items.length; i += CHUNK_SIZE) {
@@ -129,7 +149,7 @@ self.onmessage = async (event) => {
 	if (data.type === "parse_and_cache") {
 		try {
 			let parsed = JSON.parse(data.json);
-			let itemsRaw = parsed.message || parsed;
+			let itemsRaw = decodeColumnarItems(parsed.message || parsed);
 			let items;
 			try {
 				if (typeof structuredClone === "function") {
@@ -106,28 +106,81 @@ doc_events = {
         "validate": "posawesome.posawesome.api.customer.validate",
         "after_insert": "posawesome.posawesome.api.customer.after_insert",
     },
+    "Item": {
+        "on_update": [
+            "posawesome.posawesome.api.scan.clear_barcode_cache",
+            "posawesome.posawesome.api.sellable_items.on_item_change",
+            "posawesome.posawesome.api.utils.clear_item_group_tree_cache",
+            "posawesome.posawesome.api.catalog_cache.clear_catalog_cache",
+        ],
+        "on_trash": [
+            "posawesome.posawesome.api.scan.clear_barcode_cache",
+            "posawesome.posawesome.api.sellable_items.on_item_change",
+            "posawesome.posawesome.api.utils.clear_item_group_tree_cache",
+            "posawesome.posawesome.api.catalog_cache.clear_catalog_cache",
+        ],
+    },
+    "Item Price": {
+        "on_update": [
+            "posawesome.posawesome.api.prices.on_item_price_change",
+            "posawesome.posawesome.api.sellable_items.on_item_price_change",
+            "posawesome.posawesome.api.catalog_cache.clear_catalog_cache",
+        ],
+        "on_trash": [
+            "posawesome.posawesome.api.prices.on_item_price_change",
+            "posawesome.posawesome.api.sellable_items.on_item_price_change",
+            "posawesome.posawesome.api.catalog_cache.clear_catalog_cache",
+        ],
+    },
+    "Stock Ledger Entry": {
+        "on_submit": "posawesome.posawesome.api.sellable_items.on_stock_ledger_entry_submit",
+    },
+    "POS Profile": {
+        "on_update": [
+            "posawesome.posawesome.api.utils.clear_item_groups_cache",
+            "posawesome.posawesome.api.sellable_items.on_pos_profile_change",
+        ],
+        "on_trash": [
+            "posawesome.posawesome.api.utils.clear_item_groups_cache",
+            "posawesome.posawesome.api.sellable_items.on_pos_profile_change",
+        ],
+    },
+    "Item Group": {
+        "on_update": "posawesome.posawesome.api.utils.clear_item_groups_cache",
+        "after_rename": "posawesome.posawesome.api.utils.clear_item_groups_cache",
+        "on_trash": "posawesome.posawesome.api.utils.clear_item_groups_cache",
+    },
+    "Warehouse": {
+        "on_update": "posawesome.posawesome.api.utils.clear_warehouse_tree_cache",
+        "after_rename": "posawesome.posawesome.api.utils.clear_warehouse_tree_cache",
+        "on_trash": "posawesome.posawesome.api.utils.clear_warehouse_tree_cache",
+    },
 }
 
+# Request Events
+# ----------------
+# Opt-in API instrumentation, see posawesome.posawesome.api.instrumentation
+
+before_request = ["posawesome.posawesome.api.instrumentation.before_request"]
+after_request = ["posawesome.posawesome.api.instrumentation.after_request"]
+
 # Scheduled Tasks
 # ---------------
 
-# scheduler_events = {
-# 	"all": [
-# 		"posawesome.tasks.all"
-# 	],
-# 	"daily": [
-# 		"posawesome.tasks.daily"
-# 	],
-# 	"hourly": [
-# 		"posawesome.tasks.hourly"
-# 	],
-# 	"weekly": [
-# 		"posawesome.tasks.weekly"
-# 	]
-# 	"monthly": [
-# 		"posawesome.tasks.monthly"
-# 	]
-# }
+scheduler_events = {
+    "cron": {
+        "* * * * *": [
+            "posawesome.posawesome.api.submission_queue.retry_submission_queues",
+        ],
+    },
+    "hourly": [
+        "posawesome.posawesome.api.catalog_snapshot.build_all_catalog_snapshots",
+    ],
+    "daily": [
+        "posawesome.posawesome.api.sellable_items.rebuild_all_sellable_items",
+        "posawesome.posawesome.api.offline_sync.delete_old_offline_invoices",
+    ],
+}
 
 # Testing
 # -------
@@ -12,8 +12,10 @@ from .customers import (
     set_customer_info,
 )
 from .invoices import (
+    checkout,
     delete_invoice,
     get_draft_invoices,
+    get_returnable_items,
     search_invoices_for_return,
     submit_invoice,
     update_invoice,
@@ -23,8 +25,11 @@ from .items import (
     get_item_attributes,
     get_item_brand,
     get_item_detail,
+    get_item_details_bulk,
+    get_item_group_tree,
     get_items,
     get_items_count,
+    get_items_delta,
     get_items_details,
     get_items_from_barcode,
     get_items_groups,
@@ -35,20 +40,25 @@ from .offers import (
     get_offers,
     get_pos_coupon,
 )
+from .offline_sync import get_offline_invoice_sync_status, sync_offline_invoices
 from .payments import (
     create_payment_request,
     get_available_credit,
 )
+from .prices import get_customer_price_overlay
 from .sales_orders import (
     search_orders,
     submit_sales_order,
     update_sales_order,
 )
+from .scan import resolve_scanned_codes
+from .sellable_items import get_sellable_items
 from .shifts import (
     check_opening_shift,
     create_opening_voucher,
     get_opening_dialog_data,
 )
+from .submission_queue import get_submission_queue_status
 from .utilities import (
     get_app_branch,
     get_app_info,
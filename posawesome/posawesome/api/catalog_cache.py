@@ -0,0 +1,177 @@
+# Copyright (c) 2020, Youssef Restom and contributors
+# For license information, please see license.txt
+
+import hashlib
+import json
+import pickle
+import time
+
+import frappe
+from frappe.utils import cint, flt
+
+# Default upper bound of entries kept per cache namespace
+DEFAULT_MAX_ENTRIES = 20000
+
+# Redis hash with hit/miss/eviction counters per POS Profile
+CATALOG_STATS_KEY = "posa_catalog_stats|{pos_profile}"
+# Redis set listing the cache namespaces created for a POS Profile
+CATALOG_INDEX_KEY = "posa_catalog_index|{pos_profile}"
+# Redis key whose value changes whenever an Item or Item Price changes
+CATALOG_VERSION_KEY = "posa_catalog_version"
+
+
+def _get_catalog_version():
+    return frappe.cache().get_value(CATALOG_VERSION_KEY) or ""
+
+
+class CatalogCache:
+    """Size-bounded LRU cache for catalog data of one POS Profile.
+
+    Entries live in a Redis hash per ``(profile, warehouse, price list)``
+    namespace with a companion sorted set tracking last access
+    times. Once the namespace holds more than ``max_entries`` the least
+    recently used entries are evicted. Entries older than ``ttl`` seconds
+    count as misses. Hits, misses and evictions are recorded per profile for
+    :func:`get_catalog_cache_stats`.
+
+    The namespace also carries the catalog version bumped by
+    :func:`clear_catalog_cache`, so entries cached before an Item or Item
+    Price change are no longer read. A namespace expires ``ttl`` seconds
+    after its last write.
+    """
+
+    def __init__(self, pos_profile, warehouse=None, price_list=None, ttl=300, max_entries=None):
+        self.pos_profile = pos_profile
+        self.namespace = (
+            f"posa_catalog|{pos_profile}|{warehouse or ''}|{price_list or ''}|{_get_catalog_version()}"
+        )
+        self.ttl = ttl or 300
+        self.max_entries = (
+            max_entries or cint(frappe.conf.get("posa_catalog_cache_max_entries")) or DEFAULT_MAX_ENTRIES
+        )
+        self._redis = frappe.cache()
+        self._data_key = self._redis.make_key(self.namespace)
+        self._lru_key = self._redis.make_key(f"{self.namespace}|lru")
+        self._stats_key = self._redis.make_key(CATALOG_STATS_KEY.format(pos_profile=pos_profile))
+        self._index_key = self._redis.make_key(CATALOG_INDEX_KEY.format(pos_profile=pos_profile))
+
+    @staticmethod
+    def page_key(*parts):
+        """Return a stable cache key for a catalog page query."""
+        digest = hashlib.sha1(json.dumps(parts, default=str, sort_keys=True).encode()).hexdigest()
+        return f"page|{digest}"
+
+    def get_many(self, keys):
+        """Return ``{key: value}`` for the fresh entries among ``keys``."""
+        keys = list(dict.fromkeys(keys))
+        if not keys:
+            return {}
+
+        now = time.time()
+        try:
+            values = self._redis.hmget(self._data_key, keys)
+        except Exception:
+            return {}
+
+        found = {}
+        for key, value in zip(keys, values, strict=True):
+            if value is None:
+                continue
+            stored_at, payload = pickle.loads(value)
+            if now - stored_at <= self.ttl:
+                found[key] = payload
+
+        try:
+            pipe = self._redis.pipeline()
+            if found:
+                pipe.zadd(self._lru_key, dict.fromkeys(found, now))
+            pipe.hincrby(self._stats_key, "hits", len(found))
+            pipe.hincrby(self._stats_key, "misses", len(keys) - len(found))
+            pipe.execute()
+        except Exception:
+            pass
+        return found
+
+    def get(self, key):
+        return self.get_many([key]).get(key)
+
+    def set_many(self, mapping):
+        """Store ``mapping`` and evict least recently used overflow."""
+        if not mapping:
+            return
+
+        now = time.time()
+        try:
+            pipe = self._redis.pipeline()
+            pipe.hset(self._data_key, mapping={k: pickle.dumps((now, v)) for k, v in mapping.items()})
+            pipe.zadd(self._lru_key, dict.fromkeys(mapping, now))
+            pipe.expire(self._data_key, self.ttl)
+            pipe.expire(self._lru_key, self.ttl)
+            pipe.sadd(self._index_key, self.namespace)
+            pipe.zcard(self._lru_key)
+            size = pipe.execute()[-1]
+            if size > self.max_entries:
+                self._evict(size - self.max_entries)
+        except Exception:
+            frappe.log_error(frappe.get_traceback(), "POS Awesome catalog cache")
+
+    def set(self, key, value):
+        self.set_many({key: value})
+
+    def _evict(self, count):
+        evicted = [member for member, _score in self._redis.zpopmin(self._lru_key, count)]
+        if evicted:
+            pipe = self._redis.pipeline()
+            pipe.hdel(self._data_key, *evicted)
+            pipe.hincrby(self._stats_key, "evictions", len(evicted))
+            pipe.execute()
+
+
+def clear_catalog_cache(doc=None, method=None):
+    """Invalidate the cached catalog pages and item details of every POS Profile.
+
+    Called when an Item or Item Price is saved or deleted. The version is
+    bumped once the change is committed; bumped earlier, a concurrent read
+    could cache the old rows under the new version.
+    """
+    frappe.db.after_commit.add(_bump_catalog_version)
+
+
+def _bump_catalog_version():
+    frappe.cache().set_value(CATALOG_VERSION_KEY, frappe.generate_hash(length=10))
+
+
+@frappe.whitelist()
+def get_catalog_cache_stats(pos_profile):
+    """Return hit ratio, entry count and memory used by a profile's catalog cache."""
+    frappe.only_for("System Manager")
+    redis = frappe.cache()
+    # Counters are plain integers, so bypass the unpickling hgetall wrapper
+    pipe = redis.pipeline()
+    pipe.hgetall(redis.make_key(CATALOG_STATS_KEY.format(pos_profile=pos_profile)))
+    stats = pipe.execute()[0] or {}
+    hits = cint(stats.get(b"hits"))
+    misses = cint(stats.get(b"misses"))
+
+    entries = 0
+    memory_bytes = 0
+    index_key = CATALOG_INDEX_KEY.format(pos_profile=pos_profile)
+    version = _get_catalog_version()
+    for namespace in redis.smembers(index_key) or []:
+        namespace = frappe.safe_decode(namespace)
+        # Namespaces of older catalog versions are no longer read
+        if namespace.rsplit("|", 1)[-1] != version:
+            redis.srem(index_key, namespace)
+            continue
+        for key in (redis.make_key(namespace), redis.make_key(f"{namespace}|lru")):
+            memory_bytes += cint(redis.memory_usage(key))
+        entries += cint(redis.hlen(redis.make_key(namespace)))
+
+    return {
+        "hits": hits,
+        "misses": misses,
+        "evictions": cint(stats.get(b"evictions")),
+        "hit_ratio": flt(hits / (hits + misses), 4) if hits + misses else 0,
+        "entries": entries,
+        "memory_bytes": memory_bytes,
+    }
@@ -0,0 +1,131 @@
+# Copyright (c) 2020, Youssef Restom and contributors
+# For license information, please see license.txt
+
+import json
+import zlib
+
+import frappe
+from frappe.utils import cint
+from frappe.utils.response import json_handler
+from werkzeug.wrappers import Response
+
+from .items import get_items_details, new_items_cursor
+from .sellable_items import get_profile_item_filters
+
+# Items read and written per chunk of the stream
+STREAM_PAGE_SIZE = 500
+
+STREAM_ITEM_FIELDS = [
+    "name",
+    "name as item_code",
+    "item_name",
+    "stock_uom",
+    "is_stock_item",
+    "has_variants",
+    "variant_of",
+    "item_group",
+    "idx",
+    "has_batch_no",
+    "has_serial_no",
+    "max_discount",
+    "brand",
+]
+
+
+def _ndjson(obj):
+    return json.dumps(obj, default=json_handler, separators=(",", ":")) + "\n"
+
+
+def iter_catalog_lines(profile, price_list, customer, cursor):
+    """Yield the NDJSON lines of a catalog export one page at a time."""
+    yield _ndjson(
+        {
+            "type": "meta",
+            "pos_profile": profile.name,
+            "price_list": price_list,
+            "cursor": cursor,
+        }
+    )
+
+    filters = get_profile_item_filters(profile)
+    count = 0
+    after = None
+    while True:
+        page_filters = dict(filters)
+        if after:
+            page_filters["name"] = [">", after]
+        rows = frappe.get_all(
+            "Item",
+            filters=page_filters,
+            fields=STREAM_ITEM_FIELDS,
+            order_by="name asc",
+            limit_page_length=STREAM_PAGE_SIZE,
+        )
+        if not rows:
+            break
+
+        details = get_items_details(
+            json.dumps(profile, default=json_handler),
+            json.dumps(rows, default=json_handler),
+            price_list=price_list,
+            customer=customer,
+        )
+        detail_map = {d["item_code"]: d for d in details}
+        for row in rows:
+            item = dict(row)
+            item.update(detail_map.get(row.item_code, {}))
+            yield _ndjson({"type": "item", "item": item})
+
+        count += len(rows)
+        after = rows[-1].name
+        if len(rows) < STREAM_PAGE_SIZE:
+            break
+
+    yield _ndjson({"type": "end", "count": count})
+
+
+def _gzip(chunks):
+    compressor = zlib.compressobj(6, zlib.DEFLATED, 31)
+    for chunk in chunks:
+        data = compressor.compress(chunk.encode())
+        if data:
+            yield data
+    yield compressor.flush()
+
+
+@frappe.whitelist()
+def stream_catalog(pos_profile, price_list=None, customer=None, compress=0):
+    """Stream the catalog of a POS Profile as newline-delimited JSON.
+
+    The first line is ``{"type": "meta", ...}`` carrying a ``cursor`` for
+    :func:`get_items_delta`, followed by one ``{"type": "item", "item": ...}``
+    line per item with its prices, barcodes, UOMs, stock, batches and serial
+    numbers, and a final ``{"type": "end", "count": n}`` line. Items are read
+    and written in pages, so server memory does not grow with the catalog.
+    Pass ``compress=1`` for a gzip encoded body.
+    """
+    profile = frappe._dict(json.loads(pos_profile))
+    price_list = price_list or profile.get("selling_price_list")
+    # Taken before reading so changes made during the export show up in
+    # the first delta sync
+    cursor = new_items_cursor()
+
+    def generate():
+        # The request's database connection is closed before the body is
+        # sent, so the stream opens its own for the duration of the export.
+        frappe.connect(set_admin_as_user=False)
+        try:
+            yield from iter_catalog_lines(profile, price_list, customer, cursor)
+        finally:
+            frappe.db.close()
+
+    if cint(compress):
+        body = _gzip(generate())
+    else:
+        body = (line.encode() for line in generate())
+
+    response = Response(body, mimetype="application/x-ndjson", direct_passthrough=True)
+    response.headers["Cache-Control"] = "no-store"
+    if cint(compress):
+        response.headers["Content-Encoding"] = "gzip"
+    return response
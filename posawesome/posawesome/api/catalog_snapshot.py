@@ -0,0 +1,186 @@
+# Copyright (c) 2020, Youssef Restom and contributors
+# For license information, please see license.txt
+
+"""Prebuilt catalog snapshots for terminal bootstrap.
+
+A snapshot is the :func:`catalog_export.stream_catalog` output of one POS
+Profile and price list, gzip compressed and stored under the site's private
+files. A small JSON manifest next to it records the latest version and the
+SHA-256 of its content, which doubles as the ETag served to terminals. The
+meta line, which holds the build time, is left out of the hash so an
+unchanged catalog keeps its ETag.
+"""
+
+import gzip
+import hashlib
+import json
+import os
+
+import frappe
+from frappe import _
+from frappe.utils import cint, now_datetime
+from werkzeug.wrappers import Response
+from werkzeug.wsgi import wrap_file
+
+from .catalog_export import iter_catalog_lines
+from .items import new_items_cursor
+
+SNAPSHOT_FOLDER = "posawesome_catalog"
+
+# Number of snapshot files kept per profile and price list, so terminals
+# still downloading an older version are not cut off
+SNAPSHOTS_TO_KEEP = 2
+
+
+def _snapshot_dir():
+    path = frappe.get_site_path("private", "files", SNAPSHOT_FOLDER)
+    os.makedirs(path, exist_ok=True)
+    return path
+
+
+def _snapshot_slug(pos_profile, price_list):
+    digest = hashlib.sha1(f"{pos_profile}|{price_list}".encode()).hexdigest()[:10]
+    return f"{frappe.scrub(pos_profile)}-{digest}"
+
+
+def _manifest_path(pos_profile, price_list):
+    return os.path.join(_snapshot_dir(), f"{_snapshot_slug(pos_profile, price_list)}.json")
+
+
+def get_snapshot_manifest(pos_profile, price_list):
+    """Return the manifest of the latest snapshot, or ``None`` if none was built."""
+    try:
+        with open(_manifest_path(pos_profile, price_list)) as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+
+def build_catalog_snapshot(pos_profile, price_list=None):
+    """Write a new snapshot for ``pos_profile`` and return its manifest.
+
+    When the content is the same as the latest snapshot, no new version is
+    written and the current manifest is returned.
+    """
+    profile = frappe._dict(frappe.get_doc("POS Profile", pos_profile).as_dict())
+    price_list = price_list or profile.selling_price_list
+    slug = _snapshot_slug(profile.name, price_list)
+    version = now_datetime().strftime("%Y%m%d%H%M%S%f")
+    cursor = new_items_cursor()
+
+    directory = _snapshot_dir()
+    file_name = f"{slug}-{version}.ndjson.gz"
+    tmp_path = os.path.join(directory, f".{file_name}.tmp")
+    content_hash = hashlib.sha256()
+    count = 0
+    with open(tmp_path, "wb") as raw, gzip.GzipFile(fileobj=raw, mode="wb", mtime=0) as f:
+        for index, line in enumerate(iter_catalog_lines(profile, price_list, None, cursor)):
+            data = line.encode()
+            # The first line is the meta line
+            if index:
+                content_hash.update(data)
+            f.write(data)
+            count += 1
+    # Leave out the meta and end lines
+    count -= 2
+
+    current = get_snapshot_manifest(profile.name, price_list)
+    if (
+        current
+        and current["hash"] == content_hash.hexdigest()
+        and os.path.exists(os.path.join(directory, current["file_name"]))
+    ):
+        os.remove(tmp_path)
+        return current
+    os.replace(tmp_path, os.path.join(directory, file_name))
+
+    manifest = {
+        "pos_profile": profile.name,
+        "price_list": price_list,
+        "version": version,
+        "file_name": file_name,
+        "hash": content_hash.hexdigest(),
+        "items": count,
+        "size": os.path.getsize(os.path.join(directory, file_name)),
+        "created": str(now_datetime()),
+    }
+    manifest_path = _manifest_path(profile.name, price_list)
+    with open(f"{manifest_path}.tmp", "w") as f:
+        json.dump(manifest, f)
+    os.replace(f"{manifest_path}.tmp", manifest_path)
+
+    _remove_old_snapshots(directory, slug)
+    return manifest
+
+
+def _remove_old_snapshots(directory, slug):
+    files = sorted(
+        name for name in os.listdir(directory) if name.startswith(f"{slug}-") and name.endswith(".ndjson.gz")
+    )
+    for name in files[:-SNAPSHOTS_TO_KEEP]:
+        try:
+            os.remove(os.path.join(directory, name))
+        except OSError:
+            pass
+
+
+def build_all_catalog_snapshots():
+    """Scheduled job building snapshots of every enabled POS Profile.
+
+    Runs only when ``posa_catalog_snapshots`` is enabled in the site config.
+    """
+    if not cint(frappe.conf.get("posa_catalog_snapshots")):
+        return
+    for profile in frappe.get_all(
+        "POS Profile", filters={"disabled": 0}, fields=["name", "selling_price_list"]
+    ):
+        try:
+            build_catalog_snapshot(profile.name, profile.selling_price_list)
+        except Exception:
+            frappe.log_error(frappe.get_traceback(), "POS Awesome catalog snapshot")
+
+
+@frappe.whitelist()
+def enqueue_catalog_snapshot(pos_profile, price_list=None):
+    """Queue a snapshot rebuild of ``pos_profile``."""
+    frappe.has_permission("POS Profile", "write", pos_profile, throw=True)
+    frappe.enqueue(
+        "posawesome.posawesome.api.catalog_snapshot.build_catalog_snapshot",
+        queue="long",
+        job_id=f"posa_catalog_snapshot|{pos_profile}|{price_list or ''}",
+        deduplicate=True,
+        pos_profile=pos_profile,
+        price_list=price_list,
+    )
+
+
+@frappe.whitelist()
+def get_catalog_snapshot(pos_profile, price_list=None):
+    """Serve the latest catalog snapshot of a POS Profile.
+
+    The body is the gzip encoded NDJSON of :func:`stream_catalog`. The
+    content hash is sent as ``ETag``; a matching ``If-None-Match`` gets an
+    empty ``304 Not Modified`` response.
+    """
+    frappe.has_permission("POS Profile", "read", pos_profile, throw=True)
+    price_list = price_list or frappe.db.get_value("POS Profile", pos_profile, "selling_price_list")
+
+    manifest = get_snapshot_manifest(pos_profile, price_list)
+    path = manifest and os.path.join(_snapshot_dir(), manifest["file_name"])
+    if not manifest or not os.path.exists(path):
+        raise frappe.DoesNotExistError(_("No catalog snapshot has been built yet"))
+
+    etag = f'"{manifest["hash"]}"'
+    headers = {"ETag": etag, "Cache-Control": "private, no-cache", "X-Snapshot-Version": manifest["version"]}
+    if etag in (frappe.request.headers.get("If-None-Match") or ""):
+        return Response(status=304, headers=headers)
+
+    response = Response(
+        wrap_file(frappe.request.environ, open(path, "rb")),
+        mimetype="application/x-ndjson",
+        headers=headers,
+        direct_passthrough=True,
+    )
+    response.headers["Content-Encoding"] = "gzip"
+    response.headers["Content-Length"] = str(manifest["size"])
+    return response
@@ -0,0 +1,215 @@
+# Copyright (c) 2020, Youssef Restom and contributors
+# For license information, please see license.txt
+
+"""Opt-in timing and query-count instrumentation of the POS APIs.
+
+Enable it with ``bench --site mysite set-config posa_api_instrumentation 1``.
+Every call to a ``posawesome.posawesome.api`` method then records its wall
+time, time spent in SQL, number of queries and response size. The last
+samples of each method are kept in a Redis list used as a ring buffer, and
+:func:`get_api_metrics` aggregates them into percentiles.
+
+HTTP calls are measured by the ``before_request``/``after_request`` hooks;
+:func:`instrument` measures any other function, e.g. background jobs.
+"""
+
+import functools
+import json
+import time
+
+import frappe
+from frappe.utils import cint, now_datetime
+from frappe.utils.response import json_handler
+
+# Prefix of the methods measured by the request hooks
+API_PREFIX = "posawesome.posawesome.api."
+
+# Redis list of the latest samples of a method, newest first
+METRICS_KEY = "posa_api_metrics|{method}"
+# Redis set of the methods that have samples
+METRICS_INDEX_KEY = "posa_api_metrics_methods"
+
+# Samples kept per method unless ``posa_api_instrumentation_samples`` is set
+DEFAULT_SAMPLES = 500
+
+PERCENTILES = (50, 95, 99)
+
+
+def is_enabled():
+    return cint(frappe.conf.get("posa_api_instrumentation"))
+
+
+class Measurement:
+    """Wall time, SQL time and query count of a block of code.
+
+    Queries are counted by wrapping ``frappe.db.sql`` of the current
+    connection; nested measurements each see the queries run inside them.
+    """
+
+    def __init__(self, method):
+        self.method = method
+        self.queries = 0
+        self.db_time = 0.0
+
+    def start(self):
+        self._db = frappe.db
+        self._previous_sql = self._db.__dict__.get("sql")
+        sql = self._db.sql
+
+        def counted_sql(*args, **kwargs):
+            start = time.perf_counter()
+            try:
+                return sql(*args, **kwargs)
+            finally:
+                self.db_time += time.perf_counter() - start
+                self.queries += 1
+
+        self._db.sql = counted_sql
+        self._start = time.perf_counter()
+        return self
+
+    def stop(self, size=None):
+        wall = time.perf_counter() - self._start
+        if self._previous_sql is not None:
+            self._db.sql = self._previous_sql
+        else:
+            self._db.__dict__.pop("sql", None)
+        record_sample(
+            self.method,
+            {
+                "ts": str(now_datetime()),
+                "ms": round(wall * 1000, 3),
+                "db_ms": round(self.db_time * 1000, 3),
+                "queries": self.queries,
+                "bytes": size,
+            },
+        )
+
+
+def _payload_size(result):
+    try:
+        return len(json.dumps(result, default=json_handler, separators=(",", ":")))
+    except Exception:
+        return None
+
+
+def instrument(fn=None, *, method=None):
+    """Decorator recording the timings of ``fn`` when instrumentation is enabled.
+
+    The size recorded is the length of the JSON encoded return value.
+    """
+    if fn is None:
+        return functools.partial(instrument, method=method)
+
+    name = method or f"{fn.__module__}.{fn.__qualname__}"
+
+    @functools.wraps(fn)
+    def wrapper(*args, **kwargs):
+        if not is_enabled() or not getattr(frappe.local, "db", None):
+            return fn(*args, **kwargs)
+        measurement = Measurement(name).start()
+        result = None
+        try:
+            result = fn(*args, **kwargs)
+            return result
+        finally:
+            measurement.stop(_payload_size(result))
+
+    return wrapper
+
+
+def is_api_method(method):
+    """Return whether ``method`` is a whitelisted POS Awesome API function.
+
+    Only these are measured, so requests to made up method names cannot
+    create metrics keys.
+    """
+    if not method.startswith(API_PREFIX):
+        return False
+    try:
+        fn = frappe.get_attr(method)
+    except Exception:
+        return False
+    return fn in frappe.whitelisted
+
+
+def before_request():
+    """Start measuring a request to a POS Awesome API method."""
+    path = frappe.request.path if getattr(frappe.local, "request", None) else ""
+    method = path.rsplit("/method/", 1)[-1] if "/method/" in path else ""
+    if not is_enabled() or not is_api_method(method):
+        return
+    frappe.local.posa_measurement = Measurement(method).start()
+
+
+def after_request(response=None, request=None):
+    """Record the measurement started by :func:`before_request`."""
+    measurement = getattr(frappe.local, "posa_measurement", None)
+    if not measurement:
+        return
+    frappe.local.posa_measurement = None
+
+    size = None
+    if response is not None:
+        size = response.content_length
+        if size is None and not response.is_streamed:
+            size = len(response.get_data())
+    measurement.stop(size)
+
+
+def _max_samples():
+    return cint(frappe.conf.get("posa_api_instrumentation_samples")) or DEFAULT_SAMPLES
+
+
+def record_sample(method, sample):
+    """Push ``sample`` onto the ring buffer of ``method``."""
+    cache = frappe.cache()
+    key = cache.make_key(METRICS_KEY.format(method=method))
+    try:
+        pipe = cache.pipeline()
+        pipe.lpush(key, json.dumps(sample))
+        pipe.ltrim(key, 0, _max_samples() - 1)
+        pipe.sadd(cache.make_key(METRICS_INDEX_KEY), method)
+        pipe.execute()
+    except Exception:
+        frappe.logger("posawesome").warning("Could not record API metrics", exc_info=True)
+
+
+def get_samples(method):
+    """Return the recorded samples of ``method``, newest first."""
+    rows = frappe.cache().lrange(METRICS_KEY.format(method=method), 0, -1) or []
+    return [json.loads(row) for row in rows]
+
+
+def get_methods():
+    return sorted(frappe.safe_decode(m) for m in frappe.cache().smembers(METRICS_INDEX_KEY) or [])
+
+
+def percentile(values, pct):
+    """Return the ``pct`` percentile of ``values`` using the nearest-rank method."""
+    if not values:
+        return None
+    values = sorted(values)
+    rank = max(1, -(-pct * len(values) // 100))
+    return values[min(rank, len(values)) - 1]
+
+
+def summarize(samples):
+    """Aggregate samples into call count and p50/p95/p99 of each measure."""
+    summary = {"calls": len(samples), "last_call": samples[0]["ts"] if samples else None}
+    for measure in ("ms", "db_ms", "queries", "bytes"):
+        values = [s[measure] for s in samples if s.get(measure) is not None]
+        summary[measure] = {f"p{pct}": percentile(values, pct) for pct in PERCENTILES}
+        summary[measure]["max"] = max(values) if values else None
+    return summary
+
+
+def get_metrics(method=None):
+    """Return ``{method: summary}`` for ``method`` or every recorded method."""
+    methods = [method] if method else get_methods()
+    return {m: summarize(get_samples(m)) for m in methods}
+
+
+def clear_metrics():
+    keys = [METRICS_KEY.format(method=method) for method in get_methods()]
+    frappe.cache().delete_value([*keys, METRICS_INDEX_KEY])
@@ -21,7 +21,6 @@ from frappe.utils import (
     nowdate,
     strip_html_tags,
 )
-from frappe.utils.background_jobs import enqueue
 
 from posawesome.posawesome.api.payments import (
     redeeming_customer_credit,
@@ -31,7 +30,9 @@ from posawesome.posawesome.api.utilities import (
     set_batch_nos_for_bundels,
 )  # Updated imports
 
-from .items import get_stock_availability
+from .items import get_batch_qty_map, get_bin_qty_map, get_stock_availability
+from .submission_queue import enqueue_invoice_submission
+from .utils import get_warehouses
 
 
 def _sanitize_item_name(name: str) -> str:
@@ -58,36 +59,54 @@ def _apply_item_name_overrides(invoice_doc, overrides=None):
             item.name_overridden = 0
 
 
-def _get_available_stock(item):
-    """Return available stock qty for an item row."""
-    warehouse = item.get("warehouse")
-    batch_no = item.get("batch_no")
-    item_code = item.get("item_code")
-    if not item_code or not warehouse:
-        return 0
-    if batch_no:
-        return get_batch_qty(batch_no, warehouse) or 0
-    return get_stock_availability(item_code, warehouse)
-
-
 def _collect_stock_errors(items):
-    """Return list of items exceeding available stock."""
-    errors = []
+    """Return list of items exceeding available stock.
+
+    Requested stock quantities are summed per item, warehouse and batch
+    across all rows (including packed items) before being compared, so a
+    product split over several lines is validated against its total. All
+    availabilities are fetched with one ``Bin`` query and one batch ledger
+    query regardless of the number of rows. Rows without an item code or
+    warehouse have no stock available and are always reported.
+    """
+    requested = {}
     for d in items:
         if flt(d.get("qty")) < 0:
             continue
-        available = _get_available_stock(d)
-        requested = flt(d.get("stock_qty") or (flt(d.get("qty")) * flt(d.get("conversion_factor") or 1)))
-        if requested > available:
+        key = (d.get("item_code") or None, d.get("warehouse") or None, d.get("batch_no") or None)
+        requested[key] = requested.get(key, 0) + flt(
+            d.get("stock_qty") or (flt(d.get("qty")) * flt(d.get("conversion_factor") or 1))
+        )
+
+    if not requested:
+        return []
+
+    leaves = {
+        warehouse: get_warehouses(warehouse) for item, warehouse, _batch in requested if item and warehouse
+    }
+    all_leaves = {w for ws in leaves.values() for w in ws}
+    bin_qty = get_bin_qty_map({item for item, w, batch in requested if item and w and not batch}, all_leaves)
+    batch_qty = get_batch_qty_map({batch for item, w, batch in requested if item and w and batch}, all_leaves)
+
+    errors = []
+    for (item_code, warehouse, batch_no), qty in requested.items():
+        if not item_code or not warehouse:
+            available = 0
+        elif batch_no:
+            available = sum(batch_qty.get((batch_no, w), 0) for w in leaves[warehouse])
+        else:
+            available = sum(bin_qty.get((item_code, w), 0) for w in leaves[warehouse])
+        if qty > available:
             errors.append(
                 {
-                    "item_code": d.get("item_code"),
-                    "warehouse": d.get("warehouse"),
-                    "requested_qty": requested,
+                    "item_code": item_code,
+                    "warehouse": warehouse,
+                    "batch_no": batch_no,
+                    "requested_qty": qty,
                     "available_qty": available,
                 }
             )
-        return errors
+    return errors
 
 
 def _merge_duplicate_taxes(invoice_doc):
@@ -190,57 +209,175 @@ def get_latest_rate(from_currency: str, to_currency: str):
     return flt(rate), nowdate()
 
 
+# Field linking a return row to the row of the original invoice it returns
+RETURN_ROW_LINK_FIELDS = {"Sales Invoice": "sales_invoice_item", "POS Invoice": "pos_invoice_item"}
+
+
+def get_return_ledger(invoice_name, doctype="Sales Invoice"):
+    """Return the quantities of ``invoice_name`` that can still be returned.
+
+    A single query reads the rows of the invoice together with the
+    quantities returned by its submitted returns, grouped by item and by
+    the original row they link to. Returned quantities not linked to a row,
+    e.g. by returns made outside the POS, are taken from the rows of the
+    same item in row order.
+
+    Returns ``{"rows": [...], "items": {item_code: totals}}`` where every
+    row and total has ``qty``, ``returned_qty`` and ``returnable_qty``.
+    """
+    link_field = RETURN_ROW_LINK_FIELDS.get(doctype)
+    if not link_field:
+        frappe.throw(_("Returns against {0} are not supported").format(doctype))
+
+    entries = frappe.db.sql(
+        f"""
+        SELECT 0 AS is_return, item.name AS invoice_item, item.idx, item.item_code,
+            item.qty, item.stock_qty
+        FROM `tab{doctype} Item` item
+        WHERE item.parent = %(invoice)s AND item.parenttype = %(doctype)s
+        UNION ALL
+        SELECT 1, ret_item.`{link_field}`, NULL, ret_item.item_code,
+            SUM(ABS(ret_item.qty)), SUM(ABS(ret_item.stock_qty))
+        FROM `tab{doctype}` ret
+        JOIN `tab{doctype} Item` ret_item
+            ON ret_item.parent = ret.name AND ret_item.parenttype = %(doctype)s
+        WHERE ret.return_against = %(invoice)s AND ret.docstatus = 1 AND ret.is_return = 1
+        GROUP BY ret_item.item_code, ret_item.`{link_field}`
+        """,
+        {"invoice": invoice_name, "doctype": doctype},
+        as_dict=True,
+    )
+
+    rows = {
+        entry.invoice_item: frappe._dict(
+            invoice_item=entry.invoice_item,
+            idx=entry.idx,
+            item_code=entry.item_code,
+            qty=flt(entry.qty),
+            stock_qty=flt(entry.stock_qty),
+            returned_qty=0,
+        )
+        for entry in entries
+        if not entry.is_return
+    }
+    unlinked = {}
+    for entry in entries:
+        if not entry.is_return:
+            continue
+        row = rows.get(entry.invoice_item)
+        if row and row.item_code == entry.item_code:
+            row.returned_qty += flt(entry.qty)
+        else:
+            unlinked[entry.item_code] = unlinked.get(entry.item_code, 0) + flt(entry.qty)
+
+    ordered = sorted(rows.values(), key=lambda row: row.idx)
+    items = {}
+    for row in ordered:
+        if unlinked.get(row.item_code):
+            taken = min(unlinked[row.item_code], max(row.qty - row.returned_qty, 0))
+            row.returned_qty += taken
+            unlinked[row.item_code] -= taken
+        row.returned_qty = flt(row.returned_qty, 9)
+        row.returnable_qty = max(flt(row.qty - row.returned_qty, 9), 0)
+        row.returnable_stock_qty = (
+            flt(row.stock_qty / row.qty * row.returnable_qty, 9) if row.qty else row.returnable_qty
+        )
+
+        totals = items.setdefault(row.item_code, frappe._dict(qty=0, returned_qty=0, returnable_qty=0))
+        totals.qty += row.qty
+        totals.returned_qty += row.returned_qty
+        totals.returnable_qty += row.returnable_qty
+
+    return {"rows": ordered, "items": items}
+
+
+@frappe.whitelist()
+def get_returnable_items(invoice_name, doctype="Sales Invoice"):
+    """Return the quantities of ``invoice_name`` that can still be returned.
+
+    Used by the return dialog to prefill the maximum quantity of each row;
+    see :func:`get_return_ledger`.
+    """
+    frappe.has_permission(doctype, "read", invoice_name, throw=True)
+    return get_return_ledger(invoice_name, doctype)
+
+
 @frappe.whitelist()
 def validate_return_items(original_invoice_name, return_items, doctype="Sales Invoice"):
     """
     Ensure that return items do not exceed the quantity from the original invoice.
     """
-    original_invoice = frappe.get_doc(doctype, original_invoice_name)
-    original_item_qty = {}
-
-    for item in original_invoice.items:
-        original_item_qty[item.item_code] = original_item_qty.get(item.item_code, 0) + item.qty
-
-    returned_items = frappe.get_all(
-        doctype,
-        filters={
-            "return_against": original_invoice_name,
-            "docstatus": 1,
-            "is_return": 1,
-        },
-        fields=["name"],
-    )
+    if isinstance(return_items, str):
+        return_items = json.loads(return_items)
 
-    for returned_invoice in returned_items:
-        ret_doc = frappe.get_doc(doctype, returned_invoice.name)
-        for item in ret_doc.items:
-            if item.item_code in original_item_qty:
-                original_item_qty[item.item_code] -= abs(item.qty)
+    ledger = get_return_ledger(original_invoice_name, doctype)
+    rows = {row.invoice_item: row for row in ledger["rows"]}
+    link_field = RETURN_ROW_LINK_FIELDS[doctype]
 
+    # Quantities asked per original row and, for all rows, per item
+    row_qty = {}
+    item_qty = {}
     for item in return_items:
         item_code = item.get("item_code")
-        return_qty = abs(item.get("qty", 0))
-        if item_code in original_item_qty and return_qty > original_item_qty[item_code]:
-            return {
-                "valid": False,
-                "message": _("You are trying to return more quantity for item {0} than was sold.").format(
-                    item_code
-                ),
-            }
+        return_qty = abs(flt(item.get("qty")))
+        row = rows.get(item.get(link_field))
+        if row and row.item_code == item_code:
+            row_qty[row.invoice_item] = row_qty.get(row.invoice_item, 0) + return_qty
+        item_qty[item_code] = item_qty.get(item_code, 0) + return_qty
+
+    exceeded = [
+        rows[name].item_code for name, qty in row_qty.items() if flt(qty, 9) > rows[name].returnable_qty
+    ]
+    exceeded += [
+        item_code
+        for item_code, qty in item_qty.items()
+        if item_code in ledger["items"] and flt(qty, 9) > flt(ledger["items"][item_code].returnable_qty, 9)
+    ]
+    if exceeded:
+        return {
+            "valid": False,
+            "message": _("You are trying to return more quantity for item {0} than was sold.").format(
+                exceeded[0]
+            ),
+        }
 
     return {"valid": True}
 
 
+def _get_invoice_doctype(pos_profile):
+    """Return the invoice doctype the POS Profile creates."""
+    if pos_profile and frappe.db.get_value(
+        "POS Profile", pos_profile, "create_pos_invoice_instead_of_sales_invoice"
+    ):
+        return "POS Invoice"
+    return "Sales Invoice"
+
+
 @frappe.whitelist()
 def update_invoice(data):
     data = json.loads(data)
+    invoice_doc, exchange_rate_date = _build_invoice_doc(data)
+
+    invoice_doc.flags.ignore_permissions = True
+    frappe.flags.ignore_account_permission = True
+    invoice_doc.docstatus = 0
+    invoice_doc.save()
+
+    # Return both the invoice doc and the updated data
+    response = invoice_doc.as_dict()
+    response["conversion_rate"] = invoice_doc.conversion_rate
+    response["plc_conversion_rate"] = invoice_doc.plc_conversion_rate
+    response["exchange_rate_date"] = exchange_rate_date
+    return response
+
+
+def _build_invoice_doc(data):
+    """Build an unsaved invoice from the POS ``data`` with currencies and taxes applied.
+
+    Returns ``(invoice_doc, exchange_rate_date)``.
+    """
     # Determine doctype based on POS Profile setting
-    pos_profile = data.get("pos_profile")
-    doctype = "Sales Invoice"
-    if pos_profile and frappe.db.get_value(
-        "POS Profile", pos_profile, "create_pos_invoice_instead_of_sales_invoice"
-    ):
-        doctype = "POS Invoice"
+    doctype = _get_invoice_doctype(data.get("pos_profile"))
 
     # Ensure the document type is set for new invoices to prevent validation errors
     data.setdefault("doctype", doctype)
@@ -410,29 +547,14 @@ def update_invoice(data):
         invoice_doc.paid_amount = flt(sum(p.amount for p in invoice_doc.payments))
         invoice_doc.base_paid_amount = flt(sum(p.base_amount for p in invoice_doc.payments))
 
-    invoice_doc.flags.ignore_permissions = True
-    frappe.flags.ignore_account_permission = True
-    invoice_doc.docstatus = 0
-    invoice_doc.save()
-
-    # Return both the invoice doc and the updated data
-    response = invoice_doc.as_dict()
-    response["conversion_rate"] = invoice_doc.conversion_rate
-    response["plc_conversion_rate"] = invoice_doc.plc_conversion_rate
-    response["exchange_rate_date"] = exchange_rate_date
-    return response
+    return invoice_doc, exchange_rate_date
 
 
 @frappe.whitelist()
 def submit_invoice(invoice, data):
     data = json.loads(data)
     invoice = json.loads(invoice)
-    pos_profile = invoice.get("pos_profile")
-    doctype = "Sales Invoice"
-    if pos_profile and frappe.db.get_value(
-        "POS Profile", pos_profile, "create_pos_invoice_instead_of_sales_invoice"
-    ):
-        doctype = "POS Invoice"
+    doctype = _get_invoice_doctype(invoice.get("pos_profile"))
 
     invoice_name = invoice.get("name")
     if not invoice_name or not frappe.db.exists(doctype, invoice_name):
@@ -443,6 +565,129 @@ def submit_invoice(invoice, data):
         invoice_doc = frappe.get_doc(doctype, invoice_name)
         invoice_doc.update(invoice)
 
+    credit = _prepare_invoice_submission(invoice_doc, invoice, data)
+    _set_due_date(invoice_doc, data)
+    invoice_doc.save()
+
+    if _submits_in_background(invoice_doc.pos_profile):
+        enqueue_invoice_submission(invoice_doc, data, credit)
+    else:
+        invoice_doc.submit()
+        redeeming_customer_credit(invoice_doc, data, **credit)
+
+    return {"name": invoice_doc.name, "status": invoice_doc.docstatus}
+
+
+@frappe.whitelist()
+def checkout(invoice, data=None):
+    """Build, validate and submit a POS invoice in one call.
+
+    Does the work of :func:`update_invoice` followed by
+    :func:`submit_invoice`, but the invoice is built once and saved and
+    submitted by a single ``submit()``, so ERPNext validates and calculates
+    it once per sale. ``invoice`` may be a new invoice or a saved draft; a
+    draft saved by :func:`update_invoice` and not changed since is not built
+    again.
+    """
+    return _checkout(invoice, data)
+
+
+# Invoice fields set in the payment dialog that do not change lines or taxes
+CHECKOUT_FIELDS = (
+    "payments",
+    "is_pos",
+    "due_date",
+    "po_no",
+    "po_date",
+    "posa_delivery_date",
+    "posa_notes",
+    "shipping_address_name",
+    "contact_mobile",
+)
+
+
+def _sales_team_key(rows):
+    return sorted((row.get("sales_person"), flt(row.get("allocated_percentage"))) for row in rows or [])
+
+
+def _get_unchanged_draft(invoice):
+    """Return the saved draft of ``invoice`` if only checkout fields changed.
+
+    The draft must not have been modified since ``invoice`` was read and the
+    loyalty points and sales team must be as saved; the
+    :data:`CHECKOUT_FIELDS` of ``invoice`` are applied to it. Returns
+    ``None`` when the invoice has to be built again.
+    """
+    doctype = invoice.get("doctype")
+    name = invoice.get("name")
+    if doctype not in ("Sales Invoice", "POS Invoice") or not name or not invoice.get("modified"):
+        return None
+    if not frappe.db.exists(doctype, name):
+        return None
+
+    invoice_doc = frappe.get_doc(doctype, name)
+    if invoice_doc.docstatus != 0 or cstr(invoice_doc.modified) != cstr(invoice.get("modified")):
+        return None
+    if cint(invoice.get("redeem_loyalty_points")) != cint(invoice_doc.redeem_loyalty_points) or flt(
+        invoice.get("loyalty_points")
+    ) != flt(invoice_doc.loyalty_points):
+        return None
+    if _sales_team_key(invoice.get("sales_team")) != _sales_team_key(invoice_doc.get("sales_team")):
+        return None
+
+    invoice_doc.update({field: invoice[field] for field in CHECKOUT_FIELDS if field in invoice})
+    return invoice_doc
+
+
+def _checkout(invoice, data=None, allow_background=True):
+    """Do the work of :func:`checkout`.
+
+    With ``allow_background`` false the invoice is submitted right away,
+    even when its POS Profile submits invoices in background jobs.
+    """
+    invoice = json.loads(invoice) if isinstance(invoice, str) else invoice
+    data = json.loads(data) if isinstance(data, str) else (data or {})
+
+    invoice_doc = _get_unchanged_draft(invoice)
+    if not invoice_doc:
+        invoice_doc, _exchange_rate_date = _build_invoice_doc(invoice)
+    # Remarks and credit redemption use the totals
+    invoice_doc.calculate_taxes_and_totals()
+    credit = _prepare_invoice_submission(invoice_doc, invoice, data)
+    _set_due_date(invoice_doc, data)
+
+    if allow_background and _submits_in_background(invoice_doc.pos_profile):
+        invoice_doc.save()
+        enqueue_invoice_submission(invoice_doc, data, credit)
+    else:
+        invoice_doc.submit()
+        redeeming_customer_credit(invoice_doc, data, **credit)
+
+    return {"name": invoice_doc.name, "status": invoice_doc.docstatus}
+
+
+def _submits_in_background(pos_profile):
+    return frappe.get_value("POS Profile", pos_profile, "posa_allow_submissions_in_background_job")
+
+
+def _set_due_date(invoice_doc, data):
+    """Set the due date chosen at the counter before the invoice is saved.
+
+    Set on the document so the payment schedule and ledger entries use it.
+    """
+    if data.get("due_date"):
+        invoice_doc.due_date = data.get("due_date")
+        # A schedule saved with the draft's old due date is rebuilt on validate
+        if not invoice_doc.get("payment_terms_template"):
+            invoice_doc.set("payment_schedule", [])
+
+
+def _prepare_invoice_submission(invoice_doc, invoice, data):
+    """Get ``invoice_doc`` ready for submission without saving it.
+
+    Sets the remarks, customer credit advances and batches and validates
+    stock. Returns the keyword arguments of ``redeeming_customer_credit``.
+    """
     # Ensure item name overrides are respected on submit
     _apply_item_name_overrides(invoice_doc)
     if invoice.get("posa_delivery_date"):
@@ -532,55 +777,17 @@ def submit_invoice(invoice, data):
     invoice_doc.flags.ignore_permissions = True
     frappe.flags.ignore_account_permission = True
     invoice_doc.posa_is_printed = 1
-    invoice_doc.save()
 
-    if data.get("due_date"):
-        frappe.db.set_value(
-            invoice_doc.doctype,
-            invoice_doc.name,
-            "due_date",
-            data.get("due_date"),
-            update_modified=False,
-        )
-
-    if frappe.get_value(
-        "POS Profile",
-        invoice_doc.pos_profile,
-        "posa_allow_submissions_in_background_job",
-    ):
-        invoices_list = frappe.get_all(
-            invoice_doc.doctype,
-            filters={
-                "posa_pos_opening_shift": invoice_doc.posa_pos_opening_shift,
-                "docstatus": 0,
-                "posa_is_printed": 1,
-            },
-        )
-        for invoice in invoices_list:
-            enqueue(
-                method=submit_in_background_job,
-                queue="short",
-                timeout=1000,
-                is_async=True,
-                kwargs={
-                    "invoice": invoice.name,
-                    "doctype": invoice_doc.doctype,
-                    "invoice_doc": invoice_doc,
-                    "data": data,
-                    "is_payment_entry": is_payment_entry,
-                    "total_cash": total_cash,
-                    "cash_account": cash_account,
-                    "payments": payments,
-                },
-            )
-    else:
-        invoice_doc.submit()
-        redeeming_customer_credit(invoice_doc, data, is_payment_entry, total_cash, cash_account, payments)
-
-    return {"name": invoice_doc.name, "status": invoice_doc.docstatus}
+    return {
+        "is_payment_entry": is_payment_entry,
+        "total_cash": total_cash,
+        "cash_account": cash_account,
+        "payments": payments,
+    }
 
 
 def submit_in_background_job(kwargs):
+    # Kept for jobs enqueued before invoices went through the submission queue
     invoice = kwargs.get("invoice")
     doctype = kwargs.get("doctype") or "Sales Invoice"
     data = kwargs.get("data")
@@ -794,24 +1001,13 @@ def search_invoices_for_return(
         invoice_doc = frappe.get_doc(doctype, invoice.name)
 
         # Check if any items have already been returned
-        has_returns = frappe.get_all(
-            doctype,
-            filters={"return_against": invoice.name, "docstatus": 1},
-            fields=["name"],
-        )
-
-        if has_returns:
-            # Calculate returned quantity per item_code
-            returned_qty = {}
-            for ret_inv in has_returns:
-                ret_doc = frappe.get_doc(doctype, ret_inv.name)
-                for item in ret_doc.items:
-                    returned_qty[item.item_code] = returned_qty.get(item.item_code, 0) + abs(item.qty)
+        ledger = {row.invoice_item: row for row in get_return_ledger(invoice.name, doctype)["rows"]}
 
+        if any(row.returned_qty for row in ledger.values()):
             # Filter items with remaining qty
             filtered_items = []
             for item in invoice_doc.items:
-                remaining_qty = item.qty - returned_qty.get(item.item_code, 0)
+                remaining_qty = ledger[item.name].returnable_qty
                 if remaining_qty > 0:
                     new_item = item.as_dict().copy()
                     new_item["qty"] = remaining_qty
@@ -0,0 +1,103 @@
+# Copyright (c) 2020, Youssef Restom and contributors
+# For license information, please see license.txt
+
+import re
+
+import frappe
+
+# Characters with a special meaning in MariaDB boolean full-text queries
+_BOOLEAN_OPERATORS = re.compile(r"[+\-<>()~*\"@]+")
+
+# Default innodb_ft_min_token_size; shorter words are not in the FULLTEXT index
+MIN_TOKEN_SIZE = 3
+
+# Rank of each kind of match, lower is better
+RANK_EXACT_CODE = 0
+RANK_BARCODE = 1
+RANK_CODE_PREFIX = 2
+RANK_NAME_TOKEN = 3
+
+FULLTEXT_INDEX = "item_name_description_ft"
+# Redis key caching whether the FULLTEXT index exists, rechecked hourly so
+# sites that add it later start using it
+FULLTEXT_INDEX_CACHE_KEY = "posa_item_fulltext_index"
+
+
+def _search_tokens(search_value):
+    return _BOOLEAN_OPERATORS.sub(" ", search_value).split()
+
+
+def _boolean_query(tokens):
+    """Return a boolean-mode query requiring every token as a prefix."""
+    return " ".join(f"+{token}*" for token in tokens)
+
+
+def _escape_like(value):
+    return value.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+
+
+def _supports_fulltext():
+    if frappe.db.db_type != "mariadb":
+        return False
+    cache = frappe.cache()
+    has_index = cache.get_value(FULLTEXT_INDEX_CACHE_KEY)
+    if has_index is None:
+        has_index = int(bool(frappe.db.sql("SHOW INDEX FROM `tabItem` WHERE Key_name = %s", FULLTEXT_INDEX)))
+        cache.set_value(FULLTEXT_INDEX_CACHE_KEY, has_index, expires_in_sec=3600)
+    return bool(has_index)
+
+
+def search_items(search_value, limit=500):
+    """Return ``{item_code: rank}`` for items matching ``search_value``.
+
+    Matches come from, in order of rank, the exact item code, an exact
+    barcode, an item code prefix and word prefixes of the item name or
+    description. The code lookups use the primary key and the barcode index,
+    while name and description matching uses the ``item_name_description_ft``
+    FULLTEXT index instead of ``LIKE '%term%'`` scans.
+
+    Returns ``None`` when full-text search is not available, a word is too
+    short to be indexed or nothing matches, so callers can fall back to
+    ``LIKE`` filters, which also find substrings of item codes.
+    """
+    search_value = (search_value or "").strip()
+    tokens = _search_tokens(search_value)
+    if not search_value or not _supports_fulltext():
+        return None
+    if any(len(token) < MIN_TOKEN_SIZE for token in tokens):
+        return None
+
+    params = {
+        "term": search_value,
+        "prefix": _escape_like(search_value) + "%",
+        "boolean": _boolean_query(tokens),
+        "limit": int(limit or 500),
+    }
+    token_match = ""
+    if params["boolean"]:
+        token_match = f"""
+            UNION ALL
+            SELECT name, {RANK_NAME_TOKEN} FROM `tabItem`
+            WHERE MATCH(item_name, description) AGAINST (%(boolean)s IN BOOLEAN MODE)
+        """
+
+    rows = frappe.db.sql(
+        f"""
+        SELECT hits.name, MIN(hits.rnk) AS rnk
+        FROM (
+            SELECT name, {RANK_EXACT_CODE} AS rnk FROM `tabItem` WHERE name = %(term)s
+            UNION ALL
+            SELECT parent, {RANK_BARCODE} FROM `tabItem Barcode`
+            WHERE barcode = %(term)s AND parenttype = 'Item'
+            UNION ALL
+            SELECT name, {RANK_CODE_PREFIX} FROM `tabItem` WHERE name LIKE %(prefix)s
+            {token_match}
+        ) hits
+        GROUP BY hits.name
+        ORDER BY rnk, hits.name
+        LIMIT %(limit)s
+        """,
+        params,
+    )
+
+    return {name: rank for name, rank in rows} or None
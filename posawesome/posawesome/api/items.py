@@ -1,6 +1,7 @@
 # Copyright (c) 2020, Youssef Restom and contributors
 # For license information, please see license.txt
 
+import base64
 import json
 
 import frappe
@@ -10,11 +11,23 @@ from erpnext.stock.doctype.batch.batch import (
 )
 from erpnext.stock.get_item_details import get_item_details
 from frappe import _
-from frappe.utils import cstr, flt, get_datetime, nowdate
+from frappe.utils import add_to_date, cint, cstr, flt, get_datetime, now_datetime, nowdate
 from frappe.utils.background_jobs import enqueue
 from frappe.utils.caching import redis_cache
 
-from .utils import HAS_VARIANTS_EXCLUSION, get_item_groups, expand_item_groups
+from .catalog_cache import CatalogCache
+from .item_search import search_items
+from .prices import apply_customer_prices, get_item_prices
+from .scan import build_scan_results, get_barcode_map, resolve_codes
+from .sellable_items import get_sellable_item_page, is_sellable_items_ready
+from .utils import (
+    HAS_VARIANTS_EXCLUSION,
+    ITEM_GROUP_TREE_CACHE_KEY,
+    expand_item_groups,
+    filters_to_list,
+    get_item_groups,
+    get_warehouses,
+)
 
 
 def normalize_brand(brand: str) -> str:
@@ -22,6 +35,59 @@ def normalize_brand(brand: str) -> str:
     return cstr(brand).strip().lower()
 
 
+# Item rows read per query when a get_items call has no page limit
+ITEMS_BATCH_SIZE = 100
+
+# Repeated string fields that are dictionary encoded in columnar payloads
+COLUMNAR_DICTIONARY_FIELDS = (
+    "stock_uom",
+    "item_group",
+    "brand",
+    "currency",
+    "price_list_currency",
+)
+
+
+def to_columnar(rows, dictionary_fields=COLUMNAR_DICTIONARY_FIELDS):
+    """Convert a list of row dicts into a compact columnar payload.
+
+    Every key becomes a column holding one value per row, so key names are
+    sent once instead of once per row. Values of ``dictionary_fields`` are
+    replaced by indexes into ``dictionaries[field]``; ``None`` is kept as is.
+    """
+    columns = []
+    seen = set()
+    for row in rows:
+        for key in row:
+            if key not in seen:
+                seen.add(key)
+                columns.append(key)
+
+    data = {column: [] for column in columns}
+    dictionaries = {field: [] for field in dictionary_fields if field in seen}
+    lookups = {field: {} for field in dictionaries}
+
+    for row in rows:
+        for column in columns:
+            value = row.get(column)
+            lookup = lookups.get(column)
+            if lookup is not None and value is not None:
+                index = lookup.get(value)
+                if index is None:
+                    index = lookup[value] = len(dictionaries[column])
+                    dictionaries[column].append(value)
+                value = index
+            data[column].append(value)
+
+    return {
+        "format": "columnar",
+        "length": len(rows),
+        "columns": columns,
+        "data": data,
+        "dictionaries": dictionaries,
+    }
+
+
 def get_stock_availability(item_code, warehouse):
     """Return total available quantity for an item in the given warehouse.
 
@@ -30,14 +96,10 @@ def get_stock_availability(item_code, warehouse):
     to provide an accurate availability figure.
     """
 
-    if not warehouse:
+    warehouses = get_warehouses(warehouse)
+    if not warehouses:
         return 0.0
 
-    warehouses = [warehouse]
-    if frappe.db.get_value("Warehouse", warehouse, "is_group"):
-        # Include all child warehouses when a group warehouse is set
-        warehouses = frappe.db.get_descendants("Warehouse", warehouse) or []
-
     rows = frappe.get_all(
         "Bin",
         fields=["sum(actual_qty) as actual_qty"],
@@ -47,6 +109,104 @@ def get_stock_availability(item_code, warehouse):
     return flt(rows[0].actual_qty) if rows else 0.0
 
 
+def _batch_ledger_query(batch_filter):
+    """Return a SQL subquery yielding signed batch movements.
+
+    Rows carry ``item_code``, ``batch_no``, ``warehouse`` and ``qty`` from
+    legacy ``Stock Ledger Entry.batch_no`` rows and from submitted
+    ``Serial and Batch Bundle`` entries. ``batch_filter`` is a condition on
+    the ``item_code``/``batch_no`` columns written against the alias ``src``
+    and must also restrict ``warehouse IN %(warehouses)s``.
+    """
+    legacy = f"""
+        SELECT src.item_code, src.batch_no, src.warehouse, src.actual_qty AS qty
+        FROM `tabStock Ledger Entry` src
+        WHERE src.is_cancelled = 0
+            AND IFNULL(src.batch_no, '') != ''
+            AND {batch_filter}
+    """
+    if not frappe.db.table_exists("Serial and Batch Bundle"):
+        return legacy
+
+    # Bundle backed ledger rows are counted from the bundle entries instead
+    legacy += " AND IFNULL(src.serial_and_batch_bundle, '') = ''"
+    bundles = f"""
+        SELECT src.item_code, src.batch_no, src.warehouse, src.qty
+        FROM (
+            SELECT sbb.item_code, sbe.batch_no, sbe.warehouse, sbe.qty
+            FROM `tabSerial and Batch Bundle` sbb
+            INNER JOIN `tabSerial and Batch Entry` sbe ON sbe.parent = sbb.name
+            WHERE sbb.is_cancelled = 0 AND sbb.docstatus = 1
+        ) src
+        WHERE IFNULL(src.batch_no, '') != ''
+            AND {batch_filter}
+    """
+    return f"{legacy} UNION ALL {bundles}"
+
+
+def get_batch_qty_bulk(item_codes, warehouse):
+    """Return positive batch quantities for many items in a single query.
+
+    Quantities are summed across all child warehouses when ``warehouse`` is
+    a group. Each row carries ``item_code``, ``batch_no``, ``batch_qty``,
+    ``expiry_date``, ``manufacturing_date`` and ``batch_price``.
+    """
+    warehouses = get_warehouses(warehouse)
+    if not item_codes or not warehouses:
+        return []
+
+    ledger = _batch_ledger_query("src.item_code IN %(item_codes)s AND src.warehouse IN %(warehouses)s")
+    return frappe.db.sql(
+        f"""
+        SELECT
+            q.item_code,
+            q.batch_no,
+            SUM(q.qty) AS batch_qty,
+            b.expiry_date,
+            b.manufacturing_date,
+            b.posa_batch_price AS batch_price
+        FROM ({ledger}) q
+        INNER JOIN `tabBatch` b ON b.name = q.batch_no
+        GROUP BY q.item_code, q.batch_no, b.expiry_date, b.manufacturing_date, b.posa_batch_price
+        HAVING SUM(q.qty) > 0
+        ORDER BY q.item_code, b.expiry_date, q.batch_no
+        """,
+        {"item_codes": tuple(item_codes), "warehouses": tuple(warehouses)},
+        as_dict=True,
+    )
+
+
+def get_batch_qty_map(batch_nos, warehouses):
+    """Return ``{(batch_no, warehouse): qty}`` for the given leaf warehouses."""
+    if not batch_nos or not warehouses:
+        return {}
+
+    ledger = _batch_ledger_query("src.batch_no IN %(batch_nos)s AND src.warehouse IN %(warehouses)s")
+    rows = frappe.db.sql(
+        f"""
+        SELECT q.batch_no, q.warehouse, SUM(q.qty) AS qty
+        FROM ({ledger}) q
+        GROUP BY q.batch_no, q.warehouse
+        """,
+        {"batch_nos": tuple(batch_nos), "warehouses": tuple(warehouses)},
+        as_dict=True,
+    )
+    return {(d.batch_no, d.warehouse): flt(d.qty) for d in rows}
+
+
+def get_bin_qty_map(item_codes, warehouses):
+    """Return ``{(item_code, warehouse): actual_qty}`` from ``Bin``."""
+    if not item_codes or not warehouses:
+        return {}
+
+    rows = frappe.get_all(
+        "Bin",
+        fields=["item_code", "warehouse", "actual_qty"],
+        filters={"item_code": ["in", list(item_codes)], "warehouse": ["in", list(warehouses)]},
+    )
+    return {(d.item_code, d.warehouse): flt(d.actual_qty) for d in rows}
+
+
 @frappe.whitelist()
 def get_available_qty(items):
     """Return available stock quantity for given items.
@@ -102,11 +262,21 @@ def get_items(
     include_description=False,
     include_image=False,
     item_groups=None,
+    format=None,
+    cursor=None,
 ):
+    """Return sellable items of a POS Profile with their details.
+
+    Pages are walked with keyset pagination on ``(item_name, name)``. Pass
+    ``cursor`` (an empty string for the first page) to receive
+    ``{"items": [...], "next_cursor": ...}`` and hand ``next_cursor`` back to
+    fetch the following page; ``next_cursor`` is ``None`` after the last page.
+    Without ``cursor`` a plain list is returned and ``start_after``/``offset``
+    keep working as before.
+    """
     _pos_profile = json.loads(pos_profile)
-    use_price_list = _pos_profile.get("posa_use_server_cache")
+    use_server_cache = _pos_profile.get("posa_use_server_cache")
     pos_profile_name = _pos_profile.get("name")
-    warehouse = _pos_profile.get("warehouse")
     ttl = _pos_profile.get("posa_server_cache_duration")
     if ttl:
         ttl = int(ttl) * 60
@@ -118,39 +288,69 @@ def get_items(
             item_groups = []
     item_groups = item_groups or get_item_groups(pos_profile_name)
     item_groups = expand_item_groups(item_groups)
-    item_groups_tuple = tuple(sorted(item_groups)) if item_groups else tuple()
 
-    @redis_cache(ttl=ttl or 300)
-    def __get_items(
-        _pos_profile_name,
-        _warehouse,
-        price_list,
-        customer,
-        search_value,
-        limit,
-        offset,
-        start_after,
-        modified_after,
-        item_group,
-        include_description,
-        include_image,
-        item_groups_tuple,
-    ):
-        return _get_items(
-            pos_profile,
-            price_list,
-            item_group,
-            search_value,
-            customer,
-            limit,
-            offset,
-            start_after,
-            modified_after,
-            include_description,
-            include_image,
-            list(item_groups_tuple),
+    # Cache item pages and per-item details separately so that searches and
+    # overlapping pages reuse the same entries instead of storing whole
+    # result sets per set of arguments.
+    catalog_cache = None
+    if use_server_cache:
+        catalog_cache = CatalogCache(
+            pos_profile_name,
+            warehouse=_pos_profile.get("warehouse"),
+            price_list=price_list or _pos_profile.get("selling_price_list"),
+            ttl=ttl or 300,
         )
 
+    # Plain catalog pages can be read from the materialized sellable items
+    # table, which already has the profile filters applied.
+    use_sellable_items = (
+        is_sellable_items_ready(pos_profile_name)
+        and not search_value
+        and not modified_after
+        and not include_description
+        and not include_image
+    )
+
+    def _get_page(**kwargs):
+        if use_sellable_items:
+            return get_sellable_item_page(pos_profile_name, **kwargs)
+        if not catalog_cache or search_value:
+            return frappe.get_all("Item", **kwargs)
+        key = CatalogCache.page_key(kwargs)
+        rows = catalog_cache.get(key)
+        if rows is None:
+            rows = frappe.get_all("Item", **kwargs)
+            catalog_cache.set(key, rows)
+        return rows
+
+    def _get_details(pos_profile, items_data, price_list, customer):
+        if not catalog_cache:
+            details = get_items_details(
+                json.dumps(pos_profile),
+                json.dumps(items_data),
+                price_list=price_list,
+                customer=customer,
+            )
+            return {d["item_code"]: d for d in details}
+
+        # Cached details carry base prices shared by all customers; customer
+        # specific prices are overlaid afterwards.
+        detail_map = catalog_cache.get_many([d.item_code for d in items_data])
+        missing = [d for d in items_data if d.item_code not in detail_map]
+        if missing:
+            details = get_items_details(
+                json.dumps(pos_profile),
+                json.dumps(missing, default=str),
+                price_list=price_list,
+            )
+            fresh = {d.item_code: {} for d in missing}
+            fresh.update({d["item_code"]: d for d in details})
+            catalog_cache.set_many(fresh)
+            detail_map.update(fresh)
+        if customer:
+            apply_customer_prices([d for d in detail_map.values() if d], price_list, customer)
+        return detail_map
+
     def _get_items(
         pos_profile,
         price_list,
@@ -164,6 +364,7 @@ def get_items(
         include_description=False,
         include_image=False,
         item_groups=None,
+        cursor=None,
     ):
         pos_profile = json.loads(pos_profile)
 
@@ -195,8 +396,15 @@ def get_items(
 
         # Build ORM filters
         filters = {"disabled": 0, "is_sales_item": 1, "is_fixed_asset": 0}
-        if start_after:
-            filters["item_name"] = [">", start_after]
+
+        # Keyset position as (item_name, name) of the last row already served.
+        # A legacy ``start_after`` only carries the item name.
+        after = None
+        if cursor:
+            after = _decode_page_cursor(cursor)
+        elif start_after:
+            after = (start_after, None)
+
         if modified_after:
             try:
                 parsed_modified_after = get_datetime(modified_after)
@@ -211,6 +419,7 @@ def get_items(
         # Add search conditions
         or_filters = []
         item_code_for_search = None
+        search_ranks = None
         data = {}
         if search_value:
             data = search_serial_or_batch_or_barcode_number(search_value, search_serial_no, search_batch_no)
@@ -218,7 +427,11 @@ def get_items(
             min_search_len = 2
 
             if use_limit_search:
-                if len(search_value) >= min_search_len:
+                if len(search_value) >= min_search_len and not data.get("item_code"):
+                    search_ranks = search_items(search_value, search_limit)
+                if search_ranks is not None:
+                    filters["name"] = ["in", list(search_ranks) or [""]]
+                elif len(search_value) >= min_search_len:
                     or_filters = [
                         ["name", "like", f"{item_code}%"],
                         ["item_name", "like", f"{item_code}%"],
@@ -249,7 +462,7 @@ def get_items(
         # Determine limit
         limit_page_length = None
         limit_start = None
-        order_by = "item_name asc"
+        order_by = "item_name asc, name asc"
 
         # When a specific search term is provided, fetch all matching
         # items. Applying a limit in this scenario can truncate results
@@ -257,7 +470,7 @@ def get_items(
         if not search_value:
             if limit is not None:
                 limit_page_length = limit
-                if offset and not start_after:
+                if offset and not after:
                     limit_start = offset
             elif use_limit_search:
                 limit_page_length = search_limit
@@ -283,59 +496,88 @@ def get_items(
         fields += ["image"] if include_image else []
 
         page_start = limit_start or 0
-        page_size = limit_page_length or 100
+        page_size = limit_page_length or ITEMS_BATCH_SIZE
+        first_batch = True
+        consumed = None
+        next_cursor = None
+
+        def _get_batch(get_page, batch_or_filters):
+            """Return the next ``page_size`` rows after ``after`` in ``order_by`` order.
+
+            The keyset condition ``(item_name, name) > after`` is split into an
+            equal name and a greater name query, so the database compares names
+            with its own collation. The equal name query passes its conditions
+            as a list so the bound on ``name`` does not replace a search
+            restriction on it.
+            """
+            kwargs = {"or_filters": batch_or_filters or None, "fields": fields, "order_by": order_by}
+            if not after:
+                return get_page(
+                    filters=filters, limit_start=page_start, limit_page_length=page_size, **kwargs
+                )
+
+            rows = []
+            if after[1] is not None:
+                rows = get_page(
+                    filters=[
+                        *filters_to_list(filters),
+                        ["item_name", "=", after[0]],
+                        ["name", ">", after[1]],
+                    ],
+                    limit_start=0,
+                    limit_page_length=page_size,
+                    **kwargs,
+                )
+            if len(rows) < page_size:
+                rows = [
+                    *rows,
+                    *get_page(
+                        filters={**filters, "item_name": [">", after[0]]},
+                        limit_start=0,
+                        limit_page_length=page_size - len(rows),
+                        **kwargs,
+                    ),
+                ]
+            return rows
 
         while True:
-            items_data = frappe.get_all(
-                "Item",
-                filters=filters,
-                or_filters=or_filters if or_filters else None,
-                fields=fields,
-                limit_start=page_start,
-                limit_page_length=page_size,
-                order_by=order_by,
-            )
+            items_data = _get_batch(_get_page, or_filters)
 
-            if not items_data and item_code_for_search and page_start == (limit_start or 0):
-                items_data = frappe.get_all(
-                    "Item",
-                    filters=filters,
-                    or_filters=[
+            if not items_data and item_code_for_search and first_batch:
+                items_data = _get_batch(
+                    lambda **kwargs: frappe.get_all("Item", **kwargs),
+                    [
                         ["name", "like", f"%{item_code_for_search}%"],
                         ["item_name", "like", f"%{item_code_for_search}%"],
                         ["item_code", "like", f"%{item_code_for_search}%"],
                     ],
-                    fields=fields,
-                    limit_start=page_start,
-                    limit_page_length=page_size,
-                    order_by=order_by,
                 )
+            first_batch = False
 
             if not items_data:
                 break
 
-            details = get_items_details(
-                json.dumps(pos_profile),
-                json.dumps(items_data),
-                price_list=price_list,
-                customer=customer,
-            )
-            detail_map = {d["item_code"]: d for d in details}
+            detail_map = _get_details(pos_profile, items_data, price_list, customer)
+
+            template_attr_map = {}
+            variant_attr_map = {}
+            if posa_show_template_items:
+                template_attr_map, variant_attr_map = get_items_attributes_bulk(
+                    [d.name for d in items_data if d.has_variants],
+                    [d.name for d in items_data if d.variant_of],
+                )
 
             for item in items_data:
                 item_code = item.item_code
                 detail = detail_map.get(item_code, {})
+                consumed = (item.item_name, item.name)
 
                 attributes = ""
-                if pos_profile.get("posa_show_template_items") and item.has_variants:
-                    attributes = get_item_attributes(item.name)
+                if posa_show_template_items and item.has_variants:
+                    attributes = template_attr_map.get(item.name, [])
                 item_attributes = ""
-                if pos_profile.get("posa_show_template_items") and item.variant_of:
-                    item_attributes = frappe.get_all(
-                        "Item Variant Attribute",
-                        fields=["attribute", "attribute_value"],
-                        filters={"parent": item.name, "parentfield": "attributes"},
-                    )
+                if posa_show_template_items and item.variant_of:
+                    item_attributes = variant_attr_map.get(item.name, [])
 
                 if (
                     posa_display_items_in_stock
@@ -358,45 +600,243 @@ def get_items(
                     break
 
             if limit_page_length and len(result) >= limit_page_length:
+                next_cursor = _encode_page_cursor(*consumed)
                 break
 
-            page_start += len(items_data)
             if len(items_data) < page_size:
                 break
 
-        return result[:limit_page_length] if limit_page_length else result
+            # Continue right after the last examined row instead of
+            # re-scanning everything before it with a growing offset.
+            after = (items_data[-1].item_name, items_data[-1].name)
 
-    if use_price_list:
-        return __get_items(
-            pos_profile_name,
-            warehouse,
-            price_list,
-            customer,
-            search_value,
-            limit,
-            offset,
-            start_after,
-            modified_after,
-            item_group,
-            include_description,
-            include_image,
-            item_groups_tuple,
+        if search_ranks:
+            result.sort(key=lambda row: search_ranks.get(row.get("name"), len(search_ranks)))
+        if search_value:
+            next_cursor = None
+
+        return (result[:limit_page_length] if limit_page_length else result), next_cursor
+
+    result, next_cursor = _get_items(
+        pos_profile,
+        price_list,
+        item_group,
+        search_value,
+        customer,
+        limit,
+        offset,
+        start_after,
+        modified_after,
+        include_description,
+        include_image,
+        item_groups,
+        cursor,
+    )
+
+    if format == "columnar":
+        result = to_columnar(result)
+    if cursor is not None:
+        return {"items": result, "next_cursor": next_cursor}
+    return result
+
+
+def _encode_page_cursor(item_name, name):
+    """Return an opaque ``get_items`` page cursor."""
+    return base64.urlsafe_b64encode(json.dumps([item_name, name]).encode()).decode()
+
+
+def _decode_page_cursor(cursor):
+    """Return the ``(item_name, name)`` keyset position stored in ``cursor``."""
+    try:
+        item_name, name = json.loads(base64.urlsafe_b64decode(cstr(cursor).encode()).decode())
+    except Exception:
+        frappe.throw(_("Invalid items cursor"))
+    return item_name, name
+
+
+# Changes made this recently are read again by the next delta call, so rows
+# saved before a sync but committed after it are not missed
+DELTA_SAFETY_SECONDS = 300
+
+# Changes returned per get_items_delta call
+DELTA_PAGE_SIZE = 1000
+
+
+def _encode_items_cursor(timestamp):
+    """Return an opaque cursor for the given change timestamp."""
+    payload = json.dumps({"v": 1, "ts": cstr(timestamp)})
+    return base64.urlsafe_b64encode(payload.encode()).decode()
+
+
+def _get_delta_horizon():
+    """Return the time up to which every change is assumed to be committed."""
+    return add_to_date(now_datetime(), seconds=-DELTA_SAFETY_SECONDS)
+
+
+def new_items_cursor():
+    """Return the cursor to store before a full catalog load."""
+    return _encode_items_cursor(_get_delta_horizon())
+
+
+def _decode_items_cursor(cursor):
+    """Return the change timestamp stored in ``cursor`` or ``None``."""
+    if not cursor:
+        return None
+    try:
+        payload = json.loads(base64.urlsafe_b64decode(cstr(cursor).encode()).decode())
+        return get_datetime(payload["ts"])
+    except Exception:
+        frappe.throw(_("Invalid items cursor"))
+
+
+def _get_item_changes(since, price_list, warehouse):
+    """Return ``(item_code, modified)`` of the rows touched after ``since``, oldest first.
+
+    Changes are collected from ``Item``, ``Item Price`` (for the given price
+    list), ``Item Barcode``, ``UOM Conversion Detail`` and ``Bin`` rows, and
+    deleted items from ``Deleted Document``.
+    """
+    changes = []
+    changes.extend(frappe.db.sql("select name, modified from `tabItem` where modified > %s", since))
+    changes.extend(
+        frappe.db.sql(
+            """select item_code, modified from `tabItem Price`
+            where price_list = %s and modified > %s""",
+            (price_list, since),
         )
-    else:
-        return _get_items(
-            pos_profile,
-            price_list,
-            item_group,
-            search_value,
-            customer,
-            limit,
-            offset,
-            start_after,
-            modified_after,
-            include_description,
-            include_image,
-            item_groups,
+    )
+    changes.extend(
+        frappe.db.sql(
+            """select parent, modified from `tabItem Barcode`
+            where parenttype = 'Item' and modified > %s""",
+            since,
+        )
+    )
+    changes.extend(
+        frappe.db.sql(
+            """select parent, modified from `tabUOM Conversion Detail`
+            where parenttype = 'Item' and modified > %s""",
+            since,
+        )
+    )
+
+    warehouses = get_warehouses(warehouse)
+    if warehouses:
+        changes.extend(
+            frappe.db.sql(
+                """select item_code, modified from `tabBin`
+                where warehouse in %s and modified > %s""",
+                (tuple(warehouses), since),
+            )
+        )
+
+    changes.extend(
+        frappe.db.sql(
+            """select deleted_name, creation from `tabDeleted Document`
+            where deleted_doctype = 'Item' and creation > %s""",
+            since,
+        )
+    )
+
+    return sorted(((code, modified) for code, modified in changes if code), key=lambda change: change[1])
+
+
+@frappe.whitelist()
+def get_items_delta(pos_profile, cursor=None, price_list=None, customer=None):
+    """Return catalog changes since ``cursor``.
+
+    Unlike ``get_items(modified_after=...)`` this also picks up price, barcode,
+    UOM and stock changes. The response contains the changed sellable items
+    with their details, the codes of items that were deleted or are no longer
+    sellable under the profile, and the cursor to pass on the next call. When
+    no cursor is given only a fresh cursor is returned; clients should request
+    it before starting a full load so no change is missed.
+
+    ``modified`` is set when a row is saved, not when it is committed, so the
+    cursor never moves past :data:`DELTA_SAFETY_SECONDS` ago and recent
+    changes are returned again by the next call. At most
+    :data:`DELTA_PAGE_SIZE` changes are returned per call; ``has_more`` tells
+    to call again with the new cursor right away.
+    """
+    _pos_profile = json.loads(pos_profile)
+    price_list = price_list or _pos_profile.get("selling_price_list")
+    since = _decode_items_cursor(cursor)
+    horizon = _get_delta_horizon()
+
+    if not since:
+        return {"items": [], "removed": [], "cursor": _encode_items_cursor(horizon), "has_more": False}
+
+    page = []
+    has_more = False
+    for code, modified in _get_item_changes(since, price_list, _pos_profile.get("warehouse")):
+        # Pages end between two change times already committed, so the
+        # next page starts right after this one
+        if len(page) >= DELTA_PAGE_SIZE and page[-1][1] <= horizon and modified > page[-1][1]:
+            has_more = True
+            break
+        page.append((code, modified))
+
+    changed = {code for code, _modified in page}
+    next_since = page[-1][1] if has_more else max(since, horizon)
+
+    items = []
+    if changed:
+        item_groups = get_item_groups(_pos_profile.get("name"))
+        filters = {
+            "name": ["in", list(changed)],
+            "disabled": 0,
+            "is_sales_item": 1,
+            "is_fixed_asset": 0,
+        }
+        if item_groups:
+            filters["item_group"] = ["in", item_groups]
+        if not _pos_profile.get("posa_show_template_items"):
+            filters.update(HAS_VARIANTS_EXCLUSION)
+        if _pos_profile.get("posa_hide_variants_items"):
+            filters["variant_of"] = ["is", "not set"]
+
+        items_data = frappe.get_all(
+            "Item",
+            filters=filters,
+            fields=[
+                "name",
+                "item_code",
+                "item_name",
+                "stock_uom",
+                "is_stock_item",
+                "has_variants",
+                "variant_of",
+                "item_group",
+                "idx",
+                "has_batch_no",
+                "has_serial_no",
+                "max_discount",
+                "brand",
+            ],
+            order_by="item_name asc",
         )
+        details = get_items_details(
+            json.dumps(_pos_profile),
+            json.dumps(items_data, default=str),
+            price_list=price_list,
+            customer=customer,
+        )
+        detail_map = {d["item_code"]: d for d in details}
+        for item in items_data:
+            row = {}
+            row.update(item)
+            row.update(detail_map.get(item.item_code, {}))
+            items.append(row)
+
+    # Deleted items and items no longer sellable under the profile
+    removed = changed - {item["item_code"] for item in items}
+
+    return {
+        "items": items,
+        "removed": sorted(removed),
+        "cursor": _encode_items_cursor(next_since),
+        "has_more": has_more,
+    }
 
 
 @frappe.whitelist()
@@ -424,6 +864,75 @@ def get_items_count(pos_profile, item_groups=None):
     return frappe.db.count("Item", filters)
 
 
+@frappe.whitelist()
+def get_item_group_tree(pos_profile):
+    """Return the item group tree of a POS Profile with sellable item counts.
+
+    Each node carries ``name``, ``parent``, ``is_group``, ``item_count`` (items
+    in the node and all of its descendants) and ``children``. Counts for the
+    whole tree come from one grouped query over the nested-set bounds and
+    are cached until an Item, Item Group or POS Profile changes.
+    """
+    pos_profile = json.loads(pos_profile)
+    profile_name = pos_profile.get("name")
+
+    tree = frappe.cache().hget(ITEM_GROUP_TREE_CACHE_KEY, profile_name)
+    if tree is None:
+        tree = _build_item_group_tree(pos_profile)
+        frappe.cache().hset(ITEM_GROUP_TREE_CACHE_KEY, profile_name, tree)
+    return tree
+
+
+def _build_item_group_tree(pos_profile):
+    item_groups = get_item_groups(pos_profile.get("name"))
+
+    item_conditions = ["i.disabled = 0", "i.is_sales_item = 1", "i.is_fixed_asset = 0"]
+    if not pos_profile.get("posa_show_template_items"):
+        item_conditions.append("i.has_variants = 0")
+    if pos_profile.get("posa_hide_variants_items"):
+        item_conditions.append("IFNULL(i.variant_of, '') = ''")
+
+    # Restrict counted descendants to the profile groups; nodes without any
+    # of them in their subtree are left out of the tree.
+    group_condition = "AND child.name IN %(item_groups)s" if item_groups else ""
+    rows = frappe.db.sql(
+        f"""
+        SELECT
+            node.name,
+            node.parent_item_group AS parent,
+            node.is_group,
+            COUNT(i.name) AS item_count
+        FROM `tabItem Group` node
+        INNER JOIN `tabItem Group` child
+            ON child.lft >= node.lft AND child.rgt <= node.rgt {group_condition}
+        LEFT JOIN `tabItem` i
+            ON i.item_group = child.name AND {" AND ".join(item_conditions)}
+        GROUP BY node.name, node.parent_item_group, node.is_group, node.lft
+        ORDER BY node.lft
+        """,
+        {"item_groups": tuple(item_groups)},
+        as_dict=True,
+    )
+
+    nodes = {}
+    roots = []
+    for row in rows:
+        node = {
+            "name": row.name,
+            "parent": row.parent,
+            "is_group": row.is_group,
+            "item_count": row.item_count,
+            "children": [],
+        }
+        nodes[row.name] = node
+        # Rows are in nested-set order, so parents come before children
+        if row.parent in nodes:
+            nodes[row.parent]["children"].append(node)
+        else:
+            roots.append(node)
+    return roots
+
+
 @frappe.whitelist()
 def get_item_variants(pos_profile, parent_item_code, price_list=None, customer=None):
     """Return variants of an item along with attribute metadata."""
@@ -502,7 +1011,7 @@ def get_item_variants(pos_profile, parent_item_code, price_list=None, customer=N
 
 
 @frappe.whitelist()
-def get_items_details(pos_profile, items_data, price_list=None, customer=None):
+def get_items_details(pos_profile, items_data, price_list=None, customer=None, format=None):
     """Bulk fetch item details for a list of items.
 
     Instead of calling :pyfunc:`get_item_detail` for each item, this
@@ -510,6 +1019,9 @@ def get_items_details(pos_profile, items_data, price_list=None, customer=None):
     items using a few ``frappe.get_all`` queries. Batch and serial
     information is also fetched in bulk so that the front end can cache it
     for offline selection without additional round trips per item.
+
+    Pass ``format="columnar"`` to receive the rows as a :func:`to_columnar`
+    payload.
     """
 
     pos_profile = json.loads(pos_profile)
@@ -517,7 +1029,7 @@ def get_items_details(pos_profile, items_data, price_list=None, customer=None):
 
     warehouse = pos_profile.get("warehouse")
     if not items_data:
-        return []
+        return to_columnar([]) if format == "columnar" else []
 
     ttl = pos_profile.get("posa_server_cache_duration")
     if ttl:
@@ -526,66 +1038,6 @@ def get_items_details(pos_profile, items_data, price_list=None, customer=None):
     def _to_tuple(data):
         return tuple(sorted(data))
 
-    @redis_cache(ttl=ttl or 300)
-    def _get_item_prices(price_list, currency, item_codes, customer):
-        if not item_codes:
-            return []
-        today = nowdate()
-        params = {
-            "price_list": price_list,
-            "currency": currency,
-            "item_codes": tuple(item_codes),
-            "today": today,
-            "customer": customer or "",
-        }
-        query = """
-			SELECT
-				item_code,
-				price_list_rate,
-				currency,
-				uom,
-				customer
-			FROM (
-				SELECT
-					item_code,
-					price_list_rate,
-					currency,
-					uom,
-					customer,
-					valid_from,
-					valid_upto
-				FROM `tabItem Price`
-				WHERE
-					price_list = %(price_list)s
-					AND item_code IN %(item_codes)s
-					AND currency = %(currency)s
-					AND selling = 1
-					AND valid_from <= %(today)s
-					AND IFNULL(customer, '') IN ('', %(customer)s)
-					AND valid_upto >= %(today)s
-				UNION ALL
-				SELECT
-					item_code,
-					price_list_rate,
-					currency,
-					uom,
-					customer,
-					valid_from,
-					valid_upto
-				FROM `tabItem Price`
-				WHERE
-					price_list = %(price_list)s
-					AND item_code IN %(item_codes)s
-					AND currency = %(currency)s
-					AND selling = 1
-					AND valid_from <= %(today)s
-					AND IFNULL(customer, '') IN ('', %(customer)s)
-					AND (valid_upto IS NULL OR valid_upto = '')
-			) ip
-			ORDER BY IFNULL(customer, '') ASC, valid_from ASC, valid_upto DESC
-		"""
-        return frappe.db.sql(query, params, as_dict=True)
-
     @redis_cache(ttl=ttl or 300)
     def _get_bin_qty(warehouse, item_codes):
         """Fetch stock quantities for multiple items.
@@ -595,27 +1047,18 @@ def get_items_details(pos_profile, items_data, price_list=None, customer=None):
         warehouses are aggregated.
         """
 
-        if not item_codes or not warehouse:
+        warehouses = get_warehouses(warehouse)
+        if not item_codes or not warehouses:
             return []
 
-        if frappe.db.get_value("Warehouse", warehouse, "is_group"):
-            warehouses = frappe.db.get_descendants("Warehouse", warehouse) or []
-            if not warehouses:
-                return []
-            return frappe.get_all(
-                "Bin",
-                fields=["item_code", "sum(actual_qty) as actual_qty"],
-                filters={
-                    "warehouse": ["in", warehouses],
-                    "item_code": ["in", item_codes],
-                },
-                group_by="item_code",
-            )
-
         return frappe.get_all(
             "Bin",
-            fields=["item_code", "actual_qty"],
-            filters={"warehouse": warehouse, "item_code": ["in", item_codes]},
+            fields=["item_code", "sum(actual_qty) as actual_qty"],
+            filters={
+                "warehouse": ["in", warehouses],
+                "item_code": ["in", item_codes],
+            },
+            group_by="item_code",
         )
 
     @redis_cache(ttl=ttl or 300)
@@ -651,26 +1094,7 @@ def get_items_details(pos_profile, items_data, price_list=None, customer=None):
     @redis_cache(ttl=ttl or 300)
     def _get_batches(warehouse, item_codes):
         """Fetch batch data and quantities for multiple items."""
-        if not item_codes or not warehouse:
-            return []
-        rows = []
-        for item_code in item_codes:
-            batch_list = get_batch_qty(item_code=item_code, warehouse=warehouse) or []
-            for batch in batch_list:
-                if batch.get("batch_no") and flt(batch.get("qty")) > 0:
-                    rows.append(
-                        frappe._dict(
-                            {
-                                "item_code": item_code,
-                                "batch_no": batch.get("batch_no"),
-                                "batch_qty": batch.get("qty"),
-                                "expiry_date": batch.get("expiry_date"),
-                                "batch_price": batch.get("posa_batch_price"),
-                                "manufacturing_date": batch.get("manufacturing_date"),
-                            }
-                        )
-                    )
-        return rows
+        return get_batch_qty_bulk(item_codes, warehouse)
 
     @redis_cache(ttl=ttl or 300)
     def _get_serials(warehouse, item_codes):
@@ -716,7 +1140,7 @@ def get_items_details(pos_profile, items_data, price_list=None, customer=None):
     item_codes = [d.get("item_code") for d in items_data if d.get("item_code") and not d.get("has_variants")]
     item_codes_tuple = _to_tuple(item_codes)
 
-    price_rows = _get_item_prices(price_list, price_list_currency, item_codes_tuple, customer)
+    price_rows = get_item_prices(price_list, price_list_currency, item_codes_tuple, customer)
     stock_rows = _get_bin_qty(warehouse, item_codes_tuple)
     meta_rows = _get_item_meta(item_codes_tuple)
     uom_rows = _get_uoms(item_codes_tuple)
@@ -800,162 +1224,208 @@ def get_items_details(pos_profile, items_data, price_list=None, customer=None):
 
         result.append(row)
 
+    if format == "columnar":
+        return to_columnar(result)
     return result
 
 
+def _get_price_list_exchange(company, price_list, allow_multi_currency=False):
+    """Return ``(price_list_currency, exchange_rate)`` of ``price_list`` for ``company``."""
+    company_currency = frappe.db.get_value("Company", company, "default_currency")
+    price_list_currency = company_currency
+    if price_list:
+        price_list_currency = frappe.db.get_value("Price List", price_list, "currency") or company_currency
+
+    exchange_rate = 1
+    if price_list_currency != company_currency and allow_multi_currency:
+        from erpnext.setup.utils import get_exchange_rate
+
+        try:
+            exchange_rate = get_exchange_rate(price_list_currency, company_currency, nowdate())
+        except Exception:
+            frappe.log_error(
+                f"Missing exchange rate from {price_list_currency} to {company_currency}",
+                "POS Awesome",
+            )
+    return price_list_currency, exchange_rate
+
+
 @frappe.whitelist()
 def get_item_detail(item, doc=None, warehouse=None, price_list=None, company=None):
     item = json.loads(item)
-    today = nowdate()
-    item_code = item.get("item_code")
-    batch_no_data = []
-    serial_no_data = []
-    if warehouse and item.get("has_batch_no"):
-        batch_list = get_batch_qty(warehouse=warehouse, item_code=item_code)
-        if batch_list:
-            for batch in batch_list:
-                if batch.qty > 0 and batch.batch_no:
-                    batch_doc = frappe.get_cached_doc("Batch", batch.batch_no)
-                    if (
-                        str(batch_doc.expiry_date) > str(today) or batch_doc.expiry_date in ["", None]
-                    ) and batch_doc.disabled == 0:
-                        batch_no_data.append(
-                            {
-                                "batch_no": batch.batch_no,
-                                "batch_qty": batch.qty,
-                                "expiry_date": batch_doc.expiry_date,
-                                "batch_price": batch_doc.posa_batch_price,
-                                "manufacturing_date": batch_doc.manufacturing_date,
-                            }
-                        )
-    if warehouse and item.get("has_serial_no"):
-        serial_no_data = frappe.get_all(
-            "Serial No",
-            filters={
-                "item_code": item_code,
-                "status": "Active",
-                "warehouse": warehouse,
-            },
-            fields=["name as serial_no"],
-        )
+    return get_item_details_bulk([item], doc, warehouse, price_list, company)[0]
 
-    item["selling_price_list"] = price_list
+
+@frappe.whitelist()
+def get_item_details_bulk(items, doc=None, warehouse=None, price_list=None, company=None):
+    """Return :func:`get_item_detail` results for many cart lines in one call.
+
+    Currency context, item metadata, stock, UOMs, batches and serial numbers
+    are read once for all ``items``. ERPNext's ``get_item_details`` (pricing
+    rules, discounts and tax templates) still runs per line but shares the
+    parsed ``doc``. Results are returned in the order of ``items``.
+
+    Stock, batches and serial numbers are read from each line's
+    ``warehouse``, falling back to ``warehouse`` for lines without one.
+    """
+    if isinstance(items, str):
+        items = json.loads(items)
+    items = [frappe._dict(item) for item in items or []]
+    if not items:
+        return []
+    # Kept out of the ERPNext item args, which get ``warehouse`` from the doc
+    line_warehouses = [item.pop("warehouse", None) or warehouse for item in items]
+    if isinstance(doc, str):
+        doc = json.loads(doc)
+    if isinstance(doc, dict):
+        doc = frappe._dict(doc)
+
+    today = nowdate()
+    item_codes = list({item.item_code for item in items if item.get("item_code")})
 
     # Determine if multi-currency is enabled on the POS Profile
     allow_multi_currency = False
-    if item.get("pos_profile"):
-        allow_multi_currency = (
-            frappe.db.get_value("POS Profile", item.get("pos_profile"), "posa_allow_multi_currency") or 0
-        )
+    pos_profile = next((item.pos_profile for item in items if item.get("pos_profile")), None)
+    if pos_profile:
+        allow_multi_currency = frappe.db.get_value("POS Profile", pos_profile, "posa_allow_multi_currency") or 0
 
     # Ensure conversion rate exists when price list currency differs from
     # company currency to avoid ValidationError from ERPNext. Also provide
     # sensible defaults when price list or currency is missing.
+    price_list_currency = exchange_rate = None
     if company:
-        company_currency = frappe.db.get_value("Company", company, "default_currency")
-        price_list_currency = company_currency
-        if price_list:
-            price_list_currency = (
-                frappe.db.get_value("Price List", price_list, "currency") or company_currency
-            )
-
-        exchange_rate = 1
-        if price_list_currency != company_currency and allow_multi_currency:
-            from erpnext.setup.utils import get_exchange_rate
-
-            try:
-                exchange_rate = get_exchange_rate(price_list_currency, company_currency, today)
-            except Exception:
-                frappe.log_error(
-                    f"Missing exchange rate from {price_list_currency} to {company_currency}",
-                    "POS Awesome",
-                )
-
-        item["price_list_currency"] = price_list_currency
-        item["plc_conversion_rate"] = exchange_rate
-        item["conversion_rate"] = exchange_rate
-
+        price_list_currency, exchange_rate = _get_price_list_exchange(
+            company, price_list, allow_multi_currency
+        )
         if doc:
             doc.price_list_currency = price_list_currency
             doc.plc_conversion_rate = exchange_rate
             doc.conversion_rate = exchange_rate
 
-    # Add company and doctype to the item args for ERPNext validation
-    if company:
-        item["company"] = company
-
-    # Set doctype for ERPNext validation
-    item["doctype"] = "Sales Invoice"
-
     # Create a proper doc structure with company for ERPNext validation
     if not doc and company:
         doc = frappe._dict({"doctype": "Sales Invoice", "company": company})
 
-    max_discount = frappe.get_value("Item", item_code, "max_discount")
-    res = get_item_details(
-        item,
-        doc,
-        overwrite_warehouse=False,
-    )
-    if item.get("is_stock_item") and warehouse:
-        res["actual_qty"] = get_stock_availability(item_code, warehouse)
-    res["max_discount"] = max_discount
-    res["batch_no_data"] = batch_no_data
-    res["serial_no_data"] = serial_no_data
-
-    # Add UOMs data directly from item document
-    uoms = frappe.get_all(
+    meta_map = {
+        d.name: d
+        for d in frappe.get_all(
+            "Item",
+            filters={"name": ["in", item_codes]},
+            fields=["name", "max_discount", "stock_uom"],
+        )
+    }
+
+    uom_map = {}
+    for d in frappe.get_all(
         "UOM Conversion Detail",
-        filters={"parent": item_code},
-        fields=["uom", "conversion_factor"],
-    )
+        filters={"parent": ["in", item_codes]},
+        fields=["parent", "uom", "conversion_factor"],
+    ):
+        uom_map.setdefault(d.parent, []).append({"uom": d.uom, "conversion_factor": d.conversion_factor})
 
-    # Add stock UOM if not already in uoms list
-    stock_uom = frappe.db.get_value("Item", item_code, "stock_uom")
-    if stock_uom:
-        stock_uom_exists = False
-        for uom_data in uoms:
-            if uom_data.get("uom") == stock_uom:
-                stock_uom_exists = True
-                break
+    # Keyed by (warehouse, item_code); a cart usually has a single warehouse
+    stock_map = {}
+    batch_map = {}
+    serial_map = {}
+    for line_warehouse in {w for w in line_warehouses if w}:
+        lines = [item for item, w in zip(items, line_warehouses, strict=True) if w == line_warehouse]
+        stock_codes = list({item.item_code for item in lines if item.get("is_stock_item")})
+        for (item_code, _warehouse), qty in get_bin_qty_map(
+            stock_codes, get_warehouses(line_warehouse)
+        ).items():
+            key = (line_warehouse, item_code)
+            stock_map[key] = stock_map.get(key, 0) + qty
+
+        batch_codes = list({item.item_code for item in lines if item.get("has_batch_no")})
+        batch_rows = get_batch_qty_bulk(batch_codes, line_warehouse)
+        disabled_batches = set()
+        if batch_rows:
+            disabled_batches = set(
+                frappe.get_all(
+                    "Batch",
+                    filters={"name": ["in", [d.batch_no for d in batch_rows]], "disabled": 1},
+                    pluck="name",
+                )
+            )
+        for d in batch_rows:
+            if d.batch_no in disabled_batches:
+                continue
+            if d.expiry_date and str(d.expiry_date) <= str(today):
+                continue
+            batch_map.setdefault((line_warehouse, d.item_code), []).append(
+                {
+                    "batch_no": d.batch_no,
+                    "batch_qty": d.batch_qty,
+                    "expiry_date": d.expiry_date,
+                    "batch_price": d.batch_price,
+                    "manufacturing_date": d.manufacturing_date,
+                }
+            )
+
+        serial_codes = list({item.item_code for item in lines if item.get("has_serial_no")})
+        if serial_codes:
+            for d in frappe.get_all(
+                "Serial No",
+                filters={
+                    "item_code": ["in", serial_codes],
+                    "status": "Active",
+                    "warehouse": line_warehouse,
+                },
+                fields=["name as serial_no", "item_code"],
+            ):
+                serial_map.setdefault((line_warehouse, d.item_code), []).append({"serial_no": d.serial_no})
+
+    result = []
+    for item, line_warehouse in zip(items, line_warehouses, strict=True):
+        item_code = item.get("item_code")
+        meta = meta_map.get(item_code, {})
 
-        if not stock_uom_exists:
+        item["selling_price_list"] = price_list
+        if company:
+            item["price_list_currency"] = price_list_currency
+            item["plc_conversion_rate"] = exchange_rate
+            item["conversion_rate"] = exchange_rate
+            # Add company to the item args for ERPNext validation
+            item["company"] = company
+        item["doctype"] = "Sales Invoice"
+
+        res = get_item_details(item, doc, overwrite_warehouse=False)
+        if item.get("is_stock_item") and line_warehouse:
+            res["actual_qty"] = stock_map.get((line_warehouse, item_code), 0.0)
+        res["max_discount"] = meta.get("max_discount")
+        res["batch_no_data"] = batch_map.get((line_warehouse, item_code), [])
+        res["serial_no_data"] = serial_map.get((line_warehouse, item_code), [])
+
+        # Add stock UOM if not already in uoms list
+        uoms = list(uom_map.get(item_code, []))
+        stock_uom = meta.get("stock_uom")
+        if stock_uom and not any(u.get("uom") == stock_uom for u in uoms):
             uoms.append({"uom": stock_uom, "conversion_factor": 1.0})
+        res["item_uoms"] = uoms
 
-    res["item_uoms"] = uoms
+        result.append(res)
 
-    return res
+    return result
 
 
 @frappe.whitelist()
 def get_items_from_barcode(selling_price_list, currency, barcode):
-    search_item = frappe.db.get_value(
-        "Item Barcode",
-        {"barcode": barcode},
-        ["parent as item_code", "posa_uom"],
-        as_dict=1,
-    )
-    if search_item:
-        item_doc = frappe.get_cached_doc("Item", search_item.item_code)
-        item_price = frappe.db.get_value(
-            "Item Price",
-            {
-                "item_code": search_item.item_code,
-                "price_list": selling_price_list,
-                "currency": currency,
-            },
-            "price_list_rate",
-        )
+    matches = get_barcode_map([barcode])
+    if not matches:
+        return None
 
-        return {
-            "item_code": item_doc.name,
-            "item_name": item_doc.item_name,
-            "barcode": barcode,
-            "rate": item_price or 0,
-            "uom": search_item.posa_uom or item_doc.stock_uom,
-            "currency": currency,
-        }
-    return None
+    row = build_scan_results([barcode], matches, selling_price_list, currency)[0]
+    if not row.get("item_code"):
+        return None
+
+    return {
+        "item_code": row["item_code"],
+        "item_name": row["item_name"],
+        "barcode": barcode,
+        "rate": row["rate"],
+        "uom": row["uom"],
+        "currency": currency,
+    }
 
 
 def build_item_cache(item_code):
@@ -973,6 +1443,56 @@ def get_item_optional_attributes(item_code):
     )
 
 
+def get_items_attributes_bulk(template_codes=None, variant_codes=None):
+    """Return attribute data for many items using two queries.
+
+    Returns a tuple ``(template_map, variant_map)``. ``template_map`` maps each
+    template item to its ``Item Attribute`` definitions (the same shape as
+    :func:`get_item_attributes`) and ``variant_map`` maps each variant to its
+    ``Item Variant Attribute`` rows. The number of queries does not depend on
+    how many items are requested.
+    """
+    template_codes = set(template_codes or [])
+    variant_codes = set(variant_codes or [])
+    template_map = {code: [] for code in template_codes}
+    variant_map = {code: [] for code in variant_codes}
+
+    parents = template_codes | variant_codes
+    if not parents:
+        return template_map, variant_map
+
+    attr_rows = frappe.get_all(
+        "Item Variant Attribute",
+        fields=["parent", "attribute", "attribute_value"],
+        filters={"parent": ["in", list(parents)], "parentfield": "attributes"},
+        order_by="parent asc, idx asc",
+    )
+
+    template_attrs = {}
+    for row in attr_rows:
+        if row.parent in variant_codes:
+            variant_map[row.parent].append({"attribute": row.attribute, "attribute_value": row.attribute_value})
+        if row.parent in template_codes:
+            attrs = template_attrs.setdefault(row.parent, [])
+            if row.attribute not in attrs:
+                attrs.append(row.attribute)
+
+    attribute_names = {attr for attrs in template_attrs.values() for attr in attrs}
+    if attribute_names:
+        definitions = {
+            d.name: d
+            for d in frappe.get_all(
+                "Item Attribute",
+                fields=["name", "attribute_name"],
+                filters={"name": ["in", list(attribute_names)]},
+            )
+        }
+        for parent, attrs in template_attrs.items():
+            template_map[parent] = [definitions[attr] for attr in attrs if attr in definitions]
+
+    return template_map, variant_map
+
+
 @frappe.whitelist()
 def get_item_attributes(item_code):
     """Get item attributes."""
@@ -998,45 +1518,9 @@ def get_item_attributes(item_code):
 @frappe.whitelist()
 def search_serial_or_batch_or_barcode_number(search_value, search_serial_no=None, search_batch_no=None):
     """Search for items by serial number, batch number, or barcode."""
-    # Search by barcode
-    barcode_data = frappe.db.get_value(
-        "Item Barcode",
-        {"barcode": search_value},
-        ["parent as item_code", "barcode"],
-        as_dict=True,
+    return (
+        resolve_codes([search_value], cint(search_serial_no), cint(search_batch_no)).get(search_value) or {}
     )
-    if barcode_data:
-        return {"item_code": barcode_data.item_code, "barcode": barcode_data.barcode}
-
-    # Search by batch number if enabled
-    if search_batch_no:
-        batch_data = frappe.db.get_value(
-            "Batch",
-            {"name": search_value},
-            ["item as item_code", "name as batch_no"],
-            as_dict=True,
-        )
-        if batch_data:
-            return {
-                "item_code": batch_data.item_code,
-                "batch_no": batch_data.batch_no,
-            }
-
-    # Search by serial number if enabled
-    if search_serial_no:
-        serial_data = frappe.db.get_value(
-            "Serial No",
-            {"name": search_value},
-            ["item_code", "name as serial_no"],
-            as_dict=True,
-        )
-        if serial_data:
-            return {
-                "item_code": serial_data.item_code,
-                "serial_no": serial_data.serial_no,
-            }
-
-    return {}
 
 
 @frappe.whitelist()
@@ -0,0 +1,255 @@
+# Copyright (c) 2020, Youssef Restom and contributors
+# For license information, please see license.txt
+
+"""Idempotent sync of invoices created while a terminal was offline.
+
+Each queued invoice carries an idempotency key generated by the terminal.
+:func:`sync_offline_invoices` records new keys as ``POS Offline Invoice``
+rows, named by the key, and hands them to background jobs in chunks, so a
+retried request never creates a second invoice and a long queue is drained
+by all workers of the ``short`` queue in parallel.
+"""
+
+import json
+
+import frappe
+from frappe import _
+from frappe.utils import add_days, add_to_date, cstr, now_datetime
+
+from .invoices import _checkout, _get_invoice_doctype, update_invoice
+
+# Invoices accepted per call
+MAX_BATCH_SIZE = 200
+
+# Invoices processed per background job
+SYNC_CHUNK_SIZE = 20
+
+# Pending entries untouched for this long are handed to a new job
+STALE_MINUTES = 10
+
+# Synced entries are kept this long to answer retried requests
+KEEP_DAYS = 30
+
+PENDING_STATUSES = ("Queued", "Processing")
+
+INSERT_FIELDS = [
+    "name",
+    "creation",
+    "modified",
+    "owner",
+    "modified_by",
+    "idempotency_key",
+    "status",
+    "pos_profile",
+    "pos_opening_shift",
+    "attempts",
+    "payload",
+]
+
+
+def _stale_before():
+    return add_to_date(now_datetime(), minutes=-STALE_MINUTES)
+
+
+def _is_stale(row):
+    return row.modified < _stale_before()
+
+
+@frappe.whitelist()
+def sync_offline_invoices(invoices):
+    """Queue offline invoices for submission and return their sync status.
+
+    ``invoices`` is a list of ``{"idempotency_key", "invoice", "data"}``
+    where ``invoice`` and ``data`` are the arguments of
+    :func:`invoices.checkout`. Keys seen before are not queued again, unless
+    their last attempt failed or their job appears to have died. Returns one
+    ``{"idempotency_key", "status", "invoice_doctype", "invoice", "error"}``
+    per key; poll :func:`get_offline_invoice_sync_status` until none is
+    ``Queued`` or ``Processing``.
+    """
+    if isinstance(invoices, str):
+        invoices = json.loads(invoices)
+    invoices = invoices or []
+    if len(invoices) > MAX_BATCH_SIZE:
+        frappe.throw(_("At most {0} offline invoices can be synced at once").format(MAX_BATCH_SIZE))
+
+    entries = {}
+    for entry in invoices:
+        key = cstr(entry.get("idempotency_key")).strip()
+        if not key or len(key) > 140:
+            frappe.throw(_("Every offline invoice needs an idempotency key of up to 140 characters"))
+        entries.setdefault(key, entry)
+
+    if not entries:
+        return []
+
+    existing = {
+        row.name: row
+        for row in frappe.get_all(
+            "POS Offline Invoice",
+            filters={"name": ["in", list(entries)]},
+            fields=["name", "status", "modified", "owner"],
+        )
+    }
+
+    now = now_datetime()
+    user = frappe.session.user
+    rows = []
+    to_process = []
+    for key, entry in entries.items():
+        row = existing.get(key)
+        if not row:
+            invoice = entry.get("invoice") or {}
+            payload = json.dumps({"invoice": invoice, "data": entry.get("data") or {}}, default=str)
+            rows.append(
+                [
+                    key,
+                    now,
+                    now,
+                    user,
+                    user,
+                    key,
+                    "Queued",
+                    invoice.get("pos_profile"),
+                    invoice.get("posa_pos_opening_shift"),
+                    0,
+                    payload,
+                ]
+            )
+            to_process.append(key)
+        elif row.owner != user:
+            # Keys of other users are neither processed nor reported
+            continue
+        elif row.status == "Failed" or (row.status in PENDING_STATUSES and _is_stale(row)):
+            to_process.append(key)
+
+    if rows:
+        # A concurrent retry may insert the same keys; the first one wins
+        frappe.db.bulk_insert("POS Offline Invoice", INSERT_FIELDS, rows, ignore_duplicates=True)
+
+    for start in range(0, len(to_process), SYNC_CHUNK_SIZE):
+        frappe.enqueue(
+            "posawesome.posawesome.api.offline_sync.process_offline_invoices",
+            queue="short",
+            timeout=1800,
+            enqueue_after_commit=True,
+            keys=to_process[start : start + SYNC_CHUNK_SIZE],
+        )
+
+    return get_offline_invoice_sync_status(list(entries))
+
+
+@frappe.whitelist()
+def get_offline_invoice_sync_status(keys):
+    """Return the sync status of the offline invoices ``keys``, in the same order.
+
+    Only entries queued by the current user are reported.
+    """
+    if isinstance(keys, str):
+        keys = json.loads(keys)
+    keys = [cstr(key) for key in keys or [] if key]
+    if not keys:
+        return []
+
+    rows = {
+        row.name: row
+        for row in frappe.get_all(
+            "POS Offline Invoice",
+            filters={"name": ["in", keys], "owner": frappe.session.user},
+            fields=["name", "status", "invoice_doctype", "invoice", "error"],
+        )
+    }
+    results = []
+    for key in keys:
+        row = rows.get(key)
+        results.append(
+            {
+                "idempotency_key": key,
+                "status": row.status if row else None,
+                "invoice_doctype": row.invoice_doctype if row else None,
+                "invoice": row.invoice if row else None,
+                "error": row.error if row else None,
+            }
+        )
+    return results
+
+
+def _claim(key):
+    """Mark ``key`` as being processed; return ``False`` if another job owns it."""
+    row = frappe.db.get_value(
+        "POS Offline Invoice", key, ["status", "modified"], as_dict=True, for_update=True
+    )
+    if not row:
+        return False
+    if row.status in ("Synced", "Drafted"):
+        return False
+    if row.status == "Processing" and not _is_stale(row):
+        return False
+
+    frappe.db.sql(
+        """
+        UPDATE `tabPOS Offline Invoice`
+        SET status = 'Processing', attempts = attempts + 1, modified = %s
+        WHERE name = %s
+        """,
+        (now_datetime(), key),
+    )
+    frappe.db.commit()
+    return True
+
+
+def _error_message(exc):
+    return cstr(exc) or exc.__class__.__name__
+
+
+def _process_offline_invoice(key):
+    if not _claim(key):
+        return
+
+    payload = json.loads(frappe.db.get_value("POS Offline Invoice", key, "payload") or "{}")
+    invoice = payload.get("invoice") or {}
+    data = payload.get("data") or {}
+    doctype = _get_invoice_doctype(invoice.get("pos_profile"))
+
+    values = {"invoice_doctype": doctype, "error": None}
+    try:
+        # Submit now, so an entry is only Synced once its invoice is submitted,
+        # also for profiles that submit in background jobs
+        result = _checkout(invoice, data, allow_background=False)
+        values.update(status="Synced", invoice=result.get("name"))
+    except Exception as exc:
+        frappe.db.rollback()
+        values["error"] = _error_message(exc)
+        # Keep the sale as a draft the cashier can fix and submit
+        try:
+            draft = update_invoice(json.dumps(invoice))
+            values.update(status="Drafted", invoice=draft.get("name"))
+        except Exception:
+            frappe.db.rollback()
+            frappe.log_error(frappe.get_traceback(), "POS Awesome offline invoice sync")
+            values.update(status="Failed", invoice=None)
+
+    frappe.db.set_value("POS Offline Invoice", key, values)
+    frappe.db.commit()
+
+
+def process_offline_invoices(keys):
+    """Background job submitting the offline invoices ``keys`` one by one.
+
+    Each invoice is committed together with its sync status, so an invoice
+    is recorded as synced exactly when it exists.
+    """
+    for key in keys or []:
+        try:
+            _process_offline_invoice(key)
+        except Exception:
+            frappe.db.rollback()
+            frappe.log_error(frappe.get_traceback(), "POS Awesome offline invoice sync")
+
+
+def delete_old_offline_invoices():
+    """Scheduled job removing synced entries older than :data:`KEEP_DAYS`."""
+    frappe.db.delete(
+        "POS Offline Invoice",
+        {"status": "Synced", "modified": ["<", add_days(now_datetime(), -KEEP_DAYS)]},
+    )
@@ -0,0 +1,225 @@
+# Copyright (c) 2020, Youssef Restom and contributors
+# For license information, please see license.txt
+
+import frappe
+from frappe.utils import getdate, nowdate
+
+from .utils import redis_hmget, redis_hmset
+
+# Redis hash holding cached base (not customer specific) Item Price rows,
+# one field per item code
+PRICE_CACHE_KEY = "posa_item_prices|{price_list}|{currency}"
+# Redis set listing the price cache hashes created for a price list
+PRICE_CACHE_INDEX_KEY = "posa_item_prices_index|{price_list}"
+# Redis hash holding the customer specific Item Price rows of a price list,
+# one field per customer
+CUSTOMER_PRICE_CACHE_KEY = "posa_customer_prices|{price_list}"
+
+
+def _price_cache_key(price_list, currency):
+    return PRICE_CACHE_KEY.format(price_list=price_list, currency=currency)
+
+
+def _fetch_item_prices(price_list, currency, item_codes):
+    """Return base selling Item Price rows that are still valid or become valid later."""
+    return frappe.db.sql(
+        """
+        SELECT
+            item_code,
+            price_list_rate,
+            currency,
+            uom,
+            customer,
+            valid_from,
+            valid_upto
+        FROM `tabItem Price`
+        WHERE
+            price_list = %(price_list)s
+            AND item_code IN %(item_codes)s
+            AND currency = %(currency)s
+            AND selling = 1
+            AND IFNULL(customer, '') = ''
+            AND (valid_upto IS NULL OR valid_upto >= %(today)s)
+        ORDER BY valid_from ASC, valid_upto DESC
+        """,
+        {
+            "price_list": price_list,
+            "currency": currency,
+            "item_codes": tuple(item_codes),
+            "today": nowdate(),
+        },
+        as_dict=True,
+    )
+
+
+def _is_valid_today(row, today):
+    return (not row.get("valid_from") or getdate(row.valid_from) <= today) and (
+        not row.get("valid_upto") or getdate(row.valid_upto) >= today
+    )
+
+
+def get_customer_prices(price_list, customer):
+    """Return all selling Item Price rows of ``customer`` in ``price_list``.
+
+    These are usually few, so they are read and cached as one entry per
+    customer instead of partitioning the item price cache by customer.
+    """
+    if not price_list or not customer:
+        return []
+
+    key = CUSTOMER_PRICE_CACHE_KEY.format(price_list=price_list)
+    rows = frappe.cache().hget(key, customer)
+    if rows is None:
+        rows = frappe.db.sql(
+            """
+            SELECT
+                item_code,
+                price_list_rate,
+                currency,
+                uom,
+                customer,
+                valid_from,
+                valid_upto
+            FROM `tabItem Price`
+            WHERE
+                price_list = %(price_list)s
+                AND customer = %(customer)s
+                AND selling = 1
+                AND (valid_upto IS NULL OR valid_upto >= %(today)s)
+            ORDER BY valid_from ASC, valid_upto DESC
+            """,
+            {"price_list": price_list, "customer": customer, "today": nowdate()},
+            as_dict=True,
+        )
+        frappe.cache().hset(key, customer, rows)
+    return rows
+
+
+def get_item_prices(price_list, currency, item_codes, customer=None):
+    """Return the applicable selling price rows for ``item_codes``.
+
+    Base prices are cached per item in a Redis hash for each
+    ``(price_list, currency)`` so that overlapping pages and all customers
+    share entries. Only the items missing from the cache are read from the
+    database, in one query. Rows specific to ``customer`` come from
+    :func:`get_customer_prices` and are returned after the base rows, so
+    they win when mapped by UOM. Rows keep their validity dates so entries
+    stay correct across days; they are filtered against today on read.
+    """
+    item_codes = [code for code in dict.fromkeys(item_codes or []) if code]
+    if not price_list or not item_codes:
+        return []
+
+    key = _price_cache_key(price_list, currency)
+    cached = redis_hmget(key, item_codes)
+
+    missing = [code for code in item_codes if code not in cached]
+    if missing:
+        fetched = {code: [] for code in missing}
+        for row in _fetch_item_prices(price_list, currency, missing):
+            fetched[row.item_code].append(row)
+        cached.update(fetched)
+        redis_hmset(key, fetched, index=PRICE_CACHE_INDEX_KEY.format(price_list=price_list))
+
+    today = getdate(nowdate())
+    result = [row for code in item_codes for row in cached.get(code, []) if _is_valid_today(row, today)]
+
+    if customer:
+        wanted = set(item_codes)
+        result.extend(
+            row
+            for row in get_customer_prices(price_list, customer)
+            if row.item_code in wanted and row.currency == currency and _is_valid_today(row, today)
+        )
+    return result
+
+
+def apply_customer_prices(details, price_list, customer):
+    """Overlay the prices of ``customer`` on ``get_items_details`` rows in place."""
+    today = getdate(nowdate())
+    overlay = {}
+    for row in get_customer_prices(price_list, customer):
+        if _is_valid_today(row, today):
+            overlay.setdefault((row.item_code, row.currency), {})[row.get("uom") or None] = row
+
+    if not overlay:
+        return details
+
+    for detail in details:
+        prices = overlay.get((detail.get("item_code"), detail.get("price_list_currency")))
+        if not prices:
+            continue
+        price = prices.get(detail.get("stock_uom")) or prices.get(None)
+        if price:
+            detail["rate"] = detail["price_list_rate"] = price.price_list_rate
+            detail["currency"] = price.currency
+    return details
+
+
+@frappe.whitelist()
+def get_customer_price_overlay(price_list, customer, currency=None):
+    """Return the prices of ``customer`` in ``price_list`` that apply today.
+
+    Terminals load base prices once per price list and merge this small
+    overlay when a customer is selected, instead of refetching the catalog.
+    """
+    today = getdate(nowdate())
+    return [
+        {
+            "item_code": row.item_code,
+            "uom": row.uom,
+            "price_list_rate": row.price_list_rate,
+            "currency": row.currency,
+        }
+        for row in get_customer_prices(price_list, customer)
+        if (not currency or row.currency == currency) and _is_valid_today(row, today)
+    ]
+
+
+def clear_item_price_cache(price_list, item_codes=None):
+    """Drop cached base prices of ``item_codes`` (or all items) for a price list."""
+    cache = frappe.cache()
+    index_key = PRICE_CACHE_INDEX_KEY.format(price_list=price_list)
+    for key in cache.smembers(index_key) or []:
+        key = frappe.safe_decode(key)
+        if item_codes:
+            for item_code in item_codes:
+                cache.hdel(key, item_code)
+        else:
+            cache.delete_value(key)
+    if not item_codes:
+        cache.delete_value(index_key)
+        cache.delete_value(CUSTOMER_PRICE_CACHE_KEY.format(price_list=price_list))
+
+
+def clear_customer_price_cache(price_list, customer):
+    frappe.cache().hdel(CUSTOMER_PRICE_CACHE_KEY.format(price_list=price_list), customer)
+
+
+def _clear_price_cache_for(doc):
+    if doc.get("customer"):
+        clear_customer_price_cache(doc.price_list, doc.customer)
+    else:
+        clear_item_price_cache(doc.price_list, [doc.item_code])
+
+
+def on_item_price_change(doc, method=None):
+    """Invalidate cached prices when an Item Price is saved or deleted.
+
+    The cache is cleared once the change is committed; cleared earlier, a
+    concurrent read could cache the old rows again.
+    """
+    changed = [doc]
+    before = doc.get_doc_before_save() if hasattr(doc, "get_doc_before_save") else None
+    if before and (before.price_list, before.item_code, before.get("customer")) != (
+        doc.price_list,
+        doc.item_code,
+        doc.get("customer"),
+    ):
+        changed.append(before)
+
+    def clear():
+        for price in changed:
+            _clear_price_cache_for(price)
+
+    frappe.db.after_commit.add(clear)
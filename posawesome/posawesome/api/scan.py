@@ -0,0 +1,194 @@
+# Copyright (c) 2020, Youssef Restom and contributors
+# For license information, please see license.txt
+
+import json
+
+import frappe
+from frappe.utils import cint
+
+from .prices import get_item_prices
+from .utils import redis_hmget, redis_hmset
+
+# Redis hash mapping casefolded barcode -> {"item_code": ..., "barcode": ..., "uom": ...}
+BARCODE_CACHE_KEY = "posa_barcode_map"
+
+# The barcode hash is rebuilt from scratch this often, so entries missed by
+# invalidation (e.g. barcodes changed by a direct database update) expire
+BARCODE_CACHE_TTL = 6 * 60 * 60
+
+
+def _fold(code):
+    """Return the key matching ``code`` the way the database collation does."""
+    return code.casefold()
+
+
+def get_barcode_map(barcodes):
+    """Return ``{barcode: {"item_code", "barcode", "uom"}}`` for known barcodes.
+
+    Lookups are served from a shared Redis hash; barcodes missing from it
+    are read with one ``Item Barcode`` query and written back. Unknown
+    barcodes are not cached so newly added ones resolve immediately.
+    Barcodes match regardless of case, like the database lookup, and
+    ``barcode`` holds the barcode as stored on the Item.
+    """
+    barcodes = [b for b in dict.fromkeys(barcodes or []) if b]
+    keys = list(dict.fromkeys(_fold(b) for b in barcodes))
+    found = redis_hmget(BARCODE_CACHE_KEY, keys)
+
+    missing = [b for b in barcodes if _fold(b) not in found]
+    if missing:
+        rows = frappe.get_all(
+            "Item Barcode",
+            filters={"barcode": ["in", missing], "parenttype": "Item"},
+            fields=["barcode", "parent", "posa_uom"],
+        )
+        fetched = {
+            _fold(d.barcode): {"item_code": d.parent, "barcode": d.barcode, "uom": d.posa_uom} for d in rows
+        }
+        redis_hmset(BARCODE_CACHE_KEY, fetched, expires_in_sec=BARCODE_CACHE_TTL)
+        found.update(fetched)
+
+    return {b: found[_fold(b)] for b in barcodes if _fold(b) in found}
+
+
+def clear_barcode_cache(doc, method=None):
+    """Drop cached barcodes of an Item when it is saved or deleted."""
+    barcodes = {d.barcode for d in doc.get("barcodes") or []}
+    before = doc.get_doc_before_save() if hasattr(doc, "get_doc_before_save") else None
+    if before:
+        barcodes.update(d.barcode for d in before.get("barcodes") or [])
+    for barcode in barcodes:
+        if barcode:
+            frappe.cache().hdel(BARCODE_CACHE_KEY, _fold(barcode))
+
+
+def resolve_codes(codes, search_serial_no=False, search_batch_no=False):
+    """Resolve scanned codes to item, UOM and batch/serial context.
+
+    Each code is looked up as a barcode first, then as a batch number and a
+    serial number when enabled, using one query per kind for the whole list.
+    Codes match regardless of case, like the database collation. Returns
+    ``{code: match}`` with the same keys as
+    :func:`search_serial_or_batch_or_barcode_number`; unresolved codes are
+    left out.
+    """
+    codes = [c for c in dict.fromkeys(codes or []) if c]
+    result = {}
+
+    for code, match in get_barcode_map(codes).items():
+        result[code] = {
+            "item_code": match["item_code"],
+            "barcode": match.get("barcode") or code,
+            "uom": match.get("uom"),
+        }
+
+    pending = [c for c in codes if c not in result]
+    if pending and search_batch_no:
+        batches = {
+            _fold(d.batch_no): {"item_code": d.item_code, "batch_no": d.batch_no}
+            for d in frappe.get_all(
+                "Batch",
+                filters={"name": ["in", pending]},
+                fields=["name as batch_no", "item as item_code"],
+            )
+        }
+        for code in pending:
+            if _fold(code) in batches:
+                result[code] = batches[_fold(code)]
+
+    pending = [c for c in codes if c not in result]
+    if pending and search_serial_no:
+        serials = {}
+        for d in frappe.get_all(
+            "Serial No",
+            filters={"name": ["in", pending]},
+            fields=["name as serial_no", "item_code", "batch_no"],
+        ):
+            match = {"item_code": d.item_code, "serial_no": d.serial_no}
+            if d.batch_no:
+                match["batch_no"] = d.batch_no
+            serials[_fold(d.serial_no)] = match
+        for code in pending:
+            if _fold(code) in serials:
+                result[code] = serials[_fold(code)]
+
+    return result
+
+
+@frappe.whitelist()
+def resolve_scanned_codes(codes, price_list=None, currency=None, customer=None, pos_profile=None):
+    """Resolve a list of scanned codes in one round trip.
+
+    Returns one entry per code with the resolved item, its UOM and rate from
+    ``price_list`` plus batch or serial context. Codes that match nothing are
+    returned with ``item_code`` set to ``None``.
+    """
+    if isinstance(codes, str):
+        codes = json.loads(codes)
+    if isinstance(pos_profile, str):
+        pos_profile = json.loads(pos_profile)
+    pos_profile = pos_profile or {}
+
+    price_list = price_list or pos_profile.get("selling_price_list")
+    if price_list and not currency:
+        currency = frappe.db.get_value("Price List", price_list, "currency")
+    currency = currency or pos_profile.get("currency")
+
+    matches = resolve_codes(
+        codes,
+        search_serial_no=cint(pos_profile.get("posa_search_serial_no", 1)),
+        search_batch_no=cint(pos_profile.get("posa_search_batch_no", 1)),
+    )
+    return build_scan_results(codes, matches, price_list, currency, customer)
+
+
+def build_scan_results(codes, matches, price_list, currency, customer=None):
+    """Attach item data and rates to resolved ``matches`` for each code."""
+    item_codes = list({m["item_code"] for m in matches.values()})
+    items = {}
+    if item_codes:
+        items = {
+            d.name: d
+            for d in frappe.get_all(
+                "Item",
+                filters={"name": ["in", item_codes]},
+                fields=["name", "item_name", "stock_uom", "has_batch_no", "has_serial_no", "disabled"],
+            )
+        }
+
+    prices = {}
+    for row in get_item_prices(price_list, currency, item_codes, customer):
+        prices.setdefault(row.item_code, {})[row.get("uom") or None] = row.price_list_rate
+
+    result = []
+    for code in codes:
+        match = matches.get(code)
+        item = items.get(match["item_code"]) if match else None
+        if not item:
+            result.append({"code": code, "item_code": None})
+            continue
+
+        uom = match.get("uom") or item.stock_uom
+        item_prices = prices.get(item.name, {})
+        rate = item_prices.get(uom)
+        if rate is None:
+            rate = item_prices.get(item.stock_uom, item_prices.get(None))
+
+        row = {
+            "code": code,
+            "item_code": item.name,
+            "item_name": item.item_name,
+            "stock_uom": item.stock_uom,
+            "uom": uom,
+            "rate": rate or 0,
+            "currency": currency,
+            "has_batch_no": item.has_batch_no,
+            "has_serial_no": item.has_serial_no,
+            "disabled": item.disabled,
+        }
+        for key in ("barcode", "batch_no", "serial_no"):
+            if match.get(key):
+                row[key] = match[key]
+        result.append(row)
+
+    return result
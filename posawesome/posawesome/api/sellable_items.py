@@ -0,0 +1,391 @@
+# Copyright (c) 2020, Youssef Restom and contributors
+# For license information, please see license.txt
+
+"""Materialized per POS Profile list of sellable items.
+
+``POS Sellable Item`` holds one row per profile and item that passes the
+profile filters (sales item, enabled, not a fixed asset, in the profile item
+groups, variant rules) together with the base price, stock and barcodes.
+Rows are refreshed incrementally from Item, Item Price and Stock Ledger
+Entry hooks and fully rebuilt by a daily job. The table is only read when
+``posa_use_sellable_items`` is enabled in the site config and the profile
+has been built at least once.
+"""
+
+import json
+
+import frappe
+from frappe.utils import cint, create_batch, flt, now_datetime, nowdate
+
+from .utils import HAS_VARIANTS_EXCLUSION, filters_to_list, get_item_groups, get_warehouses
+
+SELLABLE_DOCTYPE = "POS Sellable Item"
+
+# Redis hash of POS Profile -> time of its last full rebuild
+SELLABLE_BUILT_KEY = "posa_sellable_items_built"
+
+# Item filters already applied when rows are materialized
+PROFILE_FILTER_FIELDS = ("disabled", "is_sales_item", "is_fixed_asset")
+
+ITEM_FIELDS = [
+    "name",
+    "item_name",
+    "item_group",
+    "brand",
+    "stock_uom",
+    "idx",
+    "is_stock_item",
+    "has_variants",
+    "variant_of",
+    "has_batch_no",
+    "has_serial_no",
+    "max_discount",
+]
+
+ROW_FIELDS = [
+    "name",
+    "creation",
+    "modified",
+    "owner",
+    "modified_by",
+    "pos_profile",
+    "item_code",
+    "item_name",
+    "item_group",
+    "brand",
+    "stock_uom",
+    "item_idx",
+    "is_stock_item",
+    "has_variants",
+    "variant_of",
+    "has_batch_no",
+    "has_serial_no",
+    "max_discount",
+    "price_list",
+    "currency",
+    "price_list_rate",
+    "actual_qty",
+    "in_stock",
+    "barcodes",
+]
+
+BATCH_SIZE = 1000
+
+
+def use_sellable_items():
+    return cint(frappe.conf.get("posa_use_sellable_items"))
+
+
+def is_sellable_items_ready(pos_profile):
+    """Return True when reads for ``pos_profile`` can use the materialized table."""
+    if not pos_profile or not use_sellable_items():
+        return False
+    return bool(frappe.cache().hget(SELLABLE_BUILT_KEY, pos_profile))
+
+
+def get_profile_item_filters(profile):
+    """Return the Item filters selecting the sellable items of ``profile``."""
+    filters = {"disabled": 0, "is_sales_item": 1, "is_fixed_asset": 0}
+    item_groups = get_item_groups(profile.name)
+    if item_groups:
+        filters["item_group"] = ["in", item_groups]
+    if not profile.get("posa_show_template_items"):
+        filters.update(HAS_VARIANTS_EXCLUSION)
+    if profile.get("posa_hide_variants_items"):
+        filters["variant_of"] = ["is", "not set"]
+    return filters
+
+
+def _get_base_prices(price_list, item_codes):
+    """Return ``{item_code: price_list_rate}`` of prices valid today without a customer."""
+    rows = frappe.db.sql(
+        """
+        SELECT item_code, price_list_rate
+        FROM `tabItem Price`
+        WHERE
+            price_list = %(price_list)s
+            AND item_code IN %(item_codes)s
+            AND selling = 1
+            AND IFNULL(customer, '') = ''
+            AND (valid_from IS NULL OR valid_from <= %(today)s)
+            AND (valid_upto IS NULL OR valid_upto >= %(today)s)
+        ORDER BY valid_from ASC
+        """,
+        {"price_list": price_list, "item_codes": tuple(item_codes), "today": nowdate()},
+        as_dict=True,
+    )
+    # Later rows have a more recent valid_from and win
+    return {d.item_code: d.price_list_rate for d in rows}
+
+
+def _get_stock(item_codes, warehouses):
+    if not warehouses:
+        return {}
+    rows = frappe.db.sql(
+        """
+        SELECT item_code, SUM(actual_qty) AS actual_qty
+        FROM `tabBin`
+        WHERE item_code IN %(item_codes)s AND warehouse IN %(warehouses)s
+        GROUP BY item_code
+        """,
+        {"item_codes": tuple(item_codes), "warehouses": tuple(warehouses)},
+        as_dict=True,
+    )
+    return {d.item_code: flt(d.actual_qty) for d in rows}
+
+
+def _get_barcodes(item_codes):
+    barcodes = {}
+    for d in frappe.get_all(
+        "Item Barcode",
+        filters={"parent": ["in", list(item_codes)], "parenttype": "Item"},
+        fields=["parent", "barcode"],
+    ):
+        barcodes.setdefault(d.parent, []).append(d.barcode)
+    return barcodes
+
+
+def _build_rows(profile, items, currency, warehouses):
+    item_codes = [d.name for d in items]
+    prices = _get_base_prices(profile.selling_price_list, item_codes) if profile.selling_price_list else {}
+    stock = _get_stock(item_codes, warehouses)
+    barcodes = _get_barcodes(item_codes)
+
+    now = now_datetime()
+    user = frappe.session.user
+    rows = []
+    for item in items:
+        actual_qty = stock.get(item.name, 0)
+        rows.append(
+            (
+                frappe.generate_hash(length=10),
+                now,
+                now,
+                user,
+                user,
+                profile.name,
+                item.name,
+                item.item_name,
+                item.item_group,
+                item.brand,
+                item.stock_uom,
+                item.idx,
+                item.is_stock_item,
+                item.has_variants,
+                item.variant_of,
+                item.has_batch_no,
+                item.has_serial_no,
+                item.max_discount,
+                profile.selling_price_list,
+                currency,
+                flt(prices.get(item.name)),
+                actual_qty,
+                1 if actual_qty > 0 else 0,
+                json.dumps(barcodes.get(item.name, [])),
+            )
+        )
+    return rows
+
+
+def refresh_sellable_items(pos_profile, item_codes=None):
+    """Rebuild the rows of ``pos_profile``, limited to ``item_codes`` if given."""
+    profile = frappe.get_cached_doc("POS Profile", pos_profile)
+
+    delete_filters = {"pos_profile": profile.name}
+    filters = get_profile_item_filters(profile)
+    if item_codes:
+        delete_filters["item_code"] = ["in", list(item_codes)]
+        filters["name"] = ["in", list(item_codes)]
+    frappe.db.delete(SELLABLE_DOCTYPE, delete_filters)
+    if cint(profile.get("disabled")):
+        return
+
+    currency = None
+    if profile.selling_price_list:
+        currency = frappe.db.get_value("Price List", profile.selling_price_list, "currency")
+    warehouses = get_warehouses(profile.warehouse) if profile.warehouse else []
+
+    items = frappe.get_all("Item", filters=filters, fields=ITEM_FIELDS, order_by="name asc")
+    for batch in create_batch(items, BATCH_SIZE):
+        # A concurrent refresh may have inserted the same rows; the unique index keeps one
+        frappe.db.bulk_insert(
+            SELLABLE_DOCTYPE,
+            ROW_FIELDS,
+            _build_rows(profile, batch, currency, warehouses),
+            ignore_duplicates=True,
+        )
+
+    if not item_codes:
+        frappe.cache().hset(SELLABLE_BUILT_KEY, profile.name, str(now_datetime()))
+
+
+def refresh_items_for_profiles(item_codes, price_list=None):
+    """Refresh ``item_codes`` in every profile, or only those selling from ``price_list``."""
+    filters = {"disabled": 0}
+    if price_list:
+        filters["selling_price_list"] = price_list
+    for pos_profile in frappe.get_all("POS Profile", filters=filters, pluck="name"):
+        refresh_sellable_items(pos_profile, item_codes)
+
+
+def rebuild_all_sellable_items():
+    """Scheduled full rebuild of every enabled POS Profile."""
+    if not use_sellable_items():
+        return
+    for pos_profile in frappe.get_all("POS Profile", filters={"disabled": 0}, pluck="name"):
+        try:
+            refresh_sellable_items(pos_profile)
+            frappe.db.commit()
+        except Exception:
+            frappe.db.rollback()
+            frappe.log_error(frappe.get_traceback(), "POS Awesome sellable items rebuild")
+
+
+def on_item_change(doc, method=None):
+    if not use_sellable_items():
+        return
+    if method == "on_trash":
+        frappe.db.delete(SELLABLE_DOCTYPE, {"item_code": doc.name})
+        return
+    frappe.enqueue(
+        "posawesome.posawesome.api.sellable_items.refresh_items_for_profiles",
+        queue="short",
+        enqueue_after_commit=True,
+        item_codes=[doc.name],
+    )
+
+
+def on_item_price_change(doc, method=None):
+    if not use_sellable_items() or not doc.selling:
+        return
+    frappe.enqueue(
+        "posawesome.posawesome.api.sellable_items.refresh_items_for_profiles",
+        queue="short",
+        enqueue_after_commit=True,
+        item_codes=[doc.item_code],
+        price_list=doc.price_list,
+    )
+
+
+def on_stock_ledger_entry_submit(doc, method=None):
+    """Collect the items whose stock changes in this transaction.
+
+    ERPNext updates Bin quantities with direct queries, after the Stock
+    Ledger Entry is submitted, so the stock is read again by a job once
+    the transaction is committed, one job per transaction.
+    """
+    if not use_sellable_items():
+        return
+    pending = getattr(frappe.local, "posa_sellable_stock_changes", None)
+    if pending is None:
+        pending = frappe.local.posa_sellable_stock_changes = set()
+        frappe.db.after_commit.add(_enqueue_stock_refresh)
+        frappe.db.after_rollback.add(_discard_stock_changes)
+    pending.add(doc.item_code)
+
+
+def _discard_stock_changes():
+    frappe.local.posa_sellable_stock_changes = None
+
+
+def _enqueue_stock_refresh():
+    item_codes = getattr(frappe.local, "posa_sellable_stock_changes", None)
+    frappe.local.posa_sellable_stock_changes = None
+    if item_codes:
+        frappe.enqueue(
+            "posawesome.posawesome.api.sellable_items.refresh_sellable_stock",
+            queue="short",
+            item_codes=sorted(item_codes),
+        )
+
+
+def refresh_sellable_stock(item_codes):
+    """Update the stock of ``item_codes`` in every profile from their Bins."""
+    for profile in frappe.get_all(
+        "POS Profile", filters={"disabled": 0, "warehouse": ["is", "set"]}, fields=["name", "warehouse"]
+    ):
+        stock = _get_stock(item_codes, get_warehouses(profile.warehouse))
+        for item_code in item_codes:
+            actual_qty = stock.get(item_code, 0)
+            frappe.db.sql(
+                """
+                UPDATE `tabPOS Sellable Item`
+                SET actual_qty = %(actual_qty)s, in_stock = %(in_stock)s
+                WHERE pos_profile = %(pos_profile)s AND item_code = %(item_code)s
+                """,
+                {
+                    "actual_qty": actual_qty,
+                    "in_stock": 1 if actual_qty > 0 else 0,
+                    "pos_profile": profile.name,
+                    "item_code": item_code,
+                },
+            )
+
+
+def on_pos_profile_change(doc, method=None):
+    if not use_sellable_items():
+        return
+    frappe.cache().hdel(SELLABLE_BUILT_KEY, doc.name)
+    if method == "on_trash":
+        frappe.db.delete(SELLABLE_DOCTYPE, {"pos_profile": doc.name})
+        return
+    frappe.enqueue(
+        "posawesome.posawesome.api.sellable_items.refresh_sellable_items",
+        queue="long",
+        enqueue_after_commit=True,
+        pos_profile=doc.name,
+    )
+
+
+def get_sellable_item_page(pos_profile, filters, fields, limit_start=0, limit_page_length=None, **kwargs):
+    """Return a ``get_items`` page of Item rows from the materialized table.
+
+    ``filters`` (a dict or a list of ``[field, operator, value]``) and
+    ``fields`` use Item field names; profile level filters are already
+    applied to the stored rows and are dropped.
+    """
+    if isinstance(filters, dict):
+        filters = filters_to_list(filters)
+    filters = [
+        ["item_code" if field == "name" else field, *condition]
+        for field, *condition in filters or []
+        if field not in PROFILE_FILTER_FIELDS
+    ]
+    filters.append(["pos_profile", "=", pos_profile])
+
+    aliases = {"name": "item_code as name", "idx": "item_idx as idx"}
+    return frappe.get_all(
+        SELLABLE_DOCTYPE,
+        filters=filters,
+        fields=[aliases.get(field, field) for field in fields],
+        limit_start=limit_start,
+        limit_page_length=limit_page_length,
+        order_by="item_name asc, item_code asc",
+    )
+
+
+@frappe.whitelist()
+def get_sellable_items(pos_profile, start_after=None, limit=500, in_stock_only=False):
+    """Return materialized sellable items of a profile with price, stock and barcodes.
+
+    Pages are keyed on ``item_code``; pass the last returned code as
+    ``start_after`` to get the next page.
+    """
+    frappe.has_permission("POS Profile", "read", pos_profile, throw=True)
+
+    filters = {"pos_profile": pos_profile}
+    if start_after:
+        filters["item_code"] = [">", start_after]
+    if cint(in_stock_only):
+        filters["in_stock"] = 1
+
+    rows = frappe.get_all(
+        SELLABLE_DOCTYPE,
+        filters=filters,
+        fields=[field for field in ROW_FIELDS if field not in ("name", "creation", "owner", "modified_by")],
+        order_by="item_code asc",
+        limit_page_length=cint(limit) or 500,
+    )
+    for row in rows:
+        row.barcodes = json.loads(row.barcodes or "[]")
+    return rows
@@ -0,0 +1,263 @@
+# Copyright (c) 2020, Youssef Restom and contributors
+# For license information, please see license.txt
+
+"""Background submission of the printed drafts of a POS Opening Shift.
+
+When ``posa_allow_submissions_in_background_job`` is set, a sale is saved as
+a printed draft (``posa_is_printed``) and submitted later by a job. Each
+such draft gets a ``POS Invoice Submission`` row, created with the draft and
+deleted when it is submitted, holding the credit to redeem and the retry
+state. These rows are the queue: one job per shift, deduplicated by job id,
+submits their drafts in posting order, locking each invoice so it is never
+submitted twice. Printed drafts without a row, e.g. ones saved before
+background submission was enabled, are left alone.
+
+:func:`retry_submission_queues` runs every minute and queues the shifts with
+rows due, so drafts are submitted even if their job was lost. Failed
+submissions are retried with exponential backoff.
+"""
+
+import json
+
+import frappe
+from frappe import _
+from frappe.utils import add_to_date, cint, cstr, flt, get_datetime, now_datetime
+
+from .payments import redeeming_customer_credit
+
+ENTRY_DOCTYPE = "POS Invoice Submission"
+INVOICE_DOCTYPES = ("Sales Invoice", "POS Invoice")
+
+MAX_ATTEMPTS = 5
+RETRY_BASE_SECONDS = 30
+RETRY_MAX_SECONDS = 30 * 60
+
+ENTRY_FIELDS = ["name", "invoice", "status", "attempts", "next_attempt", "error", "context"]
+
+
+def _enqueue_queue_job(doctype, shift):
+    frappe.enqueue(
+        "posawesome.posawesome.api.submission_queue.process_submission_queue",
+        queue="short",
+        timeout=3000,
+        job_id=f"posa_submission_queue|{doctype}|{shift or ''}",
+        deduplicate=True,
+        # The job must see the draft that queued it
+        enqueue_after_commit=True,
+        doctype=doctype,
+        shift=shift,
+    )
+
+
+def compact_credit_context(data, credit):
+    """Return the part of a sale's credit redemption a queued invoice needs.
+
+    ``data`` is the payment data sent by the POS and ``credit`` the result of
+    ``_prepare_invoice_submission``. The invoice, its payments and accounts
+    are read again when it is submitted, so only the amounts chosen at the
+    counter are kept: the invoices whose credit is redeemed and the due date.
+    Advances are left out, they are already allocated on the draft.
+    """
+    return {
+        "data": {
+            "redeemed_customer_credit": flt(data.get("redeemed_customer_credit")),
+            "customer_credit_dict": [
+                {
+                    "type": row["type"],
+                    "credit_origin": row["credit_origin"],
+                    "credit_to_redeem": flt(row["credit_to_redeem"]),
+                }
+                for row in data.get("customer_credit_dict") or []
+                if row.get("type") == "Invoice" and flt(row.get("credit_to_redeem"))
+            ],
+            "due_date": cstr(data.get("due_date")) or None,
+        },
+        "is_payment_entry": cint(credit.get("is_payment_entry")),
+        "total_cash": flt(credit.get("total_cash")),
+    }
+
+
+def enqueue_invoice_submission(invoice_doc, data, credit):
+    """Record the credit context of a saved printed draft and queue its shift.
+
+    The ``POS Invoice Submission`` row is written in the transaction of the
+    draft, so a draft is never queued without its context.
+    """
+    doctype = invoice_doc.doctype
+    shift = invoice_doc.get("posa_pos_opening_shift")
+    values = {
+        "pos_opening_shift": shift,
+        "status": "Queued",
+        "attempts": 0,
+        "next_attempt": None,
+        "error": None,
+        "context": json.dumps(compact_credit_context(data, credit)),
+    }
+
+    existing = frappe.db.get_value(ENTRY_DOCTYPE, {"invoice_doctype": doctype, "invoice": invoice_doc.name})
+    if existing:
+        frappe.db.set_value(ENTRY_DOCTYPE, existing, values)
+    else:
+        frappe.get_doc(
+            {"doctype": ENTRY_DOCTYPE, "invoice_doctype": doctype, "invoice": invoice_doc.name, **values}
+        ).insert(ignore_permissions=True)
+
+    _enqueue_queue_job(doctype, shift)
+
+
+def _get_printed_drafts(doctype, shift):
+    """Return the printed drafts of ``shift`` in posting order."""
+    if not frappe.db.has_column(doctype, "posa_is_printed"):
+        return []
+    return frappe.get_all(
+        doctype,
+        filters={
+            "docstatus": 0,
+            "posa_is_printed": 1,
+            "posa_pos_opening_shift": shift or ["is", "not set"],
+        },
+        pluck="name",
+        order_by="posting_date asc, posting_time asc, creation asc",
+    )
+
+
+def _get_entries(doctype, invoices):
+    if not invoices:
+        return {}
+    return {
+        row.invoice: row
+        for row in frappe.get_all(
+            ENTRY_DOCTYPE,
+            filters={"invoice_doctype": doctype, "invoice": ["in", invoices]},
+            fields=ENTRY_FIELDS,
+        )
+    }
+
+
+def _is_ready(entry, now):
+    if not entry:
+        return False
+    return entry.status != "Failed" and (not entry.next_attempt or get_datetime(entry.next_attempt) <= now)
+
+
+def _record_failure(entry, exc):
+    attempts = cint(entry.attempts) + 1
+    delay = min(RETRY_BASE_SECONDS * 2 ** (attempts - 1), RETRY_MAX_SECONDS)
+    values = {
+        "attempts": attempts,
+        "error": cstr(exc) or exc.__class__.__name__,
+        "next_attempt": add_to_date(now_datetime(), seconds=delay),
+        "status": "Failed" if attempts >= MAX_ATTEMPTS else "Queued",
+    }
+    frappe.db.set_value(ENTRY_DOCTYPE, entry.name, values)
+    frappe.db.commit()
+    if values["status"] == "Failed":
+        frappe.log_error(frappe.get_traceback(), f"POS Awesome submission of {entry.invoice}")
+
+
+def _submit_queued_invoice(doctype, name, entry):
+    """Submit one printed draft; return ``False`` if it has to be retried."""
+    try:
+        # Lock the invoice so a concurrent job waits and then sees it submitted
+        docstatus = frappe.db.get_value(doctype, name, "docstatus", for_update=True)
+        if docstatus is not None and cint(docstatus) == 0:
+            invoice_doc = frappe.get_doc(doctype, name)
+            invoice_doc.flags.ignore_permissions = True
+            frappe.flags.ignore_account_permission = True
+            invoice_doc.submit()
+            context = json.loads(entry.context) if entry.context else None
+            if context:
+                redeeming_customer_credit(
+                    invoice_doc,
+                    context["data"],
+                    context["is_payment_entry"],
+                    context["total_cash"],
+                    cash_account=None,
+                    payments=invoice_doc.payments,
+                )
+        frappe.db.delete(ENTRY_DOCTYPE, entry.name)
+        frappe.db.commit()
+        return True
+    except Exception as exc:
+        frappe.db.rollback()
+        _record_failure(entry, exc)
+        return False
+
+
+def process_submission_queue(doctype, shift):
+    """Background job submitting the ready printed drafts of a shift in posting order.
+
+    The drafts are read again after every pass, so drafts saved while the
+    job runs are submitted by the same job.
+    """
+    attempted = set()
+    while True:
+        now = now_datetime()
+        drafts = [name for name in _get_printed_drafts(doctype, shift) if name not in attempted]
+        entries = _get_entries(doctype, drafts)
+        ready = [name for name in drafts if _is_ready(entries.get(name), now)]
+        if not ready:
+            break
+
+        for name in ready:
+            attempted.add(name)
+            _submit_queued_invoice(doctype, name, entries[name])
+
+
+def retry_submission_queues():
+    """Scheduled job queueing the shifts with queued drafts due for submission."""
+    now = now_datetime()
+    for doctype in INVOICE_DOCTYPES:
+        shifts = frappe.db.sql_list(
+            f"""
+            SELECT DISTINCT entry.pos_opening_shift
+            FROM `tab{ENTRY_DOCTYPE}` entry
+            JOIN `tab{doctype}` inv ON inv.name = entry.invoice
+            WHERE entry.invoice_doctype = %(doctype)s
+                AND entry.status = 'Queued'
+                AND (entry.next_attempt IS NULL OR entry.next_attempt <= %(now)s)
+                AND inv.docstatus = 0
+            """,
+            {"doctype": doctype, "now": now},
+        )
+        for shift in shifts:
+            _enqueue_queue_job(doctype, shift or None)
+
+
+def _get_shift_invoice_doctype(shift):
+    pos_profile = frappe.db.get_value("POS Opening Shift", shift, "pos_profile")
+    if pos_profile and frappe.db.get_value(
+        "POS Profile", pos_profile, "create_pos_invoice_instead_of_sales_invoice"
+    ):
+        return "POS Invoice"
+    return "Sales Invoice"
+
+
+@frappe.whitelist()
+def get_submission_queue_status(pos_opening_shift):
+    """Return the printed drafts of a shift still waiting for background submission.
+
+    ``pending`` counts the queued drafts to submit, ``retrying`` those that failed at
+    least once and will be tried again, and ``failed`` lists the drafts
+    given up on after :data:`MAX_ATTEMPTS` with their last error.
+    """
+    if not frappe.db.exists("POS Opening Shift", pos_opening_shift):
+        frappe.throw(_("POS Opening Shift {0} does not exist").format(pos_opening_shift))
+    frappe.has_permission("POS Opening Shift", "read", pos_opening_shift, throw=True)
+
+    doctype = _get_shift_invoice_doctype(pos_opening_shift)
+    drafts = _get_printed_drafts(doctype, pos_opening_shift)
+    entries = _get_entries(doctype, drafts)
+    failed = [name for name in drafts if entries.get(name) and entries[name].status == "Failed"]
+    waiting = [entries[name] for name in drafts if name in entries and name not in failed]
+    next_attempts = [get_datetime(e.next_attempt) for e in waiting if e.next_attempt]
+    return {
+        "doctype": doctype,
+        "pending": len(waiting),
+        "retrying": sum(1 for entry in waiting if cint(entry.attempts)),
+        "next_attempt": min(next_attempts) if next_attempts else None,
+        "failed": [
+            {"invoice": name, "attempts": entries[name].attempts, "error": entries[name].error}
+            for name in failed
+        ],
+    }
@@ -0,0 +1,32 @@
+from frappe.tests.utils import FrappeTestCase
+
+from posawesome.posawesome.api.instrumentation import is_api_method, percentile, summarize
+
+
+class TestInstrumentation(FrappeTestCase):
+    def test_percentile_nearest_rank(self):
+        values = list(range(1, 101))
+        self.assertEqual(percentile(values, 50), 50)
+        self.assertEqual(percentile(values, 95), 95)
+        self.assertEqual(percentile(values, 99), 99)
+        self.assertEqual(percentile([7], 99), 7)
+        self.assertIsNone(percentile([], 50))
+
+    def test_summarize_skips_missing_sizes(self):
+        samples = [
+            {"ts": "2", "ms": 20.0, "db_ms": 5.0, "queries": 4, "bytes": None},
+            {"ts": "1", "ms": 10.0, "db_ms": 2.0, "queries": 2, "bytes": 100},
+        ]
+        summary = summarize(samples)
+        self.assertEqual(summary["calls"], 2)
+        self.assertEqual(summary["last_call"], "2")
+        self.assertEqual(summary["queries"]["p50"], 2)
+        self.assertEqual(summary["queries"]["max"], 4)
+        self.assertEqual(summary["bytes"]["p99"], 100)
+
+    def test_is_api_method_requires_whitelisted_function(self):
+        self.assertTrue(is_api_method("posawesome.posawesome.api.items.get_items"))
+        self.assertFalse(is_api_method("posawesome.posawesome.api.items.no_such_method"))
+        self.assertFalse(is_api_method("posawesome.posawesome.api.no_such_module.get_items"))
+        self.assertFalse(is_api_method("posawesome.posawesome.api.instrumentation.record_sample"))
+        self.assertFalse(is_api_method("frappe.client.get_list"))
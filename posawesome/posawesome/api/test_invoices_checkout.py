@@ -0,0 +1,44 @@
+from unittest.mock import patch
+
+import frappe
+from frappe.tests.utils import FrappeTestCase
+
+from posawesome.posawesome.api.invoices import _get_unchanged_draft
+
+
+def _draft():
+    return frappe._dict(
+        doctype="Sales Invoice",
+        name="SINV-1",
+        docstatus=0,
+        modified="2026-01-01 10:00:00.000001",
+        redeem_loyalty_points=0,
+        loyalty_points=0,
+        sales_team=[],
+        payments=[{"mode_of_payment": "Cash", "amount": 0}],
+    )
+
+
+class TestUnchangedDraft(FrappeTestCase):
+    def _get(self, invoice):
+        with (
+            patch.object(frappe.db, "exists", return_value=True),
+            patch.object(frappe, "get_doc", return_value=_draft()),
+        ):
+            return _get_unchanged_draft(invoice)
+
+    def test_applies_payments_to_the_saved_draft(self):
+        invoice = {
+            **_draft(),
+            "payments": [{"mode_of_payment": "Cash", "amount": 10}],
+            "items": [{"item_code": "CHANGED"}],
+        }
+        invoice_doc = self._get(invoice)
+        self.assertEqual(invoice_doc.payments, [{"mode_of_payment": "Cash", "amount": 10}])
+        self.assertNotIn("items", invoice_doc)
+
+    def test_rebuilds_changed_drafts(self):
+        self.assertIsNone(self._get({**_draft(), "modified": "2026-01-01 09:00:00"}))
+        self.assertIsNone(self._get({**_draft(), "redeem_loyalty_points": 1, "loyalty_points": 5}))
+        self.assertIsNone(self._get({**_draft(), "sales_team": [{"sales_person": "Ann"}]}))
+        self.assertIsNone(self._get({**_draft(), "name": None}))
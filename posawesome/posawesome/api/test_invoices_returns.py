@@ -0,0 +1,62 @@
+from unittest.mock import patch
+
+import frappe
+from frappe.tests.utils import FrappeTestCase
+
+from posawesome.posawesome.api.invoices import get_return_ledger, validate_return_items
+
+
+def _entry(is_return, invoice_item, idx, item_code, qty, stock_qty=None):
+    return frappe._dict(
+        is_return=is_return,
+        invoice_item=invoice_item,
+        idx=idx,
+        item_code=item_code,
+        qty=qty,
+        stock_qty=qty if stock_qty is None else stock_qty,
+    )
+
+
+ENTRIES = [
+    _entry(0, "row-2", 2, "APPLE", 4),
+    _entry(0, "row-1", 1, "APPLE", 3),
+    _entry(0, "row-3", 3, "PEAR", 2, stock_qty=24),
+    # Linked returns of the first apple row and the pear row
+    _entry(1, "row-1", None, "APPLE", 1),
+    _entry(1, "row-3", None, "PEAR", 1, stock_qty=12),
+    # A return made without row links
+    _entry(1, None, None, "APPLE", 3),
+]
+
+
+class TestReturnLedger(FrappeTestCase):
+    def test_allocates_linked_and_unlinked_returns(self):
+        with patch.object(frappe.db, "sql", return_value=ENTRIES) as sql:
+            ledger = get_return_ledger("SINV-1")
+
+        sql.assert_called_once()
+        rows = {row.invoice_item: row for row in ledger["rows"]}
+        self.assertEqual([row.invoice_item for row in ledger["rows"]], ["row-1", "row-2", "row-3"])
+        self.assertEqual((rows["row-1"].returned_qty, rows["row-1"].returnable_qty), (3, 0))
+        self.assertEqual((rows["row-2"].returned_qty, rows["row-2"].returnable_qty), (1, 3))
+        self.assertEqual(rows["row-3"].returnable_stock_qty, 12)
+        self.assertEqual(ledger["items"]["APPLE"].returnable_qty, 3)
+        self.assertEqual(ledger["items"]["PEAR"].returnable_qty, 1)
+
+    def test_validate_return_items_uses_row_quantities(self):
+        with patch.object(frappe.db, "sql", return_value=ENTRIES):
+            too_many_on_row = validate_return_items(
+                "SINV-1", [{"item_code": "APPLE", "qty": -1, "sales_invoice_item": "row-1"}]
+            )
+            allowed = validate_return_items(
+                "SINV-1",
+                [
+                    {"item_code": "APPLE", "qty": -3, "sales_invoice_item": "row-2"},
+                    {"item_code": "PEAR", "qty": -1},
+                ],
+            )
+            too_many_for_item = validate_return_items("SINV-1", [{"item_code": "APPLE", "qty": -4}])
+
+        self.assertFalse(too_many_on_row["valid"])
+        self.assertTrue(allowed["valid"])
+        self.assertFalse(too_many_for_item["valid"])
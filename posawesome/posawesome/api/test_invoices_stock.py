@@ -0,0 +1,38 @@
+from unittest.mock import patch
+
+from frappe.tests.utils import FrappeTestCase
+
+from posawesome.posawesome.api.invoices import _collect_stock_errors
+
+
+class TestCollectStockErrors(FrappeTestCase):
+    def test_aggregates_rows_and_reports_every_shortage(self):
+        items = [
+            {"item_code": "APPLE", "warehouse": "Stores", "qty": 3, "conversion_factor": 1},
+            {"item_code": "APPLE", "warehouse": "Stores", "qty": 1, "conversion_factor": 2},
+            {"item_code": "PEAR", "warehouse": "Stores", "qty": 1, "stock_qty": 1},
+            {"item_code": "MILK", "warehouse": "Stores", "batch_no": "B-1", "qty": 5},
+            {"item_code": "MILK", "warehouse": "Stores", "qty": -2},
+            {"item_code": "BREAD", "qty": 1},
+        ]
+        with (
+            patch("posawesome.posawesome.api.invoices.get_warehouses", return_value=["Stores"]),
+            patch(
+                "posawesome.posawesome.api.invoices.get_bin_qty_map",
+                return_value={("APPLE", "Stores"): 4, ("PEAR", "Stores"): 1},
+            ) as bin_qty,
+            patch(
+                "posawesome.posawesome.api.invoices.get_batch_qty_map",
+                return_value={("B-1", "Stores"): 2},
+            ) as batch_qty,
+        ):
+            errors = _collect_stock_errors(items)
+
+        bin_qty.assert_called_once()
+        batch_qty.assert_called_once()
+        shortages = {
+            (e["item_code"], e["batch_no"]): (e["requested_qty"], e["available_qty"]) for e in errors
+        }
+        self.assertEqual(
+            shortages, {("APPLE", None): (5, 4), ("MILK", "B-1"): (5, 2), ("BREAD", None): (1, 0)}
+        )
@@ -0,0 +1,52 @@
+from unittest.mock import patch
+
+from frappe.tests.utils import FrappeTestCase
+
+from posawesome.posawesome.api import item_search
+from posawesome.posawesome.api.item_search import _boolean_query, _escape_like, _search_tokens, search_items
+
+
+class TestItemSearch(FrappeTestCase):
+    def test_boolean_query_strips_operators(self):
+        tokens = _search_tokens('red +apple "juice" (1L)')
+        self.assertEqual(_boolean_query(tokens), "+red* +apple* +juice* +1L*")
+
+    def test_like_prefix_is_escaped(self):
+        self.assertEqual(_escape_like("50%_off"), "50\\%\\_off")
+
+
+class TestSearchItems(FrappeTestCase):
+    def test_returns_ranks_of_matches(self):
+        with (
+            patch.object(item_search, "_supports_fulltext", return_value=True),
+            patch.object(
+                item_search.frappe.db, "sql", return_value=[("APPLE", 0), ("APPLE-JUICE", 2)]
+            ) as sql,
+        ):
+            ranks = search_items("apple")
+
+        self.assertEqual(ranks, {"APPLE": 0, "APPLE-JUICE": 2})
+        self.assertEqual(sql.call_args.args[1]["boolean"], "+apple*")
+
+    def test_falls_back_to_like_without_matches(self):
+        with (
+            patch.object(item_search, "_supports_fulltext", return_value=True),
+            patch.object(item_search.frappe.db, "sql", return_value=[]),
+        ):
+            self.assertIsNone(search_items("apple"))
+
+    def test_falls_back_to_like_without_fulltext_index(self):
+        with (
+            patch.object(item_search, "_supports_fulltext", return_value=False),
+            patch.object(item_search.frappe.db, "sql") as sql,
+        ):
+            self.assertIsNone(search_items("apple"))
+        sql.assert_not_called()
+
+    def test_short_words_fall_back_to_like(self):
+        with (
+            patch.object(item_search, "_supports_fulltext", return_value=True),
+            patch.object(item_search.frappe.db, "sql") as sql,
+        ):
+            self.assertIsNone(search_items("red ox"))
+        sql.assert_not_called()
@@ -0,0 +1,33 @@
+from unittest.mock import patch
+
+import frappe
+from frappe.tests.utils import FrappeTestCase
+
+from posawesome.posawesome.api.items import get_items_attributes_bulk
+
+
+def _fake_get_all(doctype, fields=None, filters=None, **kwargs):
+    if doctype == "Item Variant Attribute":
+        return [
+            frappe._dict(parent=parent, attribute="Size", attribute_value="M")
+            for parent in sorted(filters["parent"][1])
+        ]
+    if doctype == "Item Attribute":
+        return [frappe._dict(name=name, attribute_name=name) for name in filters["name"][1]]
+    return []
+
+
+class TestBulkItemAttributes(FrappeTestCase):
+    def _count_queries(self, size):
+        templates = [f"TPL-{i}" for i in range(size)]
+        variants = [f"VAR-{i}" for i in range(size)]
+        with patch("posawesome.posawesome.api.items.frappe.get_all", side_effect=_fake_get_all) as get_all:
+            template_map, variant_map = get_items_attributes_bulk(templates, variants)
+        self.assertEqual(len(template_map), size)
+        self.assertEqual(variant_map["VAR-0"], [{"attribute": "Size", "attribute_value": "M"}])
+        self.assertEqual(template_map["TPL-0"][0].name, "Size")
+        return get_all.call_count
+
+    def test_query_count_independent_of_page_size(self):
+        self.assertEqual(self._count_queries(5), self._count_queries(500))
+        self.assertEqual(self._count_queries(5), 2)
@@ -0,0 +1,42 @@
+import json
+from unittest.mock import patch
+
+import frappe
+from frappe.tests.utils import FrappeTestCase
+
+from posawesome.posawesome.api import items
+from posawesome.posawesome.api.items import get_items
+
+ITEMS = ("KEYSET-A", "KEYSET-B", "KEYSET-C")
+
+
+class TestItemsKeyset(FrappeTestCase):
+    def setUp(self):
+        # All three items share an item name
+        for code in ITEMS:
+            if frappe.db.exists("Item", code):
+                frappe.db.set_value("Item", code, "item_name", "Keyset Shared")
+                continue
+            frappe.get_doc(
+                {
+                    "doctype": "Item",
+                    "item_code": code,
+                    "item_name": "Keyset Shared",
+                    "stock_uom": "Nos",
+                    "is_stock_item": 0,
+                    "item_group": "All Item Groups",
+                    "is_sales_item": 1,
+                    "is_fixed_asset": 0,
+                }
+            ).insert(ignore_permissions=True, ignore_mandatory=True)
+
+    def test_search_keeps_its_matches_across_batches(self):
+        pos_profile = json.dumps({"name": "TestProfile", "posa_use_limit_search": 1})
+        with (
+            patch.object(items, "ITEMS_BATCH_SIZE", 1),
+            patch.object(items, "search_items", return_value={"KEYSET-A": 0, "KEYSET-C": 1}),
+            patch.object(items, "get_items_details", return_value=[]),
+        ):
+            result = get_items(pos_profile, search_value="keyset shared")
+
+        self.assertEqual([row["item_code"] for row in result], ["KEYSET-A", "KEYSET-C"])
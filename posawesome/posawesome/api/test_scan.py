@@ -0,0 +1,31 @@
+from unittest.mock import patch
+
+import frappe
+from frappe.tests.utils import FrappeTestCase
+
+from posawesome.posawesome.api.scan import resolve_codes
+
+
+def _get_all(doctype, filters=None, fields=None):
+    rows = {
+        "Item Barcode": [frappe._dict(barcode="ABC-1", parent="APPLE", posa_uom="Box")],
+        "Batch": [frappe._dict(batch_no="BATCH-7", item_code="MILK")],
+        "Serial No": [frappe._dict(serial_no="SN-9", item_code="PHONE", batch_no=None)],
+    }
+    return rows[doctype]
+
+
+class TestResolveCodes(FrappeTestCase):
+    def test_codes_match_regardless_of_case(self):
+        with (
+            patch("posawesome.posawesome.api.scan.redis_hmget", return_value={}),
+            patch("posawesome.posawesome.api.scan.redis_hmset") as hmset,
+            patch.object(frappe, "get_all", side_effect=_get_all),
+        ):
+            result = resolve_codes(["abc-1", "batch-7", "sn-9", "nope"], True, True)
+
+        self.assertEqual(result["abc-1"], {"item_code": "APPLE", "barcode": "ABC-1", "uom": "Box"})
+        self.assertEqual(result["batch-7"], {"item_code": "MILK", "batch_no": "BATCH-7"})
+        self.assertEqual(result["sn-9"], {"item_code": "PHONE", "serial_no": "SN-9"})
+        self.assertNotIn("nope", result)
+        self.assertEqual(list(hmset.call_args.args[1]), ["abc-1"])
@@ -0,0 +1,40 @@
+from frappe.tests.utils import FrappeTestCase
+
+from posawesome.posawesome.api.submission_queue import compact_credit_context
+
+
+class TestSubmissionQueue(FrappeTestCase):
+    def test_compact_credit_context_keeps_redeemed_invoices(self):
+        data = {
+            "total_change": 0,
+            "redeemed_customer_credit": "150",
+            "customer_credit_dict": [
+                {"type": "Invoice", "credit_origin": "SINV-1", "total_credit": 200, "credit_to_redeem": 100},
+                {"type": "Invoice", "credit_origin": "SINV-2", "total_credit": 50, "credit_to_redeem": 0},
+                {"type": "Advance", "credit_origin": "PE-1", "total_credit": 80, "credit_to_redeem": 50},
+            ],
+            "is_cashback": True,
+        }
+        credit = {
+            "is_payment_entry": 1,
+            "total_cash": 30,
+            "cash_account": {"account": "Cash"},
+            "payments": [],
+        }
+
+        context = compact_credit_context(data, credit)
+
+        self.assertEqual(
+            context,
+            {
+                "data": {
+                    "redeemed_customer_credit": 150.0,
+                    "customer_credit_dict": [
+                        {"type": "Invoice", "credit_origin": "SINV-1", "credit_to_redeem": 100.0}
+                    ],
+                    "due_date": None,
+                },
+                "is_payment_entry": 1,
+                "total_cash": 30.0,
+            },
+        )
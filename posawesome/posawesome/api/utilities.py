@@ -13,6 +13,7 @@ import psutil
 import functools
 
 from .utils import get_item_groups, get_active_pos_profile
+from . import instrumentation
 
 
 def get_version():
@@ -397,6 +398,26 @@ def get_server_usage():
     }
 
 
+@frappe.whitelist()
+def get_api_metrics(method=None):
+    """Return p50/p95/p99 wall time, DB time, query count and payload size per API method.
+
+    Samples are only recorded while ``posa_api_instrumentation`` is enabled
+    in the site config.
+    """
+    frappe.only_for("System Manager")
+    return {
+        "enabled": bool(instrumentation.is_enabled()),
+        "methods": instrumentation.get_metrics(method),
+    }
+
+
+@frappe.whitelist()
+def clear_api_metrics():
+    frappe.only_for("System Manager")
+    instrumentation.clear_metrics()
+
+
 # Cache for language data
 _LANGUAGE_CACHE = {
     "languages": None,
@@ -1,53 +1,227 @@
 from __future__ import annotations
 
-from functools import cache
+import pickle
+from collections import OrderedDict
 
 import frappe
 
 # Reusable ORM filter to exclude template items
 HAS_VARIANTS_EXCLUSION = {"has_variants": 0}
 
+# Redis keys for the shared warehouse tree cache
+WAREHOUSE_TREE_CACHE_KEY = "posa_warehouse_tree"
+WAREHOUSE_TREE_VERSION_KEY = "posa_warehouse_tree_version"
+
+# Process-local copy of the warehouse tree cache: {site: (version, {warehouse: [...]})}
+_warehouse_tree_cache = {}
+
+# Redis key whose value changes whenever POS Profile item groups or the
+# Item Group tree change
+ITEM_GROUPS_VERSION_KEY = "posa_item_groups_version"
+
+# Maximum number of item group lists kept per site in each worker
+ITEM_GROUPS_CACHE_SIZE = 256
+
+# Process-local LRU of item group lists: {site: (version, OrderedDict)}
+_item_groups_cache = {}
+
+# Redis hash of POS Profile -> item group tree with sellable item counts
+ITEM_GROUP_TREE_CACHE_KEY = "posa_item_group_tree"
+
+
+def filters_to_list(filters: dict) -> list[list]:
+    """Return dict ``filters`` as a list of ``[field, operator, value]`` conditions.
+
+    Unlike a dict, the list can hold several conditions on the same field.
+    """
+    return [
+        [field, *value] if isinstance(value, list | tuple) else [field, "=", value]
+        for field, value in (filters or {}).items()
+    ]
+
+
+def redis_hmget(name: str, keys: list[str]) -> dict:
+    """Return ``{key: value}`` for the fields of Redis hash ``name`` that exist.
+
+    Fetches all fields in one round trip; values are unpickled like
+    ``frappe.cache().hget`` does. Redis errors are treated as misses.
+    """
+    if not keys:
+        return {}
+    cache = frappe.cache()
+    try:
+        values = cache.hmget(cache.make_key(name), keys)
+    except Exception:
+        return {}
+    return {key: pickle.loads(value) for key, value in zip(keys, values, strict=True) if value is not None}
+
+
+def redis_hmset(
+    name: str, mapping: dict, index: str | None = None, expires_in_sec: int | None = None
+) -> None:
+    """Store ``mapping`` in Redis hash ``name`` in one round trip.
+
+    When ``index`` is given, ``name`` is also added to that Redis set so the
+    hash can be found again for invalidation. When ``expires_in_sec`` is
+    given, the whole hash expires that long after it was created.
+    """
+    if not mapping:
+        return
+    cache = frappe.cache()
+    key = cache.make_key(name)
+    try:
+        # Writes must not extend the lifetime of an existing hash
+        set_expiry = expires_in_sec and cache.ttl(key) < 0
+        pipe = cache.pipeline()
+        pipe.hset(key, mapping={k: pickle.dumps(v) for k, v in mapping.items()})
+        if set_expiry:
+            pipe.expire(key, expires_in_sec)
+        if index:
+            pipe.sadd(cache.make_key(index), name)
+        pipe.execute()
+    except Exception:
+        frappe.log_error(frappe.get_traceback(), "POS Awesome cache")
+
+
+def _get_warehouse_tree_version():
+    """Return the current warehouse tree version, read once per request."""
+    version = getattr(frappe.local, "posa_warehouse_tree_version", None)
+    if version is None:
+        version = frappe.cache().get_value(WAREHOUSE_TREE_VERSION_KEY) or ""
+        frappe.local.posa_warehouse_tree_version = version
+    return version
+
+
+def get_warehouses(warehouse: str) -> list[str]:
+    """Return the leaf-level warehouse list for ``warehouse``.
+
+    A group warehouse resolves to all of its descendants while any other
+    warehouse resolves to itself. Results are kept in a per-process map and
+    a shared Redis hash so stock lookups don't repeat nested-set queries;
+    both are invalidated by :func:`clear_warehouse_tree_cache`.
+    """
+    if not warehouse:
+        return []
+
+    version = _get_warehouse_tree_version()
+    site = getattr(frappe.local, "site", None)
+    cached_version, tree = _warehouse_tree_cache.get(site, (None, None))
+    if tree is None or cached_version != version:
+        tree = {}
+        _warehouse_tree_cache[site] = (version, tree)
+
+    if warehouse in tree:
+        return tree[warehouse]
+
+    warehouses = frappe.cache().hget(WAREHOUSE_TREE_CACHE_KEY, warehouse)
+    if warehouses is None:
+        warehouses = [warehouse]
+        if frappe.db.get_value("Warehouse", warehouse, "is_group"):
+            warehouses = frappe.db.get_descendants("Warehouse", warehouse) or []
+        frappe.cache().hset(WAREHOUSE_TREE_CACHE_KEY, warehouse, warehouses)
+
+    tree[warehouse] = warehouses
+    return warehouses
+
+
+def clear_warehouse_tree_cache(*args, **kwargs):
+    """Invalidate cached warehouse trees in Redis and in every worker.
+
+    The version is bumped once the change is committed; bumped earlier, a
+    concurrent read could cache the old tree under the new version.
+    """
+    frappe.db.after_commit.add(_bump_warehouse_tree_version)
+
+
+def _bump_warehouse_tree_version():
+    frappe.cache().delete_value(WAREHOUSE_TREE_CACHE_KEY)
+    frappe.cache().set_value(WAREHOUSE_TREE_VERSION_KEY, frappe.generate_hash(length=10))
+    frappe.local.posa_warehouse_tree_version = None
+
+
+def _get_item_groups_version():
+    """Return the current item groups version, read once per request."""
+    version = getattr(frappe.local, "posa_item_groups_version", None)
+    if version is None:
+        version = frappe.cache().get_value(ITEM_GROUPS_VERSION_KEY) or ""
+        frappe.local.posa_item_groups_version = version
+    return version
+
+
+def _cached_item_groups(key, compute):
+    """Return ``compute()`` memoized under ``key`` in the bounded worker cache."""
+    version = _get_item_groups_version()
+    site = getattr(frappe.local, "site", None)
+    cached_version, entries = _item_groups_cache.get(site, (None, None))
+    if entries is None or cached_version != version:
+        entries = OrderedDict()
+        _item_groups_cache[site] = (version, entries)
+
+    if key in entries:
+        entries.move_to_end(key)
+        return list(entries[key])
+
+    groups = compute()
+    entries[key] = tuple(groups)
+    if len(entries) > ITEM_GROUPS_CACHE_SIZE:
+        entries.popitem(last=False)
+    return list(groups)
+
+
+def clear_item_groups_cache(*args, **kwargs):
+    """Invalidate cached item group lists in every worker.
+
+    The version is bumped once the change is committed, like
+    :func:`clear_warehouse_tree_cache` does.
+    """
+    frappe.db.after_commit.add(_bump_item_groups_version)
+
+
+def _bump_item_groups_version():
+    frappe.cache().set_value(ITEM_GROUPS_VERSION_KEY, frappe.generate_hash(length=10))
+    frappe.local.posa_item_groups_version = None
+    clear_item_group_tree_cache()
+
+
+def clear_item_group_tree_cache(*args, **kwargs):
+    """Drop cached item group trees, e.g. after an Item is added or moved."""
+    frappe.cache().delete_value(ITEM_GROUP_TREE_CACHE_KEY)
+
 
 def expand_item_groups(item_groups):
     """Expand any parent item groups to include their children.
 
     This function takes a list of item groups and expands any parent groups
-    to include all their descendants, while keeping leaf groups as-is.
+    to include all their descendants, while keeping leaf groups as-is. All
+    groups are expanded with one nested-set query and the result is cached
+    until :func:`clear_item_groups_cache` runs.
     """
     if not item_groups:
         return item_groups
 
-    try:
-        from erpnext.utilities.doctype.item_group.item_group import get_child_groups
-    except Exception:
-        get_child_groups = None
-
-    expanded_groups = set()
-    for group in item_groups:
-        if not group:
-            continue
-
-        # Check if this is a parent group
-        is_group = frappe.db.get_value("Item Group", group, "is_group")
-
-        if is_group:
-            # If it's a parent group, get all its children
-            if get_child_groups:
-                try:
-                    descendants = get_child_groups(group) or []
-                    expanded_groups.update(descendants)
-                except Exception:
-                    # Fallback to database method
-                    descendants = frappe.db.get_descendants("Item Group", group) or []
-                    expanded_groups.update(descendants)
-            else:
-                descendants = frappe.db.get_descendants("Item Group", group) or []
-                expanded_groups.update(descendants)
-        else:
-            # If it's a leaf group, add it directly
-            expanded_groups.add(group)
-
-    return list(expanded_groups)
+    groups = tuple(sorted({group for group in item_groups if group}))
+    if not groups:
+        return []
+    return _cached_item_groups(("expand", groups), lambda: _expand_item_groups(groups))
+
+
+def _expand_item_groups(groups):
+    rows = frappe.db.sql(
+        """
+        SELECT parent.name, child.name
+        FROM `tabItem Group` parent
+        INNER JOIN `tabItem Group` child
+            ON child.lft >= parent.lft AND child.rgt <= parent.rgt
+        WHERE parent.name IN %(groups)s
+            AND (parent.is_group = 1 OR child.name = parent.name)
+        """,
+        {"groups": groups},
+    )
+    found = {parent for parent, _child in rows}
+    expanded_groups = {child for _parent, child in rows}
+    # Unknown groups are kept as-is
+    expanded_groups.update(group for group in groups if group not in found)
+    return sorted(expanded_groups)
 
 
 @frappe.whitelist()
@@ -74,17 +248,21 @@ def get_default_warehouse(company=None):
     return warehouse
 
 
-@cache
 def get_item_groups(pos_profile: str) -> list[str]:
     """Return all item groups for a POS profile, including descendants.
 
     The linked groups from the ``POS Item Group`` child table are
-    expanded to include all of their descendants. Results are cached
-    to avoid duplicate database calls within a process.
+    expanded to include all of their descendants. Results are kept in a
+    bounded per-worker cache that is invalidated when a POS Profile or the
+    Item Group tree changes.
+    """
+    if not pos_profile:
+        return []
+    return _cached_item_groups(("profile", pos_profile), lambda: _get_item_groups(pos_profile))
 
 
-    """
-    if not pos_profile or not frappe.db.exists("DocType", "POS Item Group"):
+def _get_item_groups(pos_profile):
+    if not frappe.db.exists("DocType", "POS Item Group"):
         return []
 
     groups = frappe.get_all(
@@ -0,0 +1,296 @@
+# Copyright (c) 2020, Youssef Restom and contributors
+# For license information, please see license.txt
+
+"""Latency, query count and payload benchmarks of the item catalog APIs.
+
+Seed a site with :func:`posawesome.posawesome.benchmarks.seed.seed` and run:
+
+    bench --site mysite execute posawesome.posawesome.benchmarks.catalog.run --kwargs "{'scale': 10000}"
+
+Each case is run once cold and then ``repeat`` times; the report records the
+cold run and the median and p95 of the warm runs. Reports are written as JSON
+under ``private/files/posawesome_benchmarks`` together with the current git
+commit, so runs on two commits can be compared with :func:`compare`.
+"""
+
+import json
+import os
+import statistics
+import subprocess
+import time
+
+import frappe
+from frappe import _
+from frappe.utils import now_datetime
+from frappe.utils.response import json_handler
+
+from posawesome.posawesome.api import items as items_api
+from posawesome.posawesome.api.item_search import search_items
+
+from . import seed as bench_seed
+
+REPORT_FOLDER = "posawesome_benchmarks"
+PAGE_SIZE = 100
+
+
+class QueryCounter:
+    """Count the queries run through ``frappe.db.sql`` and their time."""
+
+    def __enter__(self):
+        self.count = 0
+        self.db_time = 0.0
+        self._sql = frappe.db.sql
+
+        def sql(*args, **kwargs):
+            start = time.perf_counter()
+            try:
+                return self._sql(*args, **kwargs)
+            finally:
+                self.db_time += time.perf_counter() - start
+                self.count += 1
+
+        frappe.db.sql = sql
+        return self
+
+    def __exit__(self, *exc):
+        # Drop the instance attribute so the bound method is used again
+        del frappe.db.sql
+
+
+def _payload_size(result):
+    return len(json.dumps(result, default=json_handler, separators=(",", ":")))
+
+
+def _measure(fn):
+    with QueryCounter() as counter:
+        start = time.perf_counter()
+        result = fn()
+        wall = time.perf_counter() - start
+    return {
+        "ms": round(wall * 1000, 3),
+        "db_ms": round(counter.db_time * 1000, 3),
+        "queries": counter.count,
+        "bytes": _payload_size(result),
+    }
+
+
+def _percentile(values, pct):
+    values = sorted(values)
+    index = max(0, min(len(values) - 1, round(pct / 100 * len(values)) - 1))
+    return values[index]
+
+
+def bench(fn, repeat=5):
+    """Run ``fn`` once cold and ``repeat`` times warm and summarize the runs."""
+    cold = _measure(fn)
+    runs = [_measure(fn) for _ in range(max(int(repeat), 1))]
+    times = [run["ms"] for run in runs]
+    return {
+        "cold": cold,
+        "median_ms": round(statistics.median(times), 3),
+        "p95_ms": round(_percentile(times, 95), 3),
+        "queries": runs[-1]["queries"],
+        "bytes": runs[-1]["bytes"],
+    }
+
+
+def _profile(data):
+    return {
+        "name": None,
+        "company": data["company"],
+        "warehouse": data["warehouse"],
+        "currency": data["currency"],
+        "selling_price_list": data["price_list"],
+        "posa_search_batch_no": 1,
+        "posa_search_serial_no": 1,
+    }
+
+
+def _seed_data():
+    """Return the sample codes of an already seeded site."""
+    company = frappe.db.get_value("Warehouse", {"warehouse_name": bench_seed.ITEM_GROUP}, "company")
+    like = f"{bench_seed.PREFIX}-%"
+    return {
+        "scale": frappe.db.count("Item", {"name": ["like", like]}),
+        "company": company,
+        "warehouse": frappe.db.get_value("Warehouse", {"warehouse_name": bench_seed.ITEM_GROUP}, "name"),
+        "price_list": bench_seed.PRICE_LIST,
+        "currency": frappe.get_cached_value("Company", company, "default_currency"),
+        "item_group": bench_seed.ITEM_GROUP,
+        "templates": frappe.get_all(
+            "Item", filters={"name": ["like", like], "has_variants": 1}, pluck="name", limit=20
+        ),
+        "batch_items": frappe.get_all(
+            "Item", filters={"name": ["like", like], "has_batch_no": 1}, pluck="name", limit=50
+        ),
+        "batches": frappe.get_all("Batch", filters={"item": ["like", like]}, pluck="name", limit=50),
+        "serials": frappe.get_all("Serial No", filters={"item_code": ["like", like]}, pluck="name", limit=50),
+        "barcodes": frappe.get_all(
+            "Item Barcode", filters={"parent": ["like", like]}, pluck="barcode", limit=50
+        ),
+    }
+
+
+def _legacy_batch_qty(item_codes, warehouse):
+    """Per-item batch lookups as done before ``get_batch_qty_bulk``."""
+    return {code: items_api.get_batch_qty(warehouse=warehouse, item_code=code) or [] for code in item_codes}
+
+
+def _like_search(search_value, limit=500):
+    """``LIKE`` scan used when the FULLTEXT index is not available."""
+    term = f"%{search_value}%"
+    return frappe.get_all(
+        "Item",
+        or_filters={"name": ["like", term], "item_name": ["like", term], "description": ["like", term]},
+        pluck="name",
+        limit_page_length=limit,
+    )
+
+
+def _legacy_attributes(template_codes, variant_codes):
+    """Per-item attribute lookups as done before ``get_items_attributes_bulk``."""
+    templates = {code: items_api.get_item_attributes(code) for code in template_codes}
+    variants = {
+        code: frappe.get_all(
+            "Item Variant Attribute",
+            fields=["attribute", "attribute_value"],
+            filters={"parent": code},
+        )
+        for code in variant_codes
+    }
+    return templates, variants
+
+
+def _cases(data):
+    profile = _profile(data)
+    profile_json = json.dumps(profile)
+    item_groups = json.dumps([data["item_group"]])
+    page = frappe.get_all(
+        "Item",
+        filters={"name": ["like", f"{bench_seed.PREFIX}-%"], "has_variants": 0},
+        fields=["name as item_code", "item_name", "stock_uom", "has_batch_no", "has_serial_no"],
+        order_by="item_name asc",
+        limit_page_length=PAGE_SIZE,
+    )
+    page_json = json.dumps(page)
+    available = [{"item_code": d.item_code, "warehouse": data["warehouse"]} for d in page[:50]]
+    available += [
+        {"item_code": d.item, "warehouse": data["warehouse"], "batch_no": d.name}
+        for d in frappe.get_all(
+            "Batch", filters={"name": ["in", data["batches"][:10] or [""]]}, fields=["name", "item"]
+        )
+    ]
+    template = data["templates"][0] if data["templates"] else None
+    variants = (
+        frappe.get_all("Item", filters={"variant_of": ["in", data["templates"]]}, pluck="name")
+        if data["templates"]
+        else []
+    )
+    search_word = bench_seed.WORDS[0]
+
+    cases = {
+        "get_items.first_page": lambda: items_api.get_items(
+            profile_json, item_groups=item_groups, limit=PAGE_SIZE, cursor=""
+        ),
+        "get_items.search": lambda: items_api.get_items(
+            profile_json, item_groups=item_groups, search_value=search_word, limit=PAGE_SIZE
+        ),
+        "get_items_details.page": lambda: items_api.get_items_details(profile_json, page_json),
+        "get_available_qty": lambda: items_api.get_available_qty(json.dumps(available)),
+        "compare.batch_qty.legacy": lambda: _legacy_batch_qty(data["batch_items"], data["warehouse"]),
+        "compare.batch_qty.bulk": lambda: items_api.get_batch_qty_bulk(
+            data["batch_items"], data["warehouse"]
+        ),
+        "compare.search.fulltext": lambda: search_items(search_word),
+        "compare.search.like": lambda: _like_search(search_word),
+        "compare.attributes.legacy": lambda: _legacy_attributes(data["templates"], variants),
+        "compare.attributes.bulk": lambda: items_api.get_items_attributes_bulk(data["templates"], variants),
+    }
+    if template:
+        cases["get_item_variants"] = lambda: items_api.get_item_variants(profile_json, template)
+    for kind, values in (
+        ("barcode", data["barcodes"]),
+        ("batch", data["batches"]),
+        ("serial", data["serials"]),
+    ):
+        if values:
+            cases[f"search_serial_or_batch_or_barcode_number.{kind}"] = lambda value=values[0]: (
+                items_api.search_serial_or_batch_or_barcode_number(value, 1, 1)
+            )
+    return cases
+
+
+def _git_commit():
+    try:
+        path = frappe.get_app_path("posawesome", "..")
+        return subprocess.check_output(["git", "rev-parse", "HEAD"], cwd=path, text=True).strip()
+    except Exception:
+        return None
+
+
+def write_report(name, results, output=None, **extra):
+    """Write a benchmark report and return its path."""
+    report = {
+        "commit": _git_commit(),
+        "site": frappe.local.site,
+        "db_type": frappe.db.db_type,
+        "created": str(now_datetime()),
+        **extra,
+        "results": results,
+    }
+    if not output:
+        directory = frappe.get_site_path("private", "files", REPORT_FOLDER)
+        os.makedirs(directory, exist_ok=True)
+        stamp = now_datetime().strftime("%Y%m%d%H%M%S")
+        output = os.path.join(directory, f"{stamp}-{name}.json")
+    with open(output, "w") as f:
+        json.dump(report, f, indent=1)
+    return output
+
+
+def run(scale=None, repeat=5, cases=None, seed=False, output=None):
+    """Run the catalog benchmarks and return the path of the JSON report.
+
+    Pass ``seed=True`` to (re)seed ``scale`` synthetic items first, otherwise
+    the data of an earlier :func:`~posawesome.posawesome.benchmarks.seed.seed`
+    call is used. ``cases`` optionally limits the run to a list of case names.
+    """
+    data = bench_seed.seed(scale or 1000) if seed else _seed_data()
+    if not data["scale"]:
+        frappe.throw(_("No benchmark data found, seed the site first"))
+
+    if isinstance(cases, str):
+        cases = json.loads(cases)
+    results = {}
+    for name, fn in sorted(_cases(data).items()):
+        if cases and name not in cases:
+            continue
+        results[name] = bench(fn, repeat)
+        # Leave the site as it was between cases
+        frappe.db.rollback()
+
+    return write_report(f"catalog-{data['scale']}", results, output, scale=data["scale"], repeat=int(repeat))
+
+
+def compare(base, head):
+    """Print the change in median latency and query count between two reports."""
+    with open(base) as f:
+        base = json.load(f)
+    with open(head) as f:
+        head = json.load(f)
+
+    rows = {}
+    for name, result in head["results"].items():
+        before = base["results"].get(name)
+        if not before:
+            continue
+        rows[name] = {
+            "median_ms": (before["median_ms"], result["median_ms"]),
+            "queries": (before["queries"], result["queries"]),
+            "bytes": (before["bytes"], result["bytes"]),
+        }
+        print(
+            f"{name:60} {before['median_ms']:>10.2f} -> {result['median_ms']:>10.2f} ms"
+            f" {before['queries']:>6} -> {result['queries']:>6} queries"
+        )
+    return rows
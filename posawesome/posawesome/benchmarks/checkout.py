@@ -0,0 +1,180 @@
+# Copyright (c) 2020, Youssef Restom and contributors
+# For license information, please see license.txt
+
+"""Queries per sale of the invoice submission paths.
+
+Compares the two-call flow (``update_invoice`` then ``submit_invoice``) with
+the single ``checkout`` call, on a new invoice and on a draft saved when the
+payment screen opened:
+
+    bench --site mysite execute posawesome.posawesome.benchmarks.checkout.run --kwargs "{'pos_profile': 'Main'}"
+
+:func:`payload_size` compares the size of what background submission stores
+per sale: the job kwargs the former ``submit_in_background_job`` path
+pickled into Redis with the credit context of the submission queue.
+
+Every sale is rolled back, so the benchmark leaves no invoices behind. The
+items sold must be in stock in the profile warehouse.
+"""
+
+import json
+import pickle
+
+import frappe
+from frappe import _
+from frappe.utils import flt, nowdate
+
+from posawesome.posawesome.api import invoices, submission_queue
+
+from .catalog import bench, write_report
+
+
+def _default_items(profile, count=3):
+    """Return in-stock items without batches or serials from the profile warehouse."""
+    return frappe.db.sql_list(
+        """
+        SELECT bin.item_code
+        FROM `tabBin` bin
+        JOIN `tabItem` item ON item.name = bin.item_code
+        WHERE bin.warehouse = %s AND bin.actual_qty >= 100
+            AND item.disabled = 0 AND item.is_sales_item = 1 AND item.has_variants = 0
+            AND item.has_batch_no = 0 AND item.has_serial_no = 0
+        ORDER BY bin.item_code
+        LIMIT %s
+        """,
+        (profile.warehouse, count),
+    )
+
+
+def _sample_invoice(profile, customer, item_codes):
+    """Return an invoice payload like the one the POS sends, fully paid in the default mode."""
+    invoice = {
+        "doctype": invoices._get_invoice_doctype(profile.name),
+        "pos_profile": profile.name,
+        "company": profile.company,
+        "customer": customer,
+        "currency": profile.currency,
+        "selling_price_list": profile.selling_price_list,
+        "posting_date": nowdate(),
+        "is_pos": 1,
+        "update_stock": profile.update_stock,
+        "items": [
+            {"item_code": code, "qty": 1, "warehouse": profile.warehouse, "conversion_factor": 1}
+            for code in item_codes
+        ],
+        "payments": [
+            {"mode_of_payment": p.mode_of_payment, "default": p.default, "amount": 0}
+            for p in profile.payments
+        ],
+    }
+
+    # Price the sale once to pay its grand total
+    doc, _date = invoices._build_invoice_doc(json.loads(json.dumps(invoice)))
+    doc.calculate_taxes_and_totals()
+    default = next((p for p in invoice["payments"] if p["default"]), invoice["payments"][0])
+    default["amount"] = flt(doc.rounded_total or doc.grand_total)
+    frappe.db.rollback()
+    return invoice
+
+
+def _get_sale(pos_profile, customer, items):
+    """Return the POS Profile, the items sold and the invoice payload of a sample sale."""
+    profile = frappe.get_doc("POS Profile", pos_profile)
+    if not profile.payments:
+        frappe.throw(_("POS Profile {0} has no payment methods").format(pos_profile))
+    customer = customer or profile.customer
+    if isinstance(items, str):
+        items = json.loads(items)
+    items = items or _default_items(profile)
+    if not customer or not items:
+        frappe.throw(_("A customer and in-stock items are needed to benchmark checkout"))
+    return profile, items, _sample_invoice(profile, customer, items)
+
+
+def run(pos_profile, customer=None, items=None, repeat=5, output=None):
+    """Benchmark the submission paths and return the path of the JSON report."""
+    _profile, items, invoice = _get_sale(pos_profile, customer, items)
+    data = json.dumps({})
+
+    def update_then_submit():
+        draft = invoices.update_invoice(json.dumps(invoice))
+        return invoices.submit_invoice(json.dumps({**invoice, "name": draft["name"]}), data)
+
+    def update_then_checkout():
+        draft = invoices.update_invoice(json.dumps(invoice))
+        return invoices.checkout(json.dumps({**invoice, "name": draft["name"]}), data)
+
+    cases = {
+        "update_invoice+submit_invoice": update_then_submit,
+        "update_invoice+checkout": update_then_checkout,
+        "checkout": lambda: invoices.checkout(json.dumps(invoice), data),
+    }
+
+    results = {}
+    for name, fn in cases.items():
+        results[name] = bench(fn, repeat)
+        frappe.db.rollback()
+
+    return write_report(
+        "checkout", results, output, pos_profile=pos_profile, items=len(items), repeat=int(repeat)
+    )
+
+
+def _pickled_size(value):
+    return len(pickle.dumps(value, protocol=pickle.HIGHEST_PROTOCOL))
+
+
+def payload_size(pos_profile, customer=None, items=None, credit_rows=5, output=None):
+    """Measure the stored payload of a background submission and return the report path.
+
+    ``credit_rows`` customer credit rows are added to the payment data, as
+    the POS sends every available credit of the customer, redeemed or not.
+    """
+    _profile, items, invoice = _get_sale(pos_profile, customer, items)
+    data = {
+        "total_change": 0,
+        "paid_change": 0,
+        "credit_change": 0,
+        "redeemed_customer_credit": 0,
+        "customer_credit_dict": [
+            {
+                "type": "Invoice",
+                "credit_origin": f"ACC-SINV-BENCH-{i:05d}",
+                "total_credit": 100,
+                "credit_to_redeem": 0,
+                "source_type": "Invoice",
+            }
+            for i in range(int(credit_rows))
+        ],
+        "is_cashback": True,
+    }
+
+    invoice_doc, _date = invoices._build_invoice_doc(json.loads(json.dumps(invoice)))
+    invoice_doc.calculate_taxes_and_totals()
+    credit = invoices._prepare_invoice_submission(invoice_doc, invoice, data)
+    invoice_doc.save()
+
+    job_kwargs = {
+        "invoice": invoice_doc.name,
+        "doctype": invoice_doc.doctype,
+        "invoice_doc": invoice_doc,
+        "data": data,
+        **credit,
+    }
+    context = json.dumps(submission_queue.compact_credit_context(data, credit))
+    results = {
+        "submit_in_background_job kwargs": {"bytes": _pickled_size(job_kwargs)},
+        "submission queue context": {"bytes": len(context)},
+    }
+    frappe.db.rollback()
+
+    for name, result in results.items():
+        print(f"{name:40} {result['bytes']:>10} bytes")
+    return write_report(
+        "checkout_payload",
+        results,
+        output,
+        pos_profile=pos_profile,
+        items=len(items),
+        credit_rows=int(credit_rows),
+    )
@@ -0,0 +1,292 @@
+# Copyright (c) 2020, Youssef Restom and contributors
+# For license information, please see license.txt
+
+"""Synthetic catalog data for the POS Awesome benchmarks.
+
+Every record created here is named with :data:`PREFIX` so a seeded site can
+be cleaned up with :func:`clear`. Rows are written with ``bulk_insert`` to
+keep seeding 100k items practical; they skip document validation and are
+only meant for benchmarking.
+
+    bench --site mysite execute posawesome.posawesome.benchmarks.seed.seed --kwargs "{'scale': 10000}"
+"""
+
+import random
+
+import frappe
+from frappe.utils import add_days, now_datetime, nowdate
+
+PREFIX = "POSA-BENCH"
+ITEM_GROUP = "POSA Bench"
+PRICE_LIST = "POSA Bench Selling"
+ATTRIBUTE = "POSA Bench Size"
+ATTRIBUTE_VALUES = ("S", "M", "L", "XL")
+
+WORDS = (
+    "apple", "basil", "cedar", "delta", "ember", "falcon", "garnet", "harbor", "indigo", "jasper",
+    "kettle", "lemon", "marble", "nectar", "olive", "pepper", "quartz", "raven", "saffron", "timber",
+    "umber", "violet", "walnut", "xenon", "yarrow", "zephyr", "bottle", "carton", "crate", "pouch",
+)  # fmt: skip
+
+SUBGROUPS = 20
+
+
+def _item_code(i):
+    return f"{PREFIX}-{i:06d}"
+
+
+BASE_FIELDS = ["name", "creation", "modified", "owner", "modified_by"]
+CHILD_FIELDS = [*BASE_FIELDS, "parent", "parentfield", "parenttype", "idx"]
+
+
+def _row(name, now, *values):
+    """Return a ``bulk_insert`` row, with a random name when ``name`` is ``None``."""
+    user = frappe.session.user
+    return [name or frappe.generate_hash(length=10), now, now, user, user, *values]
+
+
+def _ensure_setup(company):
+    """Create the warehouse, item groups, price list and attribute used by the data."""
+    abbr = frappe.get_cached_value("Company", company, "abbr")
+    warehouse = f"{ITEM_GROUP} - {abbr}"
+    if not frappe.db.exists("Warehouse", warehouse):
+        frappe.get_doc({"doctype": "Warehouse", "warehouse_name": ITEM_GROUP, "company": company}).insert()
+
+    root_group = frappe.db.get_value("Item Group", {"is_group": 1, "parent_item_group": ""}, "name")
+    if not frappe.db.exists("Item Group", ITEM_GROUP):
+        frappe.get_doc(
+            {
+                "doctype": "Item Group",
+                "item_group_name": ITEM_GROUP,
+                "parent_item_group": root_group,
+                "is_group": 1,
+            }
+        ).insert()
+    for i in range(SUBGROUPS):
+        name = f"{ITEM_GROUP} {i:02d}"
+        if not frappe.db.exists("Item Group", name):
+            frappe.get_doc(
+                {"doctype": "Item Group", "item_group_name": name, "parent_item_group": ITEM_GROUP}
+            ).insert()
+
+    currency = frappe.get_cached_value("Company", company, "default_currency")
+    if not frappe.db.exists("Price List", PRICE_LIST):
+        frappe.get_doc(
+            {"doctype": "Price List", "price_list_name": PRICE_LIST, "currency": currency, "selling": 1}
+        ).insert()
+
+    if not frappe.db.exists("Item Attribute", ATTRIBUTE):
+        frappe.get_doc(
+            {
+                "doctype": "Item Attribute",
+                "attribute_name": ATTRIBUTE,
+                "item_attribute_values": [{"attribute_value": v, "abbr": v} for v in ATTRIBUTE_VALUES],
+            }
+        ).insert()
+
+    for uom in ("Nos", "Box"):
+        if not frappe.db.exists("UOM", uom):
+            frappe.get_doc({"doctype": "UOM", "uom_name": uom}).insert()
+
+    return warehouse, currency
+
+
+def seed(scale=1000, batch_ratio=0.05, serial_ratio=0.02, variant_ratio=0.02, company=None, seed=42):
+    """Create ``scale`` synthetic items with prices, barcodes, UOMs, stock, batches and serials.
+
+    Returns a summary with the warehouse, price list and sample codes used by
+    :mod:`posawesome.posawesome.benchmarks.catalog`.
+    """
+    scale = int(scale)
+    rng = random.Random(seed)
+    company = (
+        company or frappe.defaults.get_defaults().get("company") or frappe.get_all("Company", pluck="name")[0]
+    )
+    clear()
+    warehouse, currency = _ensure_setup(company)
+    now = now_datetime()
+    today = nowdate()
+
+    items, barcodes, uoms, prices, bins = [], [], [], [], []
+    batches, ledger, serials, variant_attrs, template_attrs = [], [], [], [], []
+    templates = {}
+
+    for i in range(scale):
+        code = _item_code(i)
+        words = rng.sample(WORDS, 3)
+        item_name = f"{words[0].title()} {words[1]} {words[2]} {i}"
+        has_batch = rng.random() < batch_ratio
+        has_serial = not has_batch and rng.random() < serial_ratio
+        template = None
+        if templates and rng.random() < variant_ratio * len(ATTRIBUTE_VALUES):
+            template = rng.choice(list(templates))
+        is_template = not template and rng.random() < variant_ratio
+
+        items.append(
+            _row(
+                code,
+                now,
+                code,
+                item_name,
+                f"{item_name} synthetic benchmark item",
+                f"{ITEM_GROUP} {i % SUBGROUPS:02d}",
+                "Nos",
+                1,
+                1,
+                0,
+                1 if is_template else 0,
+                template,
+                1 if has_batch else 0,
+                1 if has_serial else 0,
+                i,
+            )
+        )
+        if is_template:
+            templates[code] = 0
+            template_attrs.append(_row(None, now, code, "attributes", "Item", 1, ATTRIBUTE))
+            continue
+        if template:
+            templates[template] += 1
+            value = ATTRIBUTE_VALUES[templates[template] % len(ATTRIBUTE_VALUES)]
+            variant_attrs.append(_row(None, now, code, "attributes", "Item", 1, ATTRIBUTE, value))
+
+        barcodes.append(_row(None, now, code, "barcodes", "Item", 1, f"9{i:012d}", None))
+        uoms.append(_row(None, now, code, "uoms", "Item", 1, "Nos", 1))
+        uoms.append(_row(None, now, code, "uoms", "Item", 2, "Box", 12))
+        rate = round(rng.uniform(1, 500), 2)
+        prices.append(_row(None, now, code, item_name, PRICE_LIST, currency, rate, 1, 0, "Nos"))
+
+        qty = rng.randint(0, 200)
+        if has_batch:
+            qty = 0
+            for b in range(3):
+                batch_no = f"{code}-B{b}"
+                batch_qty = rng.randint(1, 50)
+                qty += batch_qty
+                expiry = add_days(today, rng.randint(-30, 365))
+                batches.append(_row(batch_no, now, batch_no, code, expiry, 0, rate))
+                ledger.append(
+                    _row(
+                        None,
+                        now,
+                        code,
+                        warehouse,
+                        batch_no,
+                        batch_qty,
+                        0,
+                        today,
+                        "00:00:00",
+                        1,
+                        "Stock Entry",
+                        PREFIX,
+                        company,
+                    )
+                )
+        if has_serial:
+            qty = 5
+            for s in range(qty):
+                serial_no = f"{code}-S{s}"
+                serials.append(_row(serial_no, now, serial_no, code, warehouse, "Active", company))
+        bins.append(_row(None, now, code, warehouse, qty, qty, "Nos"))
+
+    frappe.db.bulk_insert(
+        "Item",
+        [
+            *BASE_FIELDS,
+            "item_code",
+            "item_name",
+            "description",
+            "item_group",
+            "stock_uom",
+            "is_stock_item",
+            "is_sales_item",
+            "is_fixed_asset",
+            "has_variants",
+            "variant_of",
+            "has_batch_no",
+            "has_serial_no",
+            "idx",
+        ],
+        items,
+    )
+    frappe.db.bulk_insert("Item Barcode", [*CHILD_FIELDS, "barcode", "posa_uom"], barcodes)
+    frappe.db.bulk_insert("UOM Conversion Detail", [*CHILD_FIELDS, "uom", "conversion_factor"], uoms)
+    frappe.db.bulk_insert(
+        "Item Price",
+        [
+            *BASE_FIELDS,
+            "item_code",
+            "item_name",
+            "price_list",
+            "currency",
+            "price_list_rate",
+            "selling",
+            "buying",
+            "uom",
+        ],
+        prices,
+    )
+    frappe.db.bulk_insert(
+        "Bin", [*BASE_FIELDS, "item_code", "warehouse", "actual_qty", "projected_qty", "stock_uom"], bins
+    )
+    frappe.db.bulk_insert(
+        "Batch", [*BASE_FIELDS, "batch_id", "item", "expiry_date", "disabled", "posa_batch_price"], batches
+    )
+    frappe.db.bulk_insert(
+        "Stock Ledger Entry",
+        [
+            *BASE_FIELDS,
+            "item_code",
+            "warehouse",
+            "batch_no",
+            "actual_qty",
+            "is_cancelled",
+            "posting_date",
+            "posting_time",
+            "docstatus",
+            "voucher_type",
+            "voucher_no",
+            "company",
+        ],
+        ledger,
+    )
+    frappe.db.bulk_insert(
+        "Serial No", [*BASE_FIELDS, "serial_no", "item_code", "warehouse", "status", "company"], serials
+    )
+    frappe.db.bulk_insert("Item Variant Attribute", [*CHILD_FIELDS, "attribute"], template_attrs)
+    frappe.db.bulk_insert(
+        "Item Variant Attribute", [*CHILD_FIELDS, "attribute", "attribute_value"], variant_attrs
+    )
+    frappe.db.commit()
+
+    return {
+        "scale": scale,
+        "company": company,
+        "warehouse": warehouse,
+        "price_list": PRICE_LIST,
+        "currency": currency,
+        "item_group": ITEM_GROUP,
+        "templates": [code for code, count in templates.items() if count],
+        "batch_items": sorted({row[6] for row in batches}),
+        "batches": [row[0] for row in batches[:50]],
+        "serials": [row[0] for row in serials[:50]],
+        "barcodes": [row[len(CHILD_FIELDS)] for row in barcodes[:50]],
+    }
+
+
+def clear():
+    """Delete all synthetic benchmark records."""
+    like = f"{PREFIX}-%"
+    for doctype, field in (
+        ("Item Barcode", "parent"),
+        ("UOM Conversion Detail", "parent"),
+        ("Item Variant Attribute", "parent"),
+        ("Item Price", "item_code"),
+        ("Bin", "item_code"),
+        ("Stock Ledger Entry", "item_code"),
+        ("Serial No", "item_code"),
+        ("Batch", "item"),
+        ("Item", "name"),
+    ):
+        frappe.db.delete(doctype, {field: ["like", like]})
+    frappe.db.commit()
@@ -0,0 +1,14 @@
+# Copyright (c) 2020, Youssef Restom and contributors
+# For license information, please see license.txt
+
+import frappe
+from frappe.model.document import Document
+
+
+class POSInvoiceSubmission(Document):
+    pass
+
+
+def on_doctype_update():
+    frappe.db.add_index("POS Invoice Submission", ["invoice_doctype", "invoice"], "invoice_doctype_invoice")
+    frappe.db.add_index("POS Invoice Submission", ["pos_opening_shift"], "pos_opening_shift")
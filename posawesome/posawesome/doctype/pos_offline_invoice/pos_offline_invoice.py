@@ -0,0 +1,14 @@
+# Copyright (c) 2020, Youssef Restom and contributors
+# For license information, please see license.txt
+
+import frappe
+from frappe.model.document import Document
+
+
+class POSOfflineInvoice(Document):
+    pass
+
+
+def on_doctype_update():
+    frappe.db.add_index("POS Offline Invoice", ["status", "modified"], "status_modified")
+    frappe.db.add_index("POS Offline Invoice", ["pos_opening_shift"], "pos_opening_shift")
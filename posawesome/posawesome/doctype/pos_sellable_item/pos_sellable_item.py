@@ -0,0 +1,27 @@
+# Copyright (c) 2020, Youssef Restom and contributors
+# For license information, please see license.txt
+
+import frappe
+from frappe.model.document import Document
+
+
+class POSSellableItem(Document):
+    pass
+
+
+def on_doctype_update():
+    frappe.db.add_index(
+        "POS Sellable Item", ["pos_profile", "item_name", "item_code"], "profile_item_name_code"
+    )
+    # Rows are rebuilt from scratch, duplicates left by concurrent refreshes can go
+    frappe.db.sql(
+        """
+        DELETE duplicate FROM `tabPOS Sellable Item` duplicate
+        JOIN `tabPOS Sellable Item` kept
+            ON kept.pos_profile = duplicate.pos_profile
+            AND kept.item_code = duplicate.item_code
+            AND kept.name < duplicate.name
+        """
+    )
+    frappe.db.add_unique("POS Sellable Item", ["pos_profile", "item_code"], "unique_profile_item_code")
+    frappe.db.add_index("POS Sellable Item", ["item_code"], "item_code")